@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from bench_standin import StandinState, start_standin  # noqa: E402
+
+RUNNER_MODULES = {
+    "run_kamis": "kamis",
+    "run_opendata_ke_socrata": "opendata_ke_socrata",
+    "run_hdx_ckan_wfp_prices": "hdx_ckan",
+    "run_worldbank_wdi": "worldbank_wdi",
+    "run_nasa_power": "nasa_power",
+    "run_geoboundaries_adm1": "geoboundaries",
+    "run_uncomtrade_template": "uncomtrade",
+    "run_url_list": "url_list_downloader",
+}
+
+# ERA5 is not covered: cdsapi talks to the CDS queue, which has no stand-in.
+def scenarios(base: str, args: argparse.Namespace) -> dict[str, tuple[str, dict[str, Any]]]:
+    out: dict[str, tuple[str, dict[str, Any]]] = {}
+    for pp in args.kamis_per_page:
+        out[f"kamis_pp{pp}"] = (
+            "run_kamis",
+            {"kamis": {"enabled": True, "base_url": f"{base}/kamis/site/market", "products": ["Dry Maize", "Rice"], "per_page": pp, "max_offsets": 1000}},
+        )
+    out["socrata"] = (
+        "run_opendata_ke_socrata",
+        {"kenya_opendata_socrata": {"enabled": True, "domain": f"{base}/socrata", "dataset_id": "bench-0001", "page_size": 20000}},
+    )
+    out["hdx_ckan"] = (
+        "run_hdx_ckan_wfp_prices",
+        {"hdx_wfp_prices": {"enabled": True, "base": f"{base}/ckan", "package_id": "wfp-food-prices", "country_hint": "Kenya"}},
+    )
+    out["worldbank_wdi"] = (
+        "run_worldbank_wdi",
+        {"worldbank_wdi": {"enabled": True, "base_url": f"{base}/wdi", "country": "KEN", "indicators": ["FP.CPI.TOTL", "FP.CPI.TOTL.ZG", "PA.NUS.FCRF"]}},
+    )
+    out["nasa_power"] = (
+        "run_nasa_power",
+        {"nasa_power": {"enabled": True, "base_url": f"{base}/power", "points_csv": "@points", "parameters": ["T2M", "PRECTOT", "WS2M", "RH2M", "ALLSKY_SFC_SW_DWN"]}},
+    )
+    out["geoboundaries"] = (
+        "run_geoboundaries_adm1",
+        {"geoboundaries_adm1": {"enabled": True, "api_base": f"{base}/gb", "iso3": "KEN", "adm": "ADM1"}},
+    )
+    out["uncomtrade"] = (
+        "run_uncomtrade_template",
+        {"uncomtrade": {"enabled": True, "url": f"{base}/comtrade", "hs_code": "1005", "year_from": 2015, "year_to": 2025, "rate_per_second": 0}},
+    )
+    out["url_list"] = (
+        "run_url_list",
+        {"bench_urls": {"enabled": True, "urls_file": "@urls", "urls": [f"{base}/files/bench{i}_{args.file_mb}mb.bin" for i in range(3)]}},
+    )
+    return out
+
+def _percentiles(xs: list[float]) -> dict[str, float]:
+    if not xs:
+        return {}
+    xs = sorted(xs)
+    pick = lambda q: xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))]  # noqa: E731
+    return {
+        "p50": round(pick(0.50), 2),
+        "p90": round(pick(0.90), 2),
+        "p99": round(pick(0.99), 2),
+        "max": round(xs[-1], 2),
+        "mean": round(statistics.fmean(xs), 2),
+    }
+
+def run_scenario(runner: str, sources: dict[str, Any], work_dir: str, n_points: int, use_cache: bool) -> dict[str, Any]:
+    """Runs one downloader in a fresh process so tracemalloc/RSS peaks belong to it alone."""
+    import importlib
+    import resource
+    import tracemalloc
+
+    import requests.adapters
+
+    import maize_data.downloaders as dl
+
+    # Import cost (pandas, bs4, ...) is not what we are measuring.
+    importlib.import_module(f"maize_data.downloaders.{RUNNER_MODULES[runner]}")
+
+    work = Path(work_dir)
+    for scfg in sources.values():
+        if scfg.get("points_csv") == "@points":
+            pts = work / "points.csv"
+            rows = [f"p{i:03d},Point {i},{-4 + (i % 9):.3f},{34 + (i % 8):.3f}" for i in range(n_points)]
+            pts.write_text("id,name,lat,lon\n" + "\n".join(rows) + "\n", encoding="utf-8")
+            scfg["points_csv"] = str(pts)
+        if scfg.get("urls_file") == "@urls":
+            urls = work / "urls.txt"
+            urls.write_text("\n".join(scfg.pop("urls")) + "\n", encoding="utf-8")
+            scfg["urls_file"] = str(urls)
+
+    cfg = {
+        "global": {
+            "out_dir": str(work / "out"),
+            "start_date": "2015-01-01",
+            "end_date": "2024-12-31",
+            "http_timeout": 60,
+            "http_sleep_seconds": 0.0,
+            "force_download": True,
+            "http_cache": {"enabled": use_cache, "dir": str(work / "http_cache"), "max_mb": 4096, "ttl_seconds": 3600},
+        },
+        "sources": sources,
+    }
+
+    latencies: list[float] = []
+    orig_send = requests.adapters.HTTPAdapter.send
+
+    def timed_send(self, request, **kwargs):
+        t = time.perf_counter()
+        try:
+            return orig_send(self, request, **kwargs)
+        finally:
+            latencies.append((time.perf_counter() - t) * 1000.0)
+
+    requests.adapters.HTTPAdapter.send = timed_send
+
+    log_lines: list[str] = []
+    args: tuple[Any, ...] = (cfg, log_lines.append)
+    kwargs = {"key": next(iter(sources))} if runner == "run_url_list" else {}
+
+    error = None
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        getattr(dl, runner)(*args, **kwargs)
+    except Exception as e:  # report, don't abort the whole suite
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    out_files = [p for p in (work / "out").rglob("*") if p.is_file()]
+    return {
+        "wall_s": round(wall, 4),
+        "client_requests": len(latencies),
+        "latency_ms": _percentiles(latencies),
+        "bytes_written": sum(p.stat().st_size for p in out_files),
+        "files_written": len(out_files),
+        "tracemalloc_peak_mb": round(peak / 2**20, 2),
+        "rss_peak_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        "log_lines": len(log_lines),
+        "error": error,
+    }
+
+def compare(prev: dict[str, Any] | None, cur: dict[str, Any], threshold_pct: float) -> list[str]:
+    if not prev:
+        return []
+    regressions = []
+    for name, r in cur["results"].items():
+        p = prev["results"].get(name)
+        if not p or r.get("error") or p.get("error") or not p.get("wall_s"):
+            continue
+        delta = (r["wall_s"] - p["wall_s"]) / p["wall_s"] * 100
+        mem_delta = (r["tracemalloc_peak_mb"] - p["tracemalloc_peak_mb"]) / max(p["tracemalloc_peak_mb"], 1e-6) * 100
+        line = f"{name:16s} wall {p['wall_s']:.3f}s -> {r['wall_s']:.3f}s ({delta:+.1f}%)  peak {mem_delta:+.1f}%"
+        if delta > threshold_pct or mem_delta > threshold_pct:
+            regressions.append(line)
+        print("  " + line)
+    return regressions
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark every run_* downloader against a local stand-in server")
+    ap.add_argument("--only", nargs="*", help="Scenario names to run (default: all)")
+    ap.add_argument("--kamis-per-page", nargs="*", type=int, default=[500, 1000, 3000])
+    ap.add_argument("--kamis-rows", type=int, default=6000)
+    ap.add_argument("--socrata-rows", type=int, default=100_000)
+    ap.add_argument("--ckan-rows", type=int, default=50_000)
+    ap.add_argument("--points", type=int, default=20)
+    ap.add_argument("--file-mb", type=int, default=16)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="Injected server latency per request")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    ap.add_argument("--with-cache", action="store_true", help="Route GETs through the HTTP cache (second pass is measured)")
+    ap.add_argument("--history", default="logs/bench_history.json")
+    ap.add_argument("--label", default="", help="Free-text label stored with this result")
+    ap.add_argument("--regress-pct", type=float, default=20.0)
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+
+    state = StandinState(
+        kamis_rows=args.kamis_rows,
+        socrata_rows=args.socrata_rows,
+        ckan_rows=args.ckan_rows,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+    )
+    srv = start_standin(state)
+    print(f"Stand-in on {srv.base_url}")
+
+    plan = scenarios(srv.base_url, args)
+    if args.only:
+        plan = {k: v for k, v in plan.items() if k in set(args.only)}
+
+    results: dict[str, Any] = {}
+    ctx = mp.get_context("spawn")
+    for name, (runner, sources) in plan.items():
+        with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as work:
+            passes = 2 if args.with_cache else 1
+            for _ in range(passes):
+                state.reset()
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as ex:
+                    r = ex.submit(run_scenario, runner, json.loads(json.dumps(sources)), work, args.points, args.with_cache).result()
+
+        r["server_requests"] = state.requests
+        r["server_errors"] = state.errors
+        r["bytes_received"] = state.bytes_sent
+        r["req_per_s"] = round(state.requests / r["wall_s"], 2) if r["wall_s"] else None
+        r["mb_per_s"] = round(state.bytes_sent / 2**20 / r["wall_s"], 2) if r["wall_s"] else None
+        results[name] = r
+
+        lat = r["latency_ms"]
+        print(
+            f"{name:16s} {r['wall_s']:8.3f}s  req={r['server_requests']:<5d} {r['req_per_s'] or 0:8.1f} req/s "
+            f"{r['mb_per_s'] or 0:7.1f} MB/s  p50={lat.get('p50', 0)}ms p99={lat.get('p99', 0)}ms  "
+            f"peak={r['tracemalloc_peak_mb']}MB rss={r['rss_peak_mb']}MB" + (f"  ERROR {r['error']}" if r["error"] else "")
+        )
+
+    srv.shutdown()
+
+    try:
+        from maize_data.manifest import try_git_rev
+        git_rev = try_git_rev()
+    except Exception:
+        git_rev = None
+
+    record = {
+        "at": datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+        "git_rev": git_rev,
+        "label": args.label,
+        "params": {k: v for k, v in vars(args).items() if k not in {"history", "fail_on_regression", "label"}},
+        "results": results,
+    }
+
+    history_path = Path(args.history)
+    history = json.loads(history_path.read_text(encoding="utf-8")) if history_path.exists() else []
+    # Only compare against a run with the same workload shape.
+    prev = next((h for h in reversed(history) if h.get("params") == record["params"]), None)
+    if prev:
+        print(f"Compared with {prev['at']} ({prev.get('git_rev') or 'no git rev'}):")
+    regressions = compare(prev, record, args.regress_pct)
+
+    history.append(record)
+    history_path.parent.mkdir(parents=True, exist_ok=True)
+    history_path.write_text(json.dumps(history, indent=2), encoding="utf-8")
+    print(f"Saved -> {history_path} (n={len(history)})")
+
+    if regressions and args.fail_on_regression:
+        raise SystemExit("Regressions above {:.0f}%:\n  ".format(args.regress_pct) + "\n  ".join(regressions))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Local stand-in for every upstream the downloaders talk to. Paths mirror the real APIs
+# under a per-source prefix so a config only has to swap base URLs:
+#   /kamis/site/market[/<offset>]?product=&per_page=     KAMIS market HTML
+#   /socrata/resource/<id>.csv?$limit=&$offset=          Socrata CSV pages
+#   /socrata/api/views/<id>.json                         Socrata view metadata (rowsUpdatedAt)
+#   /ckan/api/3/action/package_show?id=                  CKAN package metadata
+#   /ckan/files/wfp_food_prices_ken.csv                  CKAN CSV resource
+#   /wdi/country/<iso3>/indicator/<id>?format=json       World Bank WDI JSON
+#   /power?latitude=&longitude=&start=&end=&parameters=  NASA POWER daily JSON
+#   /gb/<iso3>/<adm>/  and  /gb/files/<iso3>_<adm>.zip   geoBoundaries metadata + zip
+#   /comtrade                                            UN Comtrade JSON
+#   /files/<name>_<mb>mb.bin                             large range-capable files
+# Text bodies are gzip-encoded when the client sends Accept-Encoding: gzip, like the real servers.
+
+KAMIS_PRODUCTS = ["Dry Maize", "Rice", "Wheat", "Beans Rosecoco", "Maize Flour", "Red Sorghum"]
+COUNTIES = ["Nairobi", "Kisumu", "Nakuru", "Uasin-Gishu", "Mombasa", "Kakamega", "Bungoma", "Meru"]
+
+class StandinState:
+    """Shape of the synthetic data plus fault injection; counters are read by the benchmark runner."""
+
+    def __init__(
+        self,
+        kamis_rows: int = 6000,
+        socrata_rows: int = 100_000,
+        ckan_rows: int = 50_000,
+        latency_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 7,
+    ) -> None:
+        self.kamis_rows = kamis_rows
+        self.socrata_rows = socrata_rows
+        self.ckan_rows = ckan_rows
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self._ckan_csv: bytes | None = None
+        self._zips: dict[str, bytes] = {}
+
+    def count(self, n_bytes: int, error: bool = False) -> None:
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += n_bytes
+            self.errors += int(error)
+
+    def reset(self) -> None:
+        with self.lock:
+            self.requests = self.errors = self.bytes_sent = 0
+
+    def inject_error(self) -> bool:
+        with self.lock:
+            return self.error_rate > 0 and self.rng.random() < self.error_rate
+
+def _kamis_html(state: StandinState, product: int | None, offset: int, per_page: int) -> str:
+    options = "".join(f'<option value="{i}">{n}</option>' for i, n in enumerate(KAMIS_PRODUCTS, 1))
+    head = f'<html><body><form><select name="product"><option value="">--</option>{options}</select></form>'
+    if product is None:
+        return head + "</body></html>"
+
+    cols = ["Commodity", "Classification", "Grade", "Sex", "Market", "Wholesale", "Retail", "Supply Volume", "County", "Date"]
+    name = KAMIS_PRODUCTS[(product - 1) % len(KAMIS_PRODUCTS)]
+    d0 = date(2015, 1, 1)
+    rows = []
+    for i in range(offset, min(offset + per_page, state.kamis_rows)):
+        county = COUNTIES[i % len(COUNTIES)]
+        price = 30 + (i * 37 % 900) / 10
+        rows.append(
+            "<tr>"
+            f"<td>{name}</td><td>-</td><td>-</td><td>-</td><td>{county} Market</td>"
+            f"<td>{price:.2f}/Kg</td><td>{price * 1.2:.2f}/Kg</td><td>{i % 500}</td><td>{county}</td>"
+            f"<td>{d0 + timedelta(days=i // len(COUNTIES))}</td>"
+            "</tr>"
+        )
+    thead = "".join(f"<th>{c}</th>" for c in cols)
+    return head + f"<table><thead><tr>{thead}</tr></thead><tbody>{''.join(rows)}</tbody></table></body></html>"
+
+def _price_csv(n_rows: int, offset: int = 0, limit: int | None = None) -> bytes:
+    end = n_rows if limit is None else min(n_rows, offset + limit)
+    out = io.StringIO()
+    out.write("date,admin1,market,latitude,longitude,commodity,unit,pricetype,currency,price\n")
+    d0 = date(2010, 1, 15)
+    for i in range(offset, end):
+        county = COUNTIES[i % len(COUNTIES)]
+        out.write(
+            f"{d0 + timedelta(days=30 * (i // 200))},{county},{county} Market,"
+            f"{-1 + (i % 7) * 0.3:.4f},{35 + (i % 5) * 0.5:.4f},Maize (white),90 KG,Wholesale,KES,{2000 + i % 1500}\n"
+        )
+    return out.getvalue().encode("utf-8")
+
+def _power_json(qs: dict[str, list[str]]) -> bytes:
+    start = qs.get("start", ["20150101"])[0]
+    end = qs.get("end", ["20151231"])[0]
+    params = qs.get("parameters", ["T2M"])[0].split(",")
+    d0 = date(int(start[:4]), int(start[4:6]), int(start[6:]))
+    d1 = date(int(end[:4]), int(end[4:6]), int(end[6:]))
+    days = [(d0 + timedelta(days=i)).strftime("%Y%m%d") for i in range((d1 - d0).days + 1)]
+    series = {p: {d: round(20 + (i % 365) / 36.5 + k, 2) for i, d in enumerate(days)} for k, p in enumerate(params)}
+    body = {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [float(qs["longitude"][0]), float(qs["latitude"][0]), 0]},
+        "properties": {"parameter": series},
+        "header": {"fill_value": -999.0, "start": start, "end": end},
+    }
+    return json.dumps(body).encode("utf-8")
+
+def _boundaries_zip(iso3: str, adm: str) -> bytes:
+    features = []
+    for i, county in enumerate(COUNTIES):
+        x, y = 34 + i * 0.5, -1 + (i % 4) * 0.5
+        ring = [[x, y], [x + 0.5, y], [x + 0.5, y + 0.5], [x, y + 0.5], [x, y]]
+        features.append(
+            {"type": "Feature", "properties": {"shapeName": county}, "geometry": {"type": "Polygon", "coordinates": [ring]}}
+        )
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr(f"geoBoundaries-{iso3}-{adm}.geojson", json.dumps({"type": "FeatureCollection", "features": features}))
+        z.writestr(f"geoBoundaries-{iso3}-{adm}-metaData.json", json.dumps({"boundaryISO": iso3}))
+    return buf.getvalue()
+
+class StandinHandler(BaseHTTPRequestHandler):
+    server: "StandinServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _reply(self, status: int, body: bytes, ctype: str, extra: dict[str, str] | None = None) -> None:
+        gz = status == 200 and len(body) > 1024 and "gzip" in self.headers.get("Accept-Encoding", "") and not ctype.startswith("application/zip")
+        if gz:
+            body = gzip.compress(body, compresslevel=5)
+            extra = {**(extra or {}), "Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+        self.server.state.count(len(body), error=status >= 500)
+
+    def _stream_file(self, size: int) -> None:
+        start, end = 0, size - 1
+        m = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        status = 200
+        if m:
+            start = int(m.group(1))
+            end = int(m.group(2)) if m.group(2) else size - 1
+            status = 206
+        length = end - start + 1
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{size}"')
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if self.command != "HEAD":
+            block = bytes(range(256)) * 4096
+            sent = 0
+            while sent < length:
+                n = min(len(block), length - sent)
+                self.wfile.write(block[:n])
+                sent += n
+        self.server.state.count(length)
+
+    def do_HEAD(self) -> None:
+        self.do_GET()
+
+    def do_GET(self) -> None:
+        state = self.server.state
+        if state.latency_ms:
+            time.sleep(state.latency_ms / 1000.0)
+        if state.inject_error():
+            self._reply(503, b"injected error", "text/plain", {"Retry-After": "0"})
+            return
+
+        u = urlparse(self.path)
+        qs = parse_qs(u.query)
+        path = u.path.rstrip("/")
+
+        m = re.fullmatch(r"/kamis/site/market(?:/(\d+))?", path)
+        if m:
+            product = int(qs["product"][0]) if "product" in qs else None
+            per_page = int(qs.get("per_page", ["3000"])[0])
+            html = _kamis_html(state, product, int(m.group(1) or 0), per_page)
+            self._reply(200, html.encode("utf-8"), "text/html; charset=utf-8")
+            return
+
+        m = re.fullmatch(r"/socrata/resource/([\w-]+)\.csv", path)
+        if m:
+            limit = int(qs.get("$limit", ["1000"])[0])
+            offset = int(qs.get("$offset", ["0"])[0])
+            body = _price_csv(state.socrata_rows, offset, limit) if offset < state.socrata_rows else b""
+            self._reply(200, body, "text/csv")
+            return
+
+        m = re.fullmatch(r"/socrata/api/views/([\w-]+)\.json", path)
+        if m:
+            view = {"id": m.group(1), "rowsUpdatedAt": 1735689600, "viewLastModified": 1735689600}
+            self._reply(200, json.dumps(view).encode("utf-8"), "application/json")
+            return
+
+        if path == "/ckan/api/3/action/package_show":
+            host = self.headers.get("Host")
+            pkg = {
+                "success": True,
+                "result": {
+                    "id": qs.get("id", ["wfp-food-prices"])[0],
+                    "metadata_modified": "2025-01-01T00:00:00",
+                    "resources": [
+                        {
+                            "name": "wfp_food_prices_ken.csv",
+                            "description": "Kenya food prices",
+                            "format": "CSV",
+                            "url": f"http://{host}/ckan/files/wfp_food_prices_ken.csv",
+                            "last_modified": "2025-01-01T00:00:00",
+                        }
+                    ],
+                },
+            }
+            self._reply(200, json.dumps(pkg).encode("utf-8"), "application/json")
+            return
+
+        if path == "/ckan/files/wfp_food_prices_ken.csv":
+            if state._ckan_csv is None:
+                state._ckan_csv = _price_csv(state.ckan_rows)
+            self._reply(200, state._ckan_csv, "text/csv")
+            return
+
+        m = re.fullmatch(r"/wdi/country/(\w+)/indicator/([\w.]+)", path)
+        if m:
+            per_page = int(qs.get("per_page", ["50"])[0])
+            data = [
+                {"date": str(y), "value": 100 + (y - 1960) * 1.5, "indicator": {"id": m.group(2)}}
+                for y in range(2024, 1959, -1)
+            ][:per_page]
+            meta = {"page": 1, "pages": 1, "per_page": per_page, "total": len(data), "lastupdated": "2025-01-01"}
+            self._reply(200, json.dumps([meta, data]).encode("utf-8"), "application/json")
+            return
+
+        if path == "/power":
+            self._reply(200, _power_json(qs), "application/json")
+            return
+
+        m = re.fullmatch(r"/gb/(\w+)/(\w+)", path)
+        if m:
+            host = self.headers.get("Host")
+            meta = {
+                "boundaryISO": m.group(1),
+                "boundaryType": m.group(2),
+                "staticDownloadLink": f"http://{host}/gb/files/{m.group(1)}_{m.group(2)}.zip",
+            }
+            self._reply(200, json.dumps(meta).encode("utf-8"), "application/json")
+            return
+
+        m = re.fullmatch(r"/gb/files/(\w+)_(\w+)\.zip", path)
+        if m:
+            key = f"{m.group(1)}_{m.group(2)}"
+            if key not in state._zips:
+                state._zips[key] = _boundaries_zip(m.group(1), m.group(2))
+            self._reply(200, state._zips[key], "application/zip", {"ETag": f'"{key}"'})
+            return
+
+        if path == "/comtrade":
+            years = qs.get("year", ["2020"])[0].split(",")
+            flows = qs.get("flowCode", ["M"])[0].split(",")
+            partners = [int(p) for p in qs["partnerCode"][0].split(",")] if "partnerCode" in qs else range(1, 50)
+            data = [
+                {"period": y, "flowCode": f, "partnerCode": p, "cmdCode": qs.get("cmdCode", ["1005"])[0], "primaryValue": p * 1000}
+                for y in years
+                for f in flows
+                for p in partners
+            ]
+            count = len(data)
+            if "max" in qs:  # like the real API: silently capped, `count` is the full size
+                data = data[: int(qs["max"][0])]
+            self._reply(200, json.dumps({"data": data, "count": count}).encode("utf-8"), "application/json")
+            return
+
+        m = re.fullmatch(r"/files/[\w-]+_(\d+)mb\.bin", path)
+        if m:
+            self._stream_file(int(m.group(1)) * 1024 * 1024)
+            return
+
+        self._reply(404, b"not found", "text/plain")
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, state: StandinState, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), StandinHandler)
+        self.state = state
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def start_standin(state: StandinState, port: int = 0) -> StandinServer:
+    srv = StandinServer(state, port=port)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Serve synthetic upstream data for the downloaders")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    args = ap.parse_args()
+
+    srv = StandinServer(StandinState(latency_ms=args.latency_ms, error_rate=args.error_rate), port=args.port)
+    print(f"Stand-in serving on {srv.base_url} (Ctrl+C to stop)")
+    srv.serve_forever()
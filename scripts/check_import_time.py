@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# plan/status must not drag these in (see src/maize_data/plan.py)
+HEAVY = ["pandas", "numpy", "requests", "bs4", "lxml", "geopandas", "dotenv", "cdsapi"]
+
+PROBE = """
+import sys, time
+t0 = time.perf_counter()
+import maize_data.cli, maize_data.plan
+dt = (time.perf_counter() - t0) * 1000
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(f"{{dt:.1f}} {{','.join(heavy)}}")
+"""
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Guard: `maize_data plan/status` must start fast")
+    ap.add_argument("--budget-ms", type=float, default=150.0, help="Max import time of maize_data.cli + plan")
+    ap.add_argument("--repeat", type=int, default=5, help="Best-of-N to smooth out cold caches")
+    args = ap.parse_args()
+
+    env = {**os.environ, "PYTHONPATH": f"{ROOT / 'src'}{os.pathsep}{os.environ.get('PYTHONPATH', '')}"}
+    best = None
+    heavy: list[str] = []
+    for _ in range(args.repeat):
+        out = subprocess.check_output([sys.executable, "-c", PROBE.format(heavy=HEAVY)], env=env, text=True).split()
+        ms = float(out[0])
+        heavy = out[1].split(",") if len(out) > 1 else []
+        best = ms if best is None else min(best, ms)
+
+    print(f"import maize_data.cli + plan: {best:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if heavy:
+        raise SystemExit(f"FAIL: heavy modules imported at startup: {heavy}")
+    if best > args.budget_ms:
+        raise SystemExit("FAIL: startup import time over budget (run `python -X importtime -m maize_data.cli --help`)")
+    print("OK")
+
+if __name__ == "__main__":
+    main()
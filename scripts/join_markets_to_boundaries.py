@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+import yaml
+
+try:
+    import geopandas  # noqa: F401
+except ImportError as e:
+    raise SystemExit(
+        "Missing dependency: geopandas. Add `geopandas` to requirements.extra.in and run `make install`."
+    ) from e
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from maize_data.spatial import build_index, join_adm1, match_summary  # noqa: E402
+from maize_data.tables import find_table, read_table  # noqa: E402
+
+# Writes a market -> ADM1 lookup for every price source that has market rows:
+#   KAMIS: Market + County (names only)
+#   WFP (HDX): market + latitude/longitude, admin1 as the name fallback
+# Downstream code merges it on (source, market) instead of string-matching counties itself.
+
+def kamis_markets(out_dir: Path) -> pd.DataFrame:
+    kamis_dir = out_dir / "kamis"
+    files = sorted(kamis_dir.glob("kamis_product*.parquet")) or sorted([*kamis_dir.glob("kamis_product*.csv"), *kamis_dir.glob("kamis_product*.csv.zst")])
+    # `products: all` partitions (kamis/all/product_id=<id>/part-0.*)
+    files += [p for d in sorted(kamis_dir.glob("all/product_id=*")) if (p := find_table(d / "part-0.csv")) is not None]
+    if not files:
+        return pd.DataFrame()
+    df = pd.concat([read_table(p, columns=["Market", "County"]) for p in files], ignore_index=True)
+    df = df.rename(columns={"Market": "market", "County": "county"})
+    df["lat"] = df["lon"] = float("nan")
+    df["rows"] = 1
+    return df.assign(source="kamis")
+
+def wfp_markets(out_dir: Path) -> pd.DataFrame:
+    path = find_table(out_dir / "wfp_hdx" / "wfp_food_prices_raw.csv")
+    if path is None:
+        return pd.DataFrame()
+    df = read_table(path, columns=["market", "admin1", "latitude", "longitude"])
+    df = df[~df["market"].astype("string").fillna("").str.startswith("#")]  # HXL tag row (CSV only)
+    df = df.rename(columns={"admin1": "county", "latitude": "lat", "longitude": "lon"})
+    df["lat"] = pd.to_numeric(df["lat"], errors="coerce")
+    df["lon"] = pd.to_numeric(df["lon"], errors="coerce")
+    df["rows"] = 1
+    return df.assign(source="wfp_hdx")
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--config", default="configs/download.yaml")
+    ap.add_argument("--boundaries", default=None, help="Defaults to <out_dir>/boundaries/geoboundaries_KEN_ADM1.zip")
+    ap.add_argument("--out", default="data/market_adm1.csv")
+    ap.add_argument("--max-km", type=float, default=5.0, help="Snap points this close to a polygon that contains none")
+    args = ap.parse_args()
+
+    cfg = yaml.safe_load(Path(args.config).read_text(encoding="utf-8"))
+    out_dir = Path(cfg.get("global", {}).get("out_dir", "data_raw"))
+    zip_path = Path(args.boundaries or out_dir / "boundaries" / "geoboundaries_KEN_ADM1.zip")
+
+    index = build_index(zip_path)
+    prices = pd.concat([kamis_markets(out_dir), wfp_markets(out_dir)], ignore_index=True)
+    if prices.empty:
+        raise SystemExit(f"No KAMIS or WFP price files under {out_dir}")
+
+    # one row per market and location; `rows` keeps how many price records it covers
+    keys = ["source", "market", "county", "lat", "lon"]
+    markets = prices.groupby(keys, dropna=False, sort=True, observed=True, as_index=False)["rows"].sum()
+    joined = join_adm1(markets, index, name_col="county", lat_col="lat", lon_col="lon", max_km=args.max_km)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    joined.to_csv(out, index=False)
+    print(f"✅ Wrote {out} markets={len(joined)} price_rows={int(joined['rows'].sum())} matches={match_summary(joined)}")
+    unmatched = joined[joined["adm1_match"] == ""]
+    if len(unmatched):
+        print(f"Unmatched markets (first 20):\n{unmatched[keys].head(20).to_string(index=False)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,28 @@
 from __future__ import annotations
 import argparse
+import sys
 from pathlib import Path
 import yaml
 
-SOURCE_TO_DIR = {
-    "kamis": "kamis",
-    "kenya_opendata_socrata": "opendata_ke",
-    "hdx_wfp_prices": "wfp_hdx",
-    "worldbank_wdi": "worldbank_wdi",
-    "nasa_power": "nasa_power",
-    "era5_cds": "era5",
-    "geoboundaries_adm1": "boundaries",
-    "spei_urls": "spei_urls",
-    "esa_cci_sm_urls": "esa_cci_sm_urls",
-    "uncomtrade": "uncomtrade",
-}
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from maize_data.validate import format_report, validate  # noqa: E402
+
+# Thin wrapper kept for existing callers; same as `python -m maize_data.cli validate`.
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--config", required=True)
-    ap.add_argument("--out-dir", default="data_raw")
+    ap.add_argument("--out-dir", default=None, help="Defaults to global.out_dir")
+    ap.add_argument("--jobs", type=int, default=None)
+    ap.add_argument("--strict", action="store_true", help="Fail on warnings too")
     args = ap.parse_args()
 
     cfg = yaml.safe_load(Path(args.config).read_text(encoding="utf-8"))
-    sources = cfg.get("sources", {})
-    out = Path(args.out_dir)
-
-    failed = []
-    for name, scfg in sources.items():
-        if not scfg.get("enabled", False):
-            continue
-        subdir = SOURCE_TO_DIR.get(name)
-        if not subdir:
-            continue
-        p = out / subdir
-        has_files = p.exists() and any(x.is_file() for x in p.rglob("*"))
-        if not has_files:
-            failed.append(name)
-
-    if failed:
-        raise SystemExit(f"Enabled sources with no files: {failed}")
-    print("OK: all enabled sources produced at least one file.")
+    result = validate(cfg, out_dir=args.out_dir, jobs=args.jobs)
+    print(format_report(result))
+    if result["errors"] or (args.strict and result["warnings"]):
+        raise SystemExit(1)
 
 if __name__ == "__main__":
     main()
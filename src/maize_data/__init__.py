@@ -1,2 +1,22 @@
 # src/maize_data/__init__.py
-__all__ = []
+from __future__ import annotations
+
+from typing import Any
+
+__all__ = ["load", "adownload", "astart"]
+
+def __getattr__(name: str) -> Any:
+    # public helpers are resolved on first use so `import maize_data` (and plan/status) stays stdlib-only
+    if name == "load":
+        from maize_data.loader import load
+
+        return load
+    if name == "adownload":
+        from maize_data.aio import adownload
+
+        return adownload
+    if name == "astart":
+        from maize_data.aio import start
+
+        return start
+    raise AttributeError(f"module 'maize_data' has no attribute {name!r}")
@@ -0,0 +1,349 @@
+# src/maize_data/aio.py
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable
+
+from maize_data import metrics, throttle
+from maize_data.io import cache_ttl, http_settings, load_yaml, setup_env
+from maize_data.sources import BY_NAME, SOURCES, SourceSpec, enabled_sources
+
+if TYPE_CHECKING:
+    import httpx
+
+    from maize_data.cli import DownloadRun
+
+# asyncio API for orchestrators that already run an event loop:
+#   results = await maize_data.adownload(cfg, sources=["kamis", "nasa_power"])      {source: SourceResult}
+#   d = maize_data.astart(cfg)              # one task per source, all sources at once
+#   async for ev in d: ...                  # Event: start / log / artifact / done / unchanged / failed / cancelled
+#   d.cancel("kamis"); await d.tasks["nasa_power"]; results = await d.wait()
+# A call is one manifest run, recorded exactly like `maize_data download` (metrics, store, snapshots).
+# KAMIS pages, POWER points and URL lists run natively on the loop (arun_* next to each run_*): every unit is a
+# coroutine, so thousands of requests wait on one thread instead of one thread each. The remaining sources make a
+# handful of calls and run their blocking downloader in a worker thread; cancelling one of those stops waiting for it,
+# but the thread finishes the file in progress (writes are atomic either way).
+# All sources share one httpx.AsyncClient (`global.aio.max_connections` connections in total), and every attempt
+# holds a place in its host's adaptive HostBudget, the same one the threaded downloaders use (throttle.py).
+# GETs go through the shared HTTP cache like io.http_session. httpx is needed only here.
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+BACKOFF_MAX = 120.0  # seconds, as urllib3
+
+def new_client(cfg: dict[str, Any]) -> httpx.AsyncClient:
+    try:
+        import httpx
+    except ImportError:
+        raise ImportError("maize_data.aio needs httpx (pip install httpx; listed in requirements.extra.in)") from None
+    n = int((cfg.get("global", {}).get("aio") or {}).get("max_connections", 100))
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=n, max_keepalive_connections=n),
+        timeout=http_settings(cfg)[0],
+        follow_redirects=True,
+    )
+
+def _full_url(url: str, params: dict[str, Any] | None) -> str:
+    # encoded by requests, so cache keys match the ones the threaded sessions store
+    if not params:
+        return url
+    import requests
+
+    p = requests.models.PreparedRequest()
+    p.prepare_url(url, params)
+    return p.url or url
+
+async def _enter(budget: throttle.HostBudget) -> None:
+    t0 = time.perf_counter()
+    while (wait := budget.try_enter()) > 0:
+        await asyncio.sleep(wait)
+    waited = time.perf_counter() - t0
+    if waited > 0.001:
+        metrics.current().add_phase("throttle", waited)
+
+class AsyncSession:
+    """
+    io.http_session for coroutines, over a shared httpx.AsyncClient: GETs retried on 429/5xx honoring Retry-After,
+    each attempt held to (and reported to) its host's budget, metered like MeteredSession, and answered from the
+    HTTP cache when `global.http_cache.enabled` (same entries, ttl and revalidation as CachedSession).
+    """
+
+    def __init__(self, cfg: dict[str, Any], source: str, client: httpx.AsyncClient, log: Callable[[str], None] | None = None) -> None:
+        g = cfg.get("global", {})
+        self.client = client
+        self.timeout = http_settings(cfg)[0]
+        self.retries = int(g.get("http_retries", 3))
+        self.backoff = float(g.get("http_backoff_seconds", 1.0))
+        limits = throttle.throttle_settings(cfg, source)
+        self._budget = lambda url: throttle.host_budget(url, limits, log)
+        self.headers: dict[str, str] = {}
+        encodings = (g.get("compression") or {}).get("accept_encoding")
+        if encodings:
+            # httpx offers every coding it can decode; narrow that like MeteredSession does
+            offered = [e.strip() for e in client.headers.get("Accept-Encoding", "").split(",")]
+            self.headers["Accept-Encoding"] = ", ".join(e for e in map(str, encodings) if e in offered) or "identity"
+
+        self.cache = None
+        c = g.get("http_cache") or {}
+        if c.get("enabled", False):
+            from maize_data.http_cache import shared_cache
+
+            self.ttl = cache_ttl(cfg, source)
+            self.cache = shared_cache(Path(c.get("dir", ".cache/http")), int(float(c.get("max_mb", 2048)) * 1024 * 1024))
+
+    async def get(self, url: str, params: dict[str, Any] | None = None) -> httpx.Response:
+        url = _full_url(url, params)
+        if self.cache is None:
+            return await self._send(url, self.headers)
+
+        from maize_data.http_cache import HttpCache
+
+        key = HttpCache.make_key("GET", url)
+        entry = await asyncio.to_thread(self.cache.get, key)
+        body = await asyncio.to_thread(self.cache.body, key) if entry is not None else None
+        if body is None:
+            entry = None
+        elif time.time() - entry["stored_at"] < self.ttl:
+            metrics.current().observe_cache_hit()
+            return _cached(entry, body)
+
+        headers = dict(self.headers)
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        r = await self._send(url, headers)
+
+        if r.status_code == 304 and entry is not None and body is not None:
+            await asyncio.to_thread(self.cache.touch, key, True)
+            metrics.current().observe_cache_hit()
+            return _cached(entry, body)
+        if r.status_code == 200 and "no-store" not in r.headers.get("Cache-Control", "").lower():
+            await asyncio.to_thread(self.cache.put, key, str(r.url), r.status_code, dict(r.headers), r.content)
+        return r
+
+    @asynccontextmanager
+    async def stream(self, url: str) -> AsyncIterator[httpx.Response]:
+        """GET whose body is read inside the block (never cached); the host slot covers the headers, as with stream=True."""
+        r = await self._send(url, self.headers, stream=True)
+        try:
+            yield r
+        finally:
+            await r.aclose()
+
+    async def _send(self, url: str, headers: dict[str, str], stream: bool = False) -> httpx.Response:
+        import httpx
+
+        from maize_data.sessions import _seconds
+
+        budget = self._budget(url)
+        request = self.client.build_request("GET", url, headers=headers, timeout=self.timeout)
+        start = time.time()
+        t0 = time.perf_counter()
+        attempt = 0
+        while True:
+            await _enter(budget)
+            try:
+                pace = budget.pacer.reserve()
+                if pace > 0:
+                    with metrics.span("throttle"):
+                        await asyncio.sleep(pace)
+                started = time.monotonic()
+                a0 = time.perf_counter()
+                try:
+                    r = await self.client.send(request, stream=stream)
+                except httpx.TransportError:
+                    budget.record(started, None, time.perf_counter() - a0)
+                    if attempt >= self.retries:
+                        raise
+                    delay = None
+                else:
+                    retry_after = _seconds(r.headers.get("Retry-After")) if r.status_code in RETRY_STATUSES else None
+                    budget.record(started, r.status_code, time.perf_counter() - a0, retry_after)
+                    if r.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                        n_bytes = int(r.headers.get("Content-Length") or 0) if stream else r.num_bytes_downloaded
+                        metrics.current().observe_response(r.status_code, n_bytes, time.perf_counter() - t0, start, retries=attempt, url=str(r.url))
+                        return r
+                    await r.aclose()
+                    delay = retry_after
+            finally:
+                budget.leave()
+            attempt += 1
+            await asyncio.sleep(delay if delay is not None else min(BACKOFF_MAX, self.backoff * 2 ** (attempt - 1)))
+
+def _cached(entry: dict[str, Any], body: bytes) -> httpx.Response:
+    import httpx
+
+    return httpx.Response(entry["status"], headers=entry["headers"], content=body, request=httpx.Request("GET", entry["url"]))
+
+@asynccontextmanager
+async def session(
+    cfg: dict[str, Any], source: str, log: Callable[[str], None] | None = None, client: httpx.AsyncClient | None = None
+) -> AsyncIterator[AsyncSession]:
+    """AsyncSession for `source` on `client`; without one, a client of its own is opened and closed around the block."""
+    own = client is None
+    if client is None:
+        client = new_client(cfg)
+    try:
+        yield AsyncSession(cfg, source, client, log)
+    finally:
+        if own:
+            await client.aclose()
+
+@dataclass(frozen=True)
+class Event:
+    kind: str                  # start | log | artifact | done | unchanged | failed | cancelled
+    source: str
+    message: str = ""
+    path: str | None = None    # artifact: file written
+    bytes: int | None = None
+    at: float = field(default_factory=time.time)
+
+@dataclass
+class SourceResult:
+    source: str
+    status: str                # ok | unchanged | failed | cancelled
+    error: str | None = None
+    wall_s: float = 0.0
+    metrics: dict[str, Any] | None = None
+
+class Download:
+    """
+    A download started by start(): `tasks` holds one asyncio task per source (each returns its SourceResult).
+    Iterate it for Events until the run is finalized; `await wait()` for every result.
+    """
+
+    def __init__(self, cfg: dict[str, Any], specs: list[SourceSpec], config_path: Path, config_text: str | None, force: bool, if_changed: bool) -> None:
+        self.cfg = cfg
+        self.if_changed = if_changed and not force
+        self._loop = asyncio.get_running_loop()
+        self._events: asyncio.Queue[Event | None] = asyncio.Queue()
+        self._ready: asyncio.Future[tuple[DownloadRun, httpx.AsyncClient]] = self._loop.create_future()
+        self.tasks: dict[str, asyncio.Task[SourceResult]] = {
+            spec.name: asyncio.create_task(self._source(spec), name=f"maize_data:{spec.name}") for spec in specs
+        }
+        self._main = asyncio.create_task(self._run(config_path, config_text, force))
+
+    def _emit(self, kind: str, source: str, message: str = "", **kwargs: Any) -> None:
+        # downloaders running in worker threads log too
+        self._loop.call_soon_threadsafe(self._events.put_nowait, Event(kind, source, message, **kwargs))
+
+    async def _run(self, config_path: Path, config_text: str | None, force: bool) -> dict[str, SourceResult]:
+        from maize_data.cli import DownloadRun
+
+        args = argparse.Namespace(force=force, no_cache=False, store=False, hash=False, skip_auth=False, shard=None)
+        try:
+            run = await asyncio.to_thread(DownloadRun, args, config_path, self.cfg, None, config_text)
+            client = new_client(self.cfg)
+        except BaseException as e:
+            self._ready.set_exception(e)
+            await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+            self._events.put_nowait(None)
+            raise
+        self._ready.set_result((run, client))
+        try:
+            await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        finally:
+            await client.aclose()
+            run.log("Done.")
+            await asyncio.to_thread(run.close)
+            self._events.put_nowait(None)
+        results = {}
+        for name, task in self.tasks.items():
+            if task.cancelled():
+                results[name] = SourceResult(name, "cancelled")
+            elif task.exception() is not None:
+                results[name] = SourceResult(name, "failed", f"{type(task.exception()).__name__}: {task.exception()}")
+            else:
+                results[name] = task.result()
+        return results
+
+    async def _source(self, spec: SourceSpec) -> SourceResult:
+        import maize_data.downloaders as downloaders
+
+        # shielded: cancelling one source must not cancel the run the others share
+        run, client = await asyncio.shield(self._ready)
+
+        def log(msg: str) -> None:
+            run.log(msg)
+            self._emit("log", spec.name, msg)
+
+        self._emit("start", spec.name)
+        t0 = time.perf_counter()
+        try:
+            fp, run_cfg = await asyncio.to_thread(run.detect, spec) if self.if_changed else (None, run.cfg)
+            if run_cfg is None:
+                await asyncio.to_thread(run.carry_forward, spec, fp)
+                self._emit("unchanged", spec.name)
+                return SourceResult(spec.name, "unchanged", wall_s=round(time.perf_counter() - t0, 3))
+            with metrics.source(spec.name, run_id=run.ctx.run_id) as m:
+                m.on_written = lambda path, n: self._emit("artifact", spec.name, path=str(path), bytes=n)
+                arunner = getattr(downloaders, "a" + spec.runner, None)
+                if arunner is not None:
+                    await arunner(run_cfg, log, client=client, **spec.runner_kwargs)
+                else:
+                    await asyncio.to_thread(getattr(downloaders, spec.runner), run_cfg, log, **spec.runner_kwargs)
+            await asyncio.to_thread(run.finish, spec.name, spec.out_subdir, m, fp)
+        except asyncio.CancelledError:
+            run.log(f"{spec.label}: cancelled")
+            self._emit("cancelled", spec.name)
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            run.log(f"{spec.label}: failed: {error}")
+            self._emit("failed", spec.name, error)
+            return SourceResult(spec.name, "failed", error, round(time.perf_counter() - t0, 3))
+        self._emit("done", spec.name)
+        return SourceResult(spec.name, "ok", wall_s=round(time.perf_counter() - t0, 3), metrics=m.to_dict())
+
+    def cancel(self, source: str | None = None) -> None:
+        """Cancels one source (or every source); the run is still finalized with what finished."""
+        for name, task in self.tasks.items():
+            if source is None or name == source:
+                task.cancel()
+
+    async def wait(self) -> dict[str, SourceResult]:
+        return await asyncio.shield(self._main)
+
+    async def __aiter__(self) -> AsyncIterator[Event]:
+        while (ev := await self._events.get()) is not None:
+            yield ev
+
+def start(
+    config: dict[str, Any] | str | Path = "configs/download.yaml",
+    sources: list[str] | None = None,
+    *,
+    force: bool = False,
+    if_changed: bool = False,
+    skip_auth: bool = False,
+) -> Download:
+    """
+    Starts downloading `sources` (default: every enabled one) on the running event loop. `config` is a config
+    dict or a path to one; `force` and `if_changed` mean what they do for `maize_data download`.
+    """
+    setup_env()
+    if isinstance(config, dict):
+        import yaml
+
+        cfg, config_path, config_text = config, Path("<in-memory>"), yaml.safe_dump(config, sort_keys=True)
+    else:
+        config_path = Path(config)
+        cfg, config_text = load_yaml(config_path), None
+    if sources is None:
+        specs = enabled_sources(cfg)
+    else:
+        unknown = [s for s in sources if s not in BY_NAME or s not in cfg.get("sources", {})]
+        if unknown:
+            raise ValueError(f"unknown or unconfigured source(s): {unknown}")
+        specs = [s for s in SOURCES if s.name in sources]
+    specs = [s for s in specs if not (s.needs_auth and skip_auth)]
+    return Download(cfg, specs, config_path, config_text, force, if_changed)
+
+async def adownload(config: dict[str, Any] | str | Path = "configs/download.yaml", sources: list[str] | None = None, **kwargs: Any) -> dict[str, SourceResult]:
+    """`maize_data download` as a coroutine: every source concurrently, one manifest run; see start()."""
+    return await start(config, sources, **kwargs).wait()
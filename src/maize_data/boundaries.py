@@ -0,0 +1,141 @@
+# src/maize_data/boundaries.py
+from __future__ import annotations
+
+import re
+import zipfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+
+# ADM1 boundary loading shared by scripts/build_points_from_boundaries.py and maize_data.spatial.
+# geopandas is imported inside the functions that need it.
+
+def norm_name(s: str) -> str:
+    s = s.strip().lower()
+    s = s.replace("’", "'")
+    s = re.sub(r"[’']", "", s)           # Murang'a -> muranga
+    s = re.sub(r"[\s\-]+", " ", s)       # Trans-Nzoia -> trans nzoia
+    return re.sub(r"\s+", " ", s).strip()
+
+def slugify(s: str) -> str:
+    s = norm_name(s)
+    s = re.sub(r"[^a-z0-9]+", "_", s)
+    return s.strip("_")
+
+def pick_name_column(gdf: "gpd.GeoDataFrame") -> str:
+    candidates = ["shapeName", "NAME_1", "name", "admin1Name", "ADM1_EN", "ADM1NAME"]
+    for c in candidates:
+        if c in gdf.columns:
+            return c
+    raise RuntimeError(f"Could not find an ADM1 name column. Columns: {list(gdf.columns)}")
+
+def preferred_member(names: list[str]) -> str | None:
+    """
+    The canonical geoBoundaries GeoJSON in a zip listing (not metadata, not simplified).
+    Prefers: geoBoundaries-*-ADM1.geojson
+    """
+    lower = [n.lower().replace("\\", "/") for n in names]
+
+    # 1) Prefer the main ADM1 geojson
+    preferred = None
+    for orig, low in zip(names, lower):
+        if low.endswith(".geojson") and "metadata" not in low and "simplified" not in low:
+            # strongest match: ends with -adm1.geojson
+            if low.endswith("-adm1.geojson"):
+                return orig
+            # otherwise keep as a fallback candidate
+            preferred = preferred or orig
+
+    # 2) If not found, allow simplified geojson (still fine for centroids)
+    if preferred is None:
+        for orig, low in zip(names, lower):
+            if low.endswith(".geojson") and "metadata" not in low:
+                return orig
+    return preferred
+
+# Simplified variants stored next to the full geometry, as (column, tolerance in metres)
+SIMPLIFY_TOLERANCES: list[tuple[str, float]] = [("geom_100m", 100.0), ("geom_500m", 500.0), ("geom_2km", 2000.0)]
+
+def _laea(gdf: "gpd.GeoDataFrame") -> str:
+    """Lambert azimuthal equal-area centred on the layer: areas, centroids and metric tolerances are all exact enough here."""
+    minx, miny, maxx, maxy = gdf.total_bounds
+    return f"+proj=laea +lat_0={(miny + maxy) / 2:.4f} +lon_0={(minx + maxx) / 2:.4f} +datum=WGS84 +units=m +no_defs"
+
+def read_adm1_zip(zip_path: Path) -> "gpd.GeoDataFrame":
+    """Reads the preferred member straight from the zip (GDAL /vsizip/), without extracting it."""
+    import geopandas as gpd
+
+    if not zip_path.exists():
+        raise FileNotFoundError(f"Boundary zip not found: {zip_path}")
+    with zipfile.ZipFile(zip_path, "r") as z:
+        names = z.namelist()
+    member = preferred_member(names)
+    if member is None:
+        raise RuntimeError(f"No usable .geojson found inside {zip_path}. Sample: {names[:30]}")
+    gdf = gpd.read_file(f"zip://{zip_path.resolve()}!{member}")
+    return gdf.to_crs(epsg=4326) if gdf.crs is not None else gdf.set_crs(epsg=4326)
+
+def _prepare(gdf: "gpd.GeoDataFrame", source: str) -> "gpd.GeoDataFrame":
+    import geopandas as gpd
+
+    gdf = gdf.copy()
+    gdf["county_name"] = gdf[pick_name_column(gdf)].astype(str)
+    gdf["id"] = gdf["county_name"].map(slugify)
+
+    crs = _laea(gdf)
+    projected = gdf.geometry.to_crs(crs)
+    cent = gpd.GeoSeries(projected.centroid, crs=crs).to_crs(epsg=4326)
+    gdf["centroid_lat"] = cent.y.astype(float)
+    gdf["centroid_lon"] = cent.x.astype(float)
+    gdf["area_km2"] = (projected.area / 1e6).round(3)
+    for col, tol in SIMPLIFY_TOLERANCES:
+        gdf[col] = gpd.GeoSeries(projected.simplify(tol, preserve_topology=True), crs=crs).to_crs(epsg=4326)
+    gdf["source_zip"] = source
+    return gdf
+
+def load_adm1(zip_path: Path, cache_dir: Path = Path(".cache/boundaries")) -> "gpd.GeoDataFrame":
+    """
+    ADM1 polygons in EPSG:4326 with `county_name`, `id` (slug), equal-area `centroid_lat`/`centroid_lon`,
+    `area_km2` and simplified geometry columns (SIMPLIFY_TOLERANCES).
+    The first call per zip content writes a GeoParquet cache keyed by the zip's sha256; later calls only read it.
+    """
+    import geopandas as gpd
+
+    from maize_data.io import atomic_path
+    from maize_data.manifest import sha256_file
+
+    cache = cache_dir / f"{zip_path.stem}_{sha256_file(zip_path)[:16]}.parquet"
+    if cache.exists():
+        return gpd.read_parquet(cache)
+
+    gdf = _prepare(read_adm1_zip(zip_path), zip_path.name)
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_path(cache) as tmp:
+        gdf.to_parquet(tmp, index=False)
+    return gdf
+
+def build_points(zip_path: Path, out_csv: Path, cache_dir: Path = Path(".cache/boundaries")) -> int:
+    """Writes one point per ADM1 unit (equal-area centroid) in the configs/points.csv layout; returns the row count."""
+    import pandas as pd
+
+    gdf = load_adm1(zip_path, cache_dir)
+    out = pd.DataFrame({
+        "id": gdf["id"],
+        "name": gdf["county_name"],
+        "lat": gdf["centroid_lat"].astype(float),
+        "lon": gdf["centroid_lon"].astype(float),
+    }).sort_values("name").reset_index(drop=True)
+
+    # Sanity check: ids should be unique
+    dup = out["id"][out["id"].duplicated()].unique().tolist()
+    if dup:
+        raise RuntimeError(
+            f"Non-unique ids after slugify. Duplicates: {dup}. "
+            f"Consider appending a suffix for colliding names."
+        )
+
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    out.to_csv(out_csv, index=False)
+    return len(out)
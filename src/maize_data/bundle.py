@@ -0,0 +1,374 @@
+# src/maize_data/bundle.py
+from __future__ import annotations
+
+import io
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Callable, Iterator
+
+from maize_data.compress import TEXT_SUFFIXES
+from maize_data.io import atomic_path
+from maize_data.manifest import latest_file_entries, load_manifest, save_manifest, sha256_file, utc_now_iso
+from maize_data.store import blob_path, store_root
+
+# One file per run for moving downloads to other machines (`maize_data bundle export|import|list`).
+# A bundle holds exactly the artifacts a manifest run recorded, in one sequential write:
+#   MAGIC
+#   member data, back to back: each file cut into `chunk_mb` chunks, each chunk its own zstd frame (with a
+#     checksum); formats that are already compressed (zip, Parquet, .zst, NetCDF, ...) are stored as is
+#   table of contents: zstd JSON {run_id, run (the manifest record), chunk_size, members: [{path, source, bytes,
+#     sha256, modified_utc, codec, offset, chunks: [stored length per chunk]}]}
+#   trailer: <toc offset u64><toc length u64>MAGIC
+# The TOC comes last so export never seeks back or holds more than a few chunks in memory. `Bundle` memory-maps
+# the file and reads one member, or any byte range of it, without unpacking the rest (`open` is seekable, so
+# pandas/pyarrow can read a member straight from the bundle). Import writes members under out_dir, skips files
+# already there with the same sha256, checks every hash, and adds the run to the local manifest.
+
+MAGIC = b"MZBUNDL1"
+TRAILER = struct.Struct("<QQ8s")
+FORMAT_VERSION = 1
+
+def settings(cfg: dict[str, Any]) -> dict[str, Any]:
+    b = cfg.get("global", {}).get("bundle") or {}
+    out_dir = Path(cfg.get("global", {}).get("out_dir", "data_raw"))
+    return {
+        "dir": Path(b.get("dir", out_dir / "_bundles")),
+        "chunk_size": max(1, int(float(b.get("chunk_mb", 4)) * (1 << 20))),
+        "level": int(b.get("level", 3)),
+        "workers": int(b.get("workers") or os.cpu_count() or 1),
+    }
+
+@dataclass
+class Member:
+    path: str
+    source: str
+    bytes: int
+    sha256: str
+    modified_utc: str
+    codec: str  # zstd / none
+    offset: int
+    chunks: list[int]  # stored length of each chunk; every chunk but the last holds chunk_size raw bytes
+    starts: list[int] = field(default_factory=list, repr=False)  # absolute offset of each chunk
+
+    def to_dict(self) -> dict[str, Any]:
+        return {k: getattr(self, k) for k in ("path", "source", "bytes", "sha256", "modified_utc", "codec", "offset", "chunks")}
+
+def _codec(path: str) -> str:
+    return "zstd" if Path(path).suffix.lower() in TEXT_SUFFIXES else "none"
+
+def _safe_rel(path: str) -> Path:
+    rel = Path(path)
+    if rel.is_absolute() or ".." in rel.parts:
+        raise ValueError(f"bundle member {path!r} is not a relative path under out_dir")
+    return rel
+
+_local = threading.local()
+
+def _compress(raw: bytes, level: int) -> bytes:
+    import zstandard
+
+    # one compressor per worker thread and level: a ZstdCompressor must not be shared between threads
+    if not hasattr(_local, "compressors"):
+        _local.compressors = {}
+    if level not in _local.compressors:
+        _local.compressors[level] = zstandard.ZstdCompressor(level=level, write_checksum=True)
+    return _local.compressors[level].compress(raw)
+
+def _stored_chunks(
+    f: IO[bytes], chunk_size: int, codec: str, level: int, pool: Executor, depth: int, on_raw: Callable[[bytes], None]
+) -> Iterator[bytes]:
+    """The chunks of `f` as stored, in order; compression runs on `pool` with up to `depth` chunks in flight."""
+    pending: deque[Any] = deque()
+    while True:
+        raw = f.read(chunk_size)
+        if raw:
+            on_raw(raw)
+            if codec == "none":
+                yield raw
+                continue
+            pending.append(pool.submit(_compress, raw, level))
+        while pending and (not raw or len(pending) >= depth):
+            yield pending.popleft().result()
+        if not raw:
+            return
+
+def _pick_run(manifest: dict[str, Any], run_id: str | None) -> dict[str, Any]:
+    """
+    The run record to pack. "latest" is the newest record of every source, whichever run made it: runs such as
+    `compact` or a serve tick record only some sources. That record gets run_id `<newest run>-latest`.
+    """
+    runs = manifest.get("runs", [])
+    if run_id in (None, "latest"):
+        newest: dict[str, tuple[str, dict[str, Any]]] = {}
+        for r in runs:
+            for name, rec in r.get("sources", {}).items():
+                newest[name] = (r["run_id"], rec)
+        if not newest:
+            raise LookupError("no manifest run has recorded sources")
+        last = max(rid for rid, _ in newest.values())
+        base = next(r for r in runs if r["run_id"] == last)
+        return {
+            **{k: v for k, v in base.items() if k not in ("sources", "notes")},
+            "run_id": f"{last}-latest",
+            "sources_from": {name: rid for name, (rid, _) in sorted(newest.items())},
+            "sources": {name: rec for name, (_, rec) in newest.items()},
+            "notes": [],
+        }
+    run = next((r for r in runs if r["run_id"] == run_id), None)
+    if run is None:
+        raise LookupError(f"{run_id}: not in the manifest")
+    return run
+
+def _artifact_file(out_dir: Path, run_id: str, meta: dict[str, Any]) -> Path:
+    """The run's version of one artifact: its content-store blob when there is one, else the file under out_dir."""
+    if meta.get("sha256"):
+        blob = blob_path(store_root(out_dir), meta["sha256"])
+        if blob.exists():
+            return blob
+    p = out_dir / meta["path"]
+    if not p.exists():
+        raise FileNotFoundError(f"{meta['path']}: recorded by {run_id} but no longer on disk (keep runs with --store)")
+    if p.stat().st_size != int(meta["bytes"]):
+        raise ValueError(f"{meta['path']}: changed since {run_id} (keep runs with --store)")
+    return p
+
+def export_bundle(cfg: dict[str, Any], run_id: str | None = None, out: Path | None = None, log: Callable[[str], None] = print) -> Path:
+    """Writes every artifact recorded by `run_id` (default: the newest record of each source) to one bundle; returns its path."""
+    import hashlib
+
+    opts = settings(cfg)
+    out_dir = Path(cfg.get("global", {}).get("out_dir", "data_raw"))
+    run = _pick_run(load_manifest(out_dir / "_MANIFEST.json"), run_id)
+    rid = run["run_id"]
+    out = out or opts["dir"] / f"{rid}.mzb"
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    members: list[Member] = []
+    raw_total = 0
+    with atomic_path(out) as tmp, tmp.open("wb") as f, ThreadPoolExecutor(opts["workers"], thread_name_prefix="maize_data-bundle") as pool:
+        f.write(MAGIC)
+        pos = len(MAGIC)
+        for source, rec in sorted(run.get("sources", {}).items()):
+            for meta in rec.get("files", []):
+                src = _artifact_file(out_dir, rid, meta)
+                m = Member(meta["path"], source, 0, "", meta.get("modified_utc", ""), _codec(meta["path"]), pos, [])
+                h = hashlib.sha256()
+
+                def on_raw(raw: bytes) -> None:
+                    h.update(raw)
+                    m.bytes += len(raw)
+
+                with src.open("rb") as r:
+                    for chunk in _stored_chunks(r, opts["chunk_size"], m.codec, opts["level"], pool, 2 * opts["workers"], on_raw):
+                        f.write(chunk)
+                        m.chunks.append(len(chunk))
+                        pos += len(chunk)
+                m.sha256 = h.hexdigest()
+                if meta.get("sha256") and meta["sha256"] != m.sha256:
+                    raise ValueError(f"{meta['path']}: changed since {rid} (sha256 differs from the manifest)")
+                members.append(m)
+                raw_total += m.bytes
+
+        toc = {
+            "format": FORMAT_VERSION,
+            "run_id": rid,
+            "created_at": utc_now_iso(),
+            "chunk_size": opts["chunk_size"],
+            "run": run,
+            "members": [m.to_dict() for m in members],
+        }
+        data = _compress(json.dumps(toc, ensure_ascii=False).encode("utf-8"), 19)
+        f.write(data)
+        f.write(TRAILER.pack(pos, len(data), MAGIC))
+    log(f"Bundle: {rid} -> {out} members={len(members)} bytes={raw_total} -> {out.stat().st_size}")
+    return out
+
+class _MemberReader(io.RawIOBase):
+    """Seekable read-only view of one member; decompresses only the chunks that are read (the last one is kept)."""
+
+    def __init__(self, bundle: Bundle, m: Member) -> None:
+        self._b = bundle
+        self._m = m
+        self._pos = 0
+        self._cached: tuple[int, bytes] | None = None
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._m.bytes}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, b: Any) -> int:
+        if self._pos >= self._m.bytes:
+            return 0
+        i = self._pos // self._b.chunk_size
+        if self._cached is None or self._cached[0] != i:
+            self._cached = (i, self._b.chunk(self._m, i))
+        data = self._cached[1]
+        off = self._pos - i * self._b.chunk_size
+        n = min(len(b), len(data) - off)
+        b[:n] = data[off : off + n]
+        self._pos += n
+        return n
+
+class Bundle:
+    """A bundle file opened for reading: `members` by path, `read` / `open` / `chunks` of single members."""
+
+    def __init__(self, path: Path | str) -> None:
+        import zstandard
+
+        self.path = Path(path)
+        self._f = self.path.open("rb")
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._f.close()
+            raise ValueError(f"{self.path}: not a bundle") from None
+        if len(self._mm) < len(MAGIC) + TRAILER.size or self._mm[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path}: not a bundle")
+        toc_offset, toc_len, magic = TRAILER.unpack(self._mm[-TRAILER.size :])
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path}: truncated bundle (no trailer)")
+        self._dctx = zstandard.ZstdDecompressor()
+        toc = json.loads(self._dctx.decompress(self._mm[toc_offset : toc_offset + toc_len]))
+        if toc.get("format") != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{self.path}: bundle format {toc.get('format')} (expected {FORMAT_VERSION})")
+        self.run_id: str = toc["run_id"]
+        self.run: dict[str, Any] = toc["run"]
+        self.created_at: str = toc["created_at"]
+        self.chunk_size: int = toc["chunk_size"]
+        self.members: dict[str, Member] = {}
+        for d in toc["members"]:
+            m = Member(**d)
+            pos = m.offset
+            for n in m.chunks:
+                m.starts.append(pos)
+                pos += n
+            self.members[m.path] = m
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> Bundle:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+        self._f.close()
+
+    def chunk(self, m: Member, i: int) -> bytes:
+        """Raw bytes of chunk `i` of member `m`."""
+        stored = self._mm[m.starts[i] : m.starts[i] + m.chunks[i]]
+        if m.codec == "none":
+            return stored
+        import zstandard
+
+        with self._lock:  # a decompression context is not thread-safe
+            try:
+                return self._dctx.decompress(stored)
+            except zstandard.ZstdError as e:
+                raise ValueError(f"{self.path}: {m.path} chunk {i} is corrupt ({e})") from None
+
+    def chunks(self, path: str) -> Iterator[bytes]:
+        m = self.members[path]
+        for i in range(len(m.chunks)):
+            yield self.chunk(m, i)
+
+    def read(self, path: str) -> bytes:
+        return b"".join(self.chunks(path))
+
+    def open(self, path: str) -> IO[bytes]:
+        """Seekable binary file over one member (e.g. for pd.read_parquet or compress.open_read-style readers)."""
+        return io.BufferedReader(_MemberReader(self, self.members[path]), buffer_size=min(self.chunk_size, 1 << 20))
+
+    def verify(self) -> list[str]:
+        """Paths whose content does not match the TOC sha256 (zstd also checks each chunk's own checksum)."""
+        import hashlib
+
+        bad = []
+        for path, m in self.members.items():
+            h = hashlib.sha256()
+            try:
+                for data in self.chunks(path):
+                    h.update(data)
+            except ValueError:
+                bad.append(path)
+                continue
+            if h.hexdigest() != m.sha256:
+                bad.append(path)
+        return bad
+
+def _present(dest: Path, m: Member, recorded: dict[str, dict[str, Any]]) -> bool:
+    if not dest.is_file() or dest.stat().st_size != m.bytes:
+        return False
+    # like manifest.inputs_sha256: a recorded sha256 is trusted while the size still matches
+    meta = recorded.get(m.path, {})
+    sha = meta.get("sha256") if meta.get("bytes") == m.bytes else None
+    return (sha or sha256_file(dest)) == m.sha256
+
+def import_bundle(cfg: dict[str, Any], path: Path, log: Callable[[str], None] = print) -> dict[str, int]:
+    """
+    Unpacks a bundle under out_dir (members already present with the same sha256 are skipped) and appends its
+    run to the local manifest. Returns counts of written/skipped members and written bytes.
+    """
+    import hashlib
+
+    out_dir = Path(cfg.get("global", {}).get("out_dir", "data_raw"))
+    manifest_path = out_dir / "_MANIFEST.json"
+    recorded = latest_file_entries(manifest_path)
+    stats = {"written": 0, "skipped": 0, "bytes": 0}
+    with Bundle(path) as b:
+        for m in b.members.values():
+            dest = out_dir / _safe_rel(m.path)
+            if _present(dest, m, recorded):
+                stats["skipped"] += 1
+                continue
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            h = hashlib.sha256()
+            with atomic_path(dest) as tmp:
+                with tmp.open("wb") as f:
+                    for data in b.chunks(m.path):
+                        h.update(data)
+                        f.write(data)
+                if h.hexdigest() != m.sha256:
+                    raise ValueError(f"{path}: {m.path} is corrupt (sha256 differs from the bundle index)")
+                if m.modified_utc:
+                    # keep the recorded mtime so the manifest entry still describes the file
+                    t = datetime.fromisoformat(m.modified_utc).timestamp()
+                    os.utime(tmp, (t, t))
+            stats["written"] += 1
+            stats["bytes"] += m.bytes
+
+        manifest = load_manifest(manifest_path)
+        if not any(r["run_id"] == b.run_id for r in manifest["runs"]):
+            run = json.loads(json.dumps(b.run))
+            for rec in run.get("sources", {}).values():
+                for meta in rec.get("files", []):
+                    if meta["path"] in b.members:
+                        meta.setdefault("sha256", b.members[meta["path"]].sha256)
+            run.setdefault("notes", []).append({"at": utc_now_iso(), "note": f"imported from bundle {Path(path).name}"})
+            manifest["runs"].append(run)
+            save_manifest(manifest_path, manifest)
+        log(f"Bundle: {path} -> {out_dir} run={b.run_id} written={stats['written']} skipped={stats['skipped']} bytes={stats['bytes']}")
+    return stats
@@ -0,0 +1,148 @@
+# src/maize_data/changes.py
+from __future__ import annotations
+
+import copy
+import json
+from pathlib import Path
+from typing import Any, Callable
+
+from maize_data.io import http_settings, stat_version, warm
+from maize_data.manifest import load_manifest, sha256_text, utc_now_iso
+from maize_data.sources import BY_NAME
+
+# Pre-flight change detection: one cheap metadata call per source instead of a full download.
+# A probe returns a JSON-able description of the upstream version, or None when the
+# source has no cheap signal (KAMIS, POWER, ERA5, Comtrade) and must fall back to should_skip.
+
+def _session():
+    # Never the HTTP cache: a cached probe would always answer "unchanged".
+    from maize_data.sessions import MeteredSession
+
+    return MeteredSession(retries=2, backoff=0.5)
+
+def _head_validators(session, url: str, timeout: int) -> dict[str, Any]:
+    r = session.head(url, allow_redirects=True, timeout=timeout)
+    r.raise_for_status()
+    h = r.headers
+    out = {k: h.get(k) for k in ("ETag", "Last-Modified", "Content-Length") if h.get(k)}
+    if not out:
+        raise RuntimeError(f"no ETag/Last-Modified/Content-Length for {url}")
+    return out
+
+def _probe_url_list(cfg: dict[str, Any], key: str) -> dict[str, Any] | None:
+    timeout, _ = http_settings(cfg)
+    urls_file = Path(cfg["sources"][key]["urls_file"])
+    urls = [u.strip() for u in urls_file.read_text(encoding="utf-8").splitlines() if u.strip() and not u.strip().startswith("#")]
+    session = _session()
+    return {url: _head_validators(session, url, timeout) for url in urls}
+
+def _probe_geoboundaries(cfg: dict[str, Any]) -> dict[str, Any] | None:
+    from maize_data.downloaders.geoboundaries import API
+
+    timeout, _ = http_settings(cfg)
+    s = cfg["sources"]["geoboundaries_adm1"]
+    api = f"{s.get('api_base', API).rstrip('/')}/{s.get('iso3', 'KEN')}/{s.get('adm', 'ADM1')}/"
+    session = _session()
+    r = session.get(api, timeout=timeout)
+    r.raise_for_status()
+    meta = r.json()
+    url = meta.get("staticDownloadLink") or meta.get("downloadURL") or meta.get("gjDownloadURL")
+    keys = ("boundaryID", "boundaryYearRepresented", "sourceDataUpdateDate", "buildDate", "boundaryUpdate")
+    return {
+        "meta": {k: meta.get(k) for k in keys if k in meta},
+        "url": url,
+        "download": _head_validators(session, url, timeout) if url else None,
+    }
+
+def _probe_ckan(cfg: dict[str, Any]) -> dict[str, Any] | None:
+    from maize_data.downloaders.hdx_ckan import choose_resource, package_show
+
+    timeout, _ = http_settings(cfg)
+    s = cfg["sources"]["hdx_wfp_prices"]
+    base = s.get("base", "https://data.humdata.org").rstrip("/")
+    pkg = package_show(_session(), base, s.get("package_id", "wfp-food-prices"), timeout)
+    res = choose_resource(pkg["result"]["resources"], s.get("country_hint", "Kenya"))
+    return {
+        "resource_id": res.get("id"),
+        "url": res.get("url"),
+        "metadata_modified": res.get("metadata_modified") or pkg["result"].get("metadata_modified"),
+        "last_modified": res.get("last_modified"),
+    }
+
+def _probe_socrata(cfg: dict[str, Any]) -> dict[str, Any] | None:
+    timeout, _ = http_settings(cfg)
+    s = cfg["sources"]["kenya_opendata_socrata"]
+    domain = s.get("domain", "https://www.opendata.go.ke").rstrip("/")
+    r = _session().get(f"{domain}/api/views/{s['dataset_id']}.json", timeout=timeout)
+    r.raise_for_status()
+    view = r.json()
+    if view.get("rowsUpdatedAt") is None:
+        raise RuntimeError("view metadata has no rowsUpdatedAt")
+    return {"rowsUpdatedAt": view["rowsUpdatedAt"], "page_size": s.get("page_size")}
+
+def _probe_wdi(cfg: dict[str, Any]) -> dict[str, Any] | None:
+    from maize_data.downloaders.worldbank_wdi import BASE
+
+    timeout, _ = http_settings(cfg)
+    s = cfg["sources"]["worldbank_wdi"]
+    base = s.get("base_url", BASE).rstrip("/")
+    country = s.get("country", "KEN")
+    session = _session()
+    out = {}
+    for ind in s.get("indicators", []):
+        r = session.get(f"{base}/country/{country}/indicator/{ind}", params={"format": "json", "per_page": 1}, timeout=timeout)
+        r.raise_for_status()
+        meta = r.json()[0]
+        out[ind] = {"lastupdated": meta.get("lastupdated"), "total": meta.get("total")}
+    return out
+
+PROBES: dict[str, Callable[[dict[str, Any]], dict[str, Any] | None]] = {
+    "geoboundaries_adm1": _probe_geoboundaries,
+    "hdx_wfp_prices": _probe_ckan,
+    "kenya_opendata_socrata": _probe_socrata,
+    "worldbank_wdi": _probe_wdi,
+    "spei_urls": lambda cfg: _probe_url_list(cfg, "spei_urls"),
+    "esa_cci_sm_urls": lambda cfg: _probe_url_list(cfg, "esa_cci_sm_urls"),
+}
+
+def probe(cfg: dict[str, Any], source_name: str) -> dict[str, Any] | None:
+    """Returns {"fingerprint": sha256, "detail": {...}} or None if the source has no probe."""
+    fn = PROBES.get(source_name)
+    if fn is None:
+        return None
+    detail = fn(cfg)
+    if detail is None:
+        return None
+    # The source's params are part of the fingerprint: changing the config must also trigger a refetch.
+    params = {k: v for k, v in cfg["sources"].get(source_name, {}).items() if k != "enabled"}
+    text = json.dumps({"upstream": detail, "params": params}, sort_keys=True, default=str)
+    return {"fingerprint": sha256_text(text), "detail": detail, "checked_at": utc_now_iso()}
+
+def last_fingerprint(manifest_path: Path, source_name: str) -> dict[str, Any] | None:
+    """Fingerprint record of the latest run that stored one for this source (plus its run_id)."""
+
+    def build() -> dict[str, dict[str, Any]]:
+        latest: dict[str, dict[str, Any]] = {}
+        for run in load_manifest(manifest_path).get("runs", []):
+            for name, rec in run.get("sources", {}).items():
+                if rec.get("fingerprint"):
+                    latest[name] = {**rec["fingerprint"], "run_id": run["run_id"]}
+        return latest
+
+    fp = warm("fingerprints", str(manifest_path), build, version=stat_version(manifest_path)).get(source_name)
+    return dict(fp) if fp else None
+
+def forced_cfg(cfg: dict[str, Any], source_name: str, previous: dict[str, Any] | None, current: dict[str, Any]) -> dict[str, Any]:
+    """
+    Config copy that makes the downloader refetch a changed source. URL lists ignore force_download
+    (files are large), so only the URLs whose validators changed are listed in refetch_urls.
+    Cached responses are revalidated rather than served as fresh: the probe just said they are not.
+    """
+    out = copy.deepcopy(cfg)
+    out["global"]["force_download"] = True
+    out["global"]["http_cache"] = {**(out["global"].get("http_cache") or {}), "revalidate": True}
+    spec = BY_NAME[source_name]
+    if spec.runner == "run_url_list":
+        before = (previous or {}).get("detail") or {}
+        out["sources"][source_name]["refetch_urls"] = [u for u, v in current["detail"].items() if before.get(u) != v]
+    return out
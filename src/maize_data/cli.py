@@ -2,21 +2,13 @@
 from __future__ import annotations
 
 import argparse
+import threading
 from pathlib import Path
 
-from maize_data.io import load_yaml, setup_env, make_logger
-from maize_data.manifest import start_run, record_source, end_run, append_note
-from maize_data.downloaders import (
-    run_kamis,
-    run_opendata_ke_socrata,
-    run_hdx_ckan_wfp_prices,
-    run_worldbank_wdi,
-    run_nasa_power,
-    run_era5_cds,
-    run_geoboundaries_adm1,
-    run_url_list,
-    run_uncomtrade_template,
-)
+from maize_data.io import in_shard, load_yaml, parse_shard, setup_env, make_logger
+from maize_data.manifest import start_run, record_source, end_run, append_note, merge_shards, shard_fragment_path
+from maize_data import changes, metrics, store
+from maize_data.sources import enabled_sources
 
 def main() -> None:
     p = argparse.ArgumentParser(prog="maize_data")
@@ -27,97 +19,576 @@ def main() -> None:
     d.add_argument("--skip-auth", action="store_true", help="Skip sources that usually need accounts/keys (e.g., ERA5)")
     d.add_argument("--force", action="store_true", help="Re-download even if output files already exist")
     d.add_argument("--hash", action="store_true", help="Compute sha256 for files in manifest (slower)")
+    d.add_argument("--store", action="store_true", help="Keep a content-addressed copy of this run under <out_dir>/_store (implies --hash)")
+    d.add_argument("--no-cache", action="store_true", help="Bypass the on-disk HTTP cache (global.http_cache)")
+    d.add_argument(
+        "--if-changed",
+        action="store_true",
+        help="Probe upstream metadata first; skip sources whose fingerprint matches the last run (global.change_detection)",
+    )
+    d.add_argument(
+        "--shard",
+        type=str,
+        default=None,
+        metavar="i/N",
+        help="Run only this worker's share of the work units (points, years, URLs, products); writes _shards/shard-i-of-N.json",
+    )
+
+    sv = sub.add_parser("serve", help="Stay resident and refresh each source on its own cadence (global.serve), with a status endpoint")
+    sv.add_argument("--config", required=True, type=str)
+    sv.add_argument("--skip-auth", action="store_true", help="Do not schedule sources that usually need accounts/keys")
+    sv.add_argument("--hash", action="store_true", help="Compute sha256 for files in manifest (slower)")
+    sv.add_argument("--store", action="store_true", help="Keep a content-addressed copy of each run under <out_dir>/_store (implies --hash)")
+    sv.add_argument("--no-cache", action="store_true", help="Bypass the on-disk HTTP cache (global.http_cache)")
+    sv.add_argument("--port", type=int, default=None, help="Status endpoint port (default: serve.port or 8765; 0 disables it)")
+
+    mm = sub.add_parser("merge-manifests", help="Combine the manifest fragments of a sharded download into one run")
+    mm.add_argument("--config", required=True, type=str)
+    mm.add_argument("--allow-partial", action="store_true", help="Merge even if some of the N shards have no fragment")
+    mm.add_argument("--keep", action="store_true", help="Keep the fragments after merging")
+
+    cp = sub.add_parser("compact", help="Recompress text artifacts unchanged for more than N runs to .zst (recorded as a new run)")
+    cp.add_argument("--config", required=True, type=str)
+    cp.add_argument("--keep-runs", type=int, default=None, help="Leave files written in the last N runs (default: compression.keep_runs or 3)")
+    cp.add_argument("--hash", action="store_true", help="Compute sha256 for files in the manifest run")
+    cp.add_argument("--dry-run", action="store_true")
+
+    sn = sub.add_parser("snapshots", help="List row-level snapshot chains (global.snapshots): base/delta per run with inserts/updates/deletes")
+    sn.add_argument("--config", required=True, type=str)
+    sn.add_argument("--json", action="store_true")
+
+    rs = sub.add_parser("restore", help="Rebuild a table as it was after a given run from its snapshot chain")
+    rs.add_argument("--config", required=True, type=str)
+    rs.add_argument("--artifact", required=True, type=str, help="Artifact path under out_dir, as listed by `snapshots`")
+    rs.add_argument("--run", type=str, default=None, help="run_id to rebuild (default: the latest snapshot)")
+    rs.add_argument("--out", required=True, type=str, help="Output file (.csv or .parquet)")
+
+    bu = sub.add_parser("bundle", help="Pack one run's recorded artifacts into an indexed archive for transfer, or unpack one")
+    ba = bu.add_subparsers(dest="action", required=True)
+    be = ba.add_parser("export", help="Write every artifact a manifest run recorded to one bundle (global.bundle)")
+    be.add_argument("run_id", nargs="?", default="latest", help="run_id to pack (default: the latest run that recorded sources)")
+    be.add_argument("--config", required=True, type=str)
+    be.add_argument("--out", type=str, default=None, help="Bundle file (default: bundle.dir/<run_id>.mzb)")
+    bi = ba.add_parser("import", help="Unpack a bundle under out_dir, skipping files already there, and add its run to the manifest")
+    bi.add_argument("bundle", type=str)
+    bi.add_argument("--config", required=True, type=str)
+    bl = ba.add_parser("list", help="Show a bundle's run and members (reads only the index)")
+    bl.add_argument("bundle", type=str)
+    bl.add_argument("--verify", action="store_true", help="Also check every member against its sha256")
+    bl.add_argument("--json", action="store_true")
+
+    g = sub.add_parser("gc", help="Delete content-store blobs and run views no manifest run references")
+    g.add_argument("--config", required=True, type=str)
+    g.add_argument("--dry-run", action="store_true")
+
+    # plan/status only stat files and read the manifest: no network, no pandas
+    pl = sub.add_parser("plan", help="Show what a download would fetch or skip (no network)")
+    pl.add_argument("--config", required=True, type=str)
+    pl.add_argument("--force", action="store_true")
+    pl.add_argument("--skip-auth", action="store_true")
+    pl.add_argument("--json", action="store_true")
+
+    st = sub.add_parser("status", help="Show per-source artifacts and freshness (no network)")
+    st.add_argument("--config", required=True, type=str)
+    st.add_argument("--json", action="store_true")
+
+    v = sub.add_parser("validate", help="Check every downloaded artifact's content against its source rules and the manifest")
+    v.add_argument("--config", required=True, type=str)
+    v.add_argument("--out-dir", type=str, default=None, help="Defaults to global.out_dir")
+    v.add_argument("--jobs", type=int, default=None, help="Worker processes (default: global.validation.jobs or CPU count)")
+    v.add_argument("--strict", action="store_true", help="Fail on warnings too")
+    v.add_argument("--verbose", action="store_true", help="List files that passed")
+    v.add_argument("--json", action="store_true")
+
+    pn = sub.add_parser("panel", help="Build the normalized price panel, rebuilding only partitions whose inputs changed")
+    pn.add_argument("--config", required=True, type=str)
+    pn.add_argument("--out", type=str, default=None, help="Panel directory (default: panel.dir or data/price_panel)")
+    pn.add_argument("--force", action="store_true", help="Rebuild every partition")
+
+    ft = sub.add_parser("features", help="Build cached weather features (rolling, GDD, anomalies, weekly/monthly) from NASA POWER")
+    ft.add_argument("--config", required=True, type=str)
+    ft.add_argument("--force", action="store_true", help="Recompute even if a cache for the same inputs exists")
+
+    pp = sub.add_parser("pipeline", help="Run sources and derived stages (points, features, panel) whose inputs changed")
+    pp.add_argument("--config", required=True, type=str)
+    pp.add_argument("--jobs", type=int, default=None, help="Stages run in parallel (default: global.pipeline.jobs or 4)")
+    pp.add_argument("--stage", action="append", default=[], help="Force this stage to run (repeatable)")
+    pp.add_argument("--force", action="store_true", help="Run every stage and re-download even if output files exist")
+    pp.add_argument("--if-changed", action="store_true", help="Probe upstream for every source; downstream reruns only on new content")
+    pp.add_argument("--dry-run", action="store_true", help="Show which stages would run")
+    pp.add_argument("--skip-auth", action="store_true")
+    pp.add_argument("--hash", action="store_true")
+    pp.add_argument("--store", action="store_true")
+    pp.add_argument("--no-cache", action="store_true")
 
     args = p.parse_args()
+
+    if args.cmd == "gc":
+        run_gc(args)
+    elif args.cmd == "plan":
+        run_plan(args)
+    elif args.cmd == "status":
+        run_status(args)
+    elif args.cmd == "validate":
+        run_validate(args)
+    elif args.cmd == "panel":
+        run_panel(args)
+    elif args.cmd == "features":
+        run_features(args)
+    elif args.cmd == "pipeline":
+        run_pipeline(args)
+    elif args.cmd == "merge-manifests":
+        run_merge_manifests(args)
+    elif args.cmd == "compact":
+        run_compact(args)
+    elif args.cmd == "snapshots":
+        run_snapshots(args)
+    elif args.cmd == "restore":
+        run_restore(args)
+    elif args.cmd == "serve":
+        run_serve(args)
+    elif args.cmd == "bundle":
+        run_bundle(args)
+    else:
+        run_download(args)
+
+class DownloadRun:
+    """
+    One manifest run shared by `download` and `pipeline`: each source is fetched under its own metrics
+    scope and then snapshotted into the manifest (and the content store). Safe to use from several threads.
+    """
+
+    def __init__(self, args: argparse.Namespace, config_path: Path, cfg: dict, log=None, config_text: str | None = None) -> None:
+        self.cfg = cfg
+        g = cfg.setdefault("global", {})
+        g["force_download"] = bool(args.force)
+        if args.no_cache:
+            g["http_cache"] = {**(g.get("http_cache") or {}), "enabled": False}
+
+        # a long-lived caller (serve) passes its own logger and keeps it open across runs
+        self._own_log = log is None
+        self.log = log or make_logger(
+            g.get("log_dir", "logs"),
+            max_mb=float(g.get("log_max_mb", 20)),
+            backups=int(g.get("log_backups", 5)),
+        )
+        self.out_dir = Path(g.get("out_dir", "data_raw"))
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+        self.use_store = bool(args.store or g.get("content_store", False))
+        self.hash_files = bool(args.hash or self.use_store)
+        self.store_dir = store.store_root(self.out_dir)
+        self.history_path = self.out_dir / "_MANIFEST.json"
+        self.manifest_path = self.history_path
+        if getattr(args, "shard", None):
+            if self.use_store:
+                raise SystemExit("--shard cannot be combined with the content store; snapshot after merge-manifests instead")
+            try:
+                index, count = parse_shard(args.shard)
+            except ValueError as e:
+                raise SystemExit(str(e)) from None
+            g["shard"] = {"index": index, "count": count}
+            # shards never write the shared manifest; merge-manifests folds the fragments into it
+            self.manifest_path = shard_fragment_path(self.out_dir, index, count)
+        # row-level history (snapshots.py); shards leave it to the run that merges their fragments
+        from maize_data.snapshots import settings as snapshot_settings
+
+        snap_opts = snapshot_settings(cfg)
+        self.snapshots = snap_opts if snap_opts["enabled"] and self.manifest_path == self.history_path else None
+        self.ctx = start_run(
+            manifest_path=self.manifest_path,
+            config_path=config_path,
+            config_text=config_text if config_text is not None else config_path.read_text(encoding="utf-8"),
+            skip_auth=bool(args.skip_auth),
+            force=bool(args.force),
+            hash_files=self.hash_files,
+            content_store=self.use_store,
+        )
+        self.log.set_context(run_id=self.ctx.run_id)
+        self.log(f"Manifest run_id={self.ctx.run_id} -> {self.manifest_path}")
+
+        self.sources = cfg.get("sources", {})
+        self.log_dir = Path(g.get("log_dir", "logs"))
+        self.collected: list[metrics.SourceMetrics] = []
+        self._lock = threading.Lock()  # the manifest is read-modify-write JSON
+
+    def snap(
+        self,
+        source_name: str,
+        source_out_subdir: str,
+        m: metrics.SourceMetrics | None = None,
+        fingerprint: dict | None = None,
+    ) -> None:
+        """Record the current state of files for this source into the manifest."""
+        with self._lock:
+            payload = record_source(
+                manifest_path=self.manifest_path,
+                run_id=self.ctx.run_id,
+                source_name=source_name,
+                source_params=self.sources.get(source_name, {}),
+                base_out_dir=self.out_dir,
+                source_out_dir=self.out_dir / source_out_subdir,
+                hash_files=self.hash_files,
+                metrics=m.to_dict() if m is not None else None,
+                fingerprint=fingerprint,
+            )
+            if self.use_store:
+                new_bytes = store.snapshot_source(self.store_dir, self.out_dir, self.ctx.run_id, payload["files"])
+                self.log(f"Store: {source_name} files={payload['file_count']} new_bytes={new_bytes}")
+            if self.snapshots and source_name in self.snapshots["sources"]:
+                from maize_data.snapshots import snapshot_source
+
+                try:
+                    snapshot_source(self.cfg, source_name, self.ctx.run_id, payload["files"], self.log)
+                except Exception as e:
+                    # history is best-effort; the download itself is recorded already
+                    self.log(f"Snapshots: {source_name} failed: {type(e).__name__}: {e}")
+
+    def fetch(self, source_name: str, source_out_subdir: str, runner, run_cfg=None, fingerprint=None, **kwargs) -> None:
+        """Run one downloader under its own metrics scope, then snapshot it."""
+        with metrics.source(source_name, run_id=self.ctx.run_id) as m:
+            runner(run_cfg or self.cfg, self.log, **kwargs)
+        self.finish(source_name, source_out_subdir, m, fingerprint)
+
+    def finish(self, source_name: str, source_out_subdir: str, m: metrics.SourceMetrics, fingerprint=None) -> None:
+        """After a source's downloader returned: keep and log its metrics, then snapshot it."""
+        with self._lock:
+            self.collected.append(m)
+            metrics.write_spans(self.log_dir / "spans.jsonl", m)
+        d = m.to_dict()
+        self.log(
+            f"Metrics: {source_name} wall={d['wall_s']}s phases={d['phases_s']} requests={d['requests']} "
+            f"retries={d['retries']} cache_hits={d['cache_hits']} recv={d['bytes_received']} "
+            f"written={d['bytes_written']} rows={d['rows']}"
+        )
+        self.snap(source_name, source_out_subdir, m, fingerprint=fingerprint)
+
+    def detect(self, spec) -> tuple[dict | None, dict | None]:
+        """
+        Change detection for one source: (fingerprint, config to run with).
+        A None config means upstream is unchanged and the artifacts are on disk.
+        """
+        cfg = self.cfg
+        try:
+            fp = changes.probe(cfg, spec.name)
+        except Exception as e:
+            self.log(f"Changes: {spec.name} probe failed ({type(e).__name__}: {e}); running normally")
+            return None, cfg
+        if fp is None:
+            return None, cfg
+        prev = changes.last_fingerprint(self.history_path, spec.name)
+        present = any(p.is_file() for p in (self.out_dir / spec.out_subdir).rglob("*"))
+        if prev is None or not present:
+            self.log(f"Changes: {spec.name} fingerprint={fp['fingerprint'][:12]} (no usable previous run)")
+            return fp, cfg
+        if prev["fingerprint"] == fp["fingerprint"]:
+            return fp, None
+        self.log(f"Changes: {spec.name} changed since {prev['run_id']}; refetching")
+        return fp, changes.forced_cfg(cfg, spec.name, prev, fp)
+
+    def carry_forward(self, spec, fp: dict) -> None:
+        """Records an unchanged source without fetching it."""
+        self.log(f"Skipping {spec.label} (unchanged upstream, fingerprint={fp['fingerprint'][:12]}).")
+        append_note(self.manifest_path, self.ctx.run_id, f"Skipped {spec.name}: upstream fingerprint unchanged.")
+        # re-record so the files and fingerprint carry forward into this run
+        self.snap(spec.name, spec.out_subdir, fingerprint=fp)
+
+    def run_source(self, spec, if_changed: bool = False) -> None:
+        """Detect (optionally), then fetch or carry forward one source."""
+        import maize_data.downloaders as downloaders
+
+        fp, run_cfg = self.detect(spec) if if_changed else (None, self.cfg)
+        if run_cfg is None:
+            self.carry_forward(spec, fp)
+            return
+        self.fetch(spec.name, spec.out_subdir, getattr(downloaders, spec.runner), run_cfg, fp, **spec.runner_kwargs)
+
+    def close(self) -> None:
+        if self.collected:
+            prom_path = Path(self.cfg["global"].get("metrics_textfile") or self.log_dir / "maize_data.prom")
+            metrics.write_prometheus(prom_path, self.ctx.run_id, self.collected)
+            self.log(f"Metrics: wrote {prom_path}")
+        from maize_data import throttle
+
+        for host, t in throttle.summary().items():
+            p95 = "n/a" if t["best_p95_s"] is None else f"{t['best_p95_s']}s"
+            self.log(f"Throttle: {host} final limit={t['limit']} cuts={t['cuts']} best_p95={p95}")
+        end_run(self.manifest_path, self.ctx.run_id)
+        self.log(f"Manifest finalized for run_id={self.ctx.run_id}")
+        if self._own_log:
+            self.log.close()
+
+def run_download(args: argparse.Namespace) -> None:
     setup_env()
 
     config_path = Path(args.config)
-    config_text = config_path.read_text(encoding="utf-8")
+    run = DownloadRun(args, config_path, load_yaml(config_path))
+    # --force already refetches everything, so probing would only cost requests
+    if_changed = bool(args.if_changed or run.cfg["global"].get("change_detection", False)) and not args.force
+
+    try:
+        for spec in enabled_sources(run.cfg):
+            if spec.needs_auth and args.skip_auth:
+                run.log(f"Skipping {spec.label} (skip-auth enabled).")
+                append_note(run.manifest_path, run.ctx.run_id, f"Skipped {spec.name} because --skip-auth was set.")
+                continue
+            if not spec.shard_unit and not in_shard(run.cfg, f"source:{spec.name}"):
+                continue  # indivisible source owned by another shard
+            run.run_source(spec, if_changed)
+
+        run.log("Done.")
+    finally:
+        run.close()
+
+def run_pipeline(args: argparse.Namespace) -> None:
+    from maize_data import pipeline
+
+    setup_env()
+    config_path = Path(args.config)
     cfg = load_yaml(config_path)
+    g = cfg.setdefault("global", {})
+    out_dir = Path(g.get("out_dir", "data_raw"))
+    if_changed = bool(args.if_changed or g.get("change_detection", False)) and not args.force
+    specs = [s for s in enabled_sources(cfg) if not (s.needs_auth and args.skip_auth)]
 
-    # global knobs
-    cfg.setdefault("global", {})
-    cfg["global"]["force_download"] = bool(args.force)
+    # the manifest run (and its log) is only opened once a source actually has to run
+    lock = threading.Lock()
+    holder: list[DownloadRun] = []
 
-    log = make_logger(cfg["global"].get("log_dir", "logs"))
+    def downloads() -> DownloadRun:
+        with lock:
+            if not holder:
+                holder.append(DownloadRun(args, config_path, cfg))
+            return holder[0]
 
-    out_dir = Path(cfg["global"].get("out_dir", "data_raw"))
-    out_dir.mkdir(parents=True, exist_ok=True)
+    def log(msg: str) -> None:
+        if holder:
+            holder[0].log(msg)
+        else:
+            with lock:
+                print(msg, flush=True)
 
-    manifest_path = out_dir / "_MANIFEST.json"
-    ctx = start_run(
-        manifest_path=manifest_path,
-        config_path=config_path,
-        config_text=config_text,
-        skip_auth=bool(args.skip_auth),
-        force=bool(args.force),
-        hash_files=bool(args.hash),
-    )
-    log(f"Manifest run_id={ctx.run_id} -> {manifest_path}")
+    stages = pipeline.build_stages(cfg, specs, lambda spec: downloads().run_source(spec, if_changed), log=log)
+    unknown = set(args.stage) - set(stages)
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {sorted(unknown)}. Stages: {pipeline.topo_order(stages)}")
+    # with --if-changed every source is offered to its upstream probe; unchanged ones skip cheaply
+    force: set[str] | bool = True if args.force else set(args.stage) | ({s.name for s in specs} if if_changed else set())
+    jobs = int(args.jobs or (g.get("pipeline") or {}).get("jobs", 4))
 
-    sources = cfg.get("sources", {})
+    try:
+        result = pipeline.run_pipeline(stages, out_dir, jobs=jobs, force=force, dry_run=args.dry_run, log=log)
+    finally:
+        if holder:
+            holder[0].close()
+    for name, status in result.items():
+        deps = ", ".join(stages[name].deps)
+        print(f"{status:<8} {name}" + (f"  <- {deps}" if deps else ""))
+    if any(v in ("failed", "blocked") for v in result.values()):
+        raise SystemExit(1)
 
-    def enabled(name: str) -> bool:
-        return bool(sources.get(name, {}).get("enabled", False))
+def run_serve(args: argparse.Namespace) -> None:
+    from maize_data import serve
 
-    def snap(source_name: str, source_out_subdir: str) -> None:
-        """Record the current state of files for this source into the manifest."""
-        record_source(
-            manifest_path=manifest_path,
-            run_id=ctx.run_id,
-            source_name=source_name,
-            source_params=sources.get(source_name, {}),
-            base_out_dir=out_dir,
-            source_out_dir=out_dir / source_out_subdir,
-            hash_files=bool(args.hash),
-        )
+    setup_env()
+    config_path = Path(args.config)
+    cfg = load_yaml(config_path)
+    g = cfg.setdefault("global", {})
+    if args.port is not None:
+        g["serve"] = {**(g.get("serve") or {}), "port": args.port}
+    # every scheduled run refetches what is due; no sharding in a resident process
+    args.force, args.shard = True, None
+    log = make_logger(g.get("log_dir", "logs"), max_mb=float(g.get("log_max_mb", 20)), backups=int(g.get("log_backups", 5)))
+    try:
+        serve.serve(args, config_path, cfg, log)
+    finally:
+        log.close()
+
+def run_merge_manifests(args: argparse.Namespace) -> None:
+    import re
+    import shutil
+
+    cfg = load_yaml(Path(args.config))
+    out_dir = Path(cfg.get("global", {}).get("out_dir", "data_raw"))
+    frag_dir = out_dir / "_shards"
+    frags = sorted(frag_dir.glob("shard-*-of-*.json")) if frag_dir.exists() else []
+    if not frags:
+        raise SystemExit(f"No shard fragments under {frag_dir}")
+    parsed = [re.fullmatch(r"shard-(\d+)-of-(\d+)\.json", p.name) for p in frags]
+    counts = {int(m.group(2)) for m in parsed if m}
+    if len(counts) != 1:
+        raise SystemExit(f"Fragments from different shard counts: {sorted(counts)}")
+    n = counts.pop()
+    missing = sorted(set(range(1, n + 1)) - {int(m.group(1)) for m in parsed if m})
+    if missing and not args.allow_partial:
+        raise SystemExit(f"Missing fragments for shard(s) {missing} of {n} (use --allow-partial to merge anyway)")
+
+    merged = merge_shards(out_dir / "_MANIFEST.json", frags)
+    files = sum(r["file_count"] for r in merged["sources"].values())
+    print(f"✅ Merged {len(merged['shards'])}/{n} shards into run_id={merged['run_id']} sources={len(merged['sources'])} files={files}")
+    from maize_data import snapshots
 
+    opts = snapshots.settings(cfg)
+    if opts["enabled"]:
+        for source, rec in merged["sources"].items():
+            if source in opts["sources"]:
+                snapshots.snapshot_source(cfg, source, merged["run_id"], rec["files"])
+    if not args.keep:
+        shutil.rmtree(frag_dir)
+
+def run_compact(args: argparse.Namespace) -> None:
+    from maize_data import compress
+    from maize_data.manifest import load_manifest
+    from maize_data.sources import BY_NAME
+
+    config_path = Path(args.config)
+    cfg = load_yaml(config_path)
+    out_dir = Path(cfg.get("global", {}).get("out_dir", "data_raw"))
+    opts = compress.settings(cfg)
+    keep = opts["keep_runs"] if args.keep_runs is None else int(args.keep_runs)
+    todo = compress.compact_candidates(load_manifest(out_dir / "_MANIFEST.json")["runs"], out_dir, keep)
+    before = sum(p.stat().st_size for _, p in todo)
+    if args.dry_run or not todo:
+        for _, p in todo:
+            print(f"would compress {p} ({p.stat().st_size} bytes)")
+        print(f"Compact: {len(todo)} files ({before} bytes) unchanged for more than {keep} runs")
+        return
+
+    # the renames go into the manifest as a run of their own, so validate and --store see the .zst files
+    run = DownloadRun(argparse.Namespace(force=False, no_cache=False, store=False, hash=args.hash, skip_auth=False), config_path, cfg)
+    after = 0
     try:
-        # PRICES
-        if enabled("kamis"):
-            run_kamis(cfg, log); snap("kamis", "kamis")
-        if enabled("kenya_opendata_socrata"):
-            run_opendata_ke_socrata(cfg, log); snap("kenya_opendata_socrata", "opendata_ke")
-        if enabled("hdx_wfp_prices"):
-            run_hdx_ckan_wfp_prices(cfg, log); snap("hdx_wfp_prices", "wfp_hdx")
-
-        # MACRO
-        if enabled("worldbank_wdi"):
-            run_worldbank_wdi(cfg, log); snap("worldbank_wdi", "worldbank_wdi")
-
-        # WEATHER
-        if enabled("nasa_power"):
-            run_nasa_power(cfg, log); snap("nasa_power", "nasa_power")
-
-        if enabled("era5_cds"):
-            if args.skip_auth:
-                log("Skipping ERA5 (skip-auth enabled).")
-                append_note(manifest_path, ctx.run_id, "Skipped era5_cds because --skip-auth was set.")
-            else:
-                run_era5_cds(cfg, log); snap("era5_cds", "era5")
-
-        # SPATIAL
-        if enabled("geoboundaries_adm1"):
-            run_geoboundaries_adm1(cfg, log); snap("geoboundaries_adm1", "boundaries")
-
-        # URL-list sources
-        if enabled("spei_urls"):
-            run_url_list(cfg, log, key="spei_urls"); snap("spei_urls", "spei_urls")
-        if enabled("esa_cci_sm_urls"):
-            run_url_list(cfg, log, key="esa_cci_sm_urls"); snap("esa_cci_sm_urls", "esa_cci_sm_urls")
-
-        # TRADE template
-        if enabled("uncomtrade"):
-            if args.skip_auth:
-                log("Skipping UN Comtrade (skip-auth enabled).")
-                append_note(manifest_path, ctx.run_id, "Skipped uncomtrade because --skip-auth was set.")
+        for _, p in todo:
+            size = p.stat().st_size
+            out = compress.compress_file(p, opts["compact_level"])
+            after += out.stat().st_size
+            run.log(f"Compact: {p} -> {out.name} {size} -> {out.stat().st_size} bytes")
+        for source in sorted({s for s, _ in todo}):
+            run.snap(source, BY_NAME[source].out_subdir)
+        append_note(run.manifest_path, run.ctx.run_id, f"compact: {len(todo)} files, {before} -> {after} bytes (keep_runs={keep})")
+    finally:
+        run.close()
+    print(f"✅ Compacted {len(todo)} files: {before} -> {after} bytes")
+
+def run_snapshots(args: argparse.Namespace) -> None:
+    import json
+
+    from maize_data.snapshots import list_chains
+
+    chains = list_chains(load_yaml(Path(args.config)))
+    if args.json:
+        print(json.dumps(chains, indent=2))
+        return
+    for c in chains:
+        print(c["artifact"])
+        for e in c["entries"]:
+            change = f"+{e['inserts']} ~{e['updates']} -{e['deletes']}" if e["kind"] == "delta" else ""
+            print(f"  {e['run_id']}  {e['kind']:<5}  rows={e['rows']:<8} {change}")
+    if not chains:
+        print("No snapshots (enable global.snapshots and download)")
+
+def run_restore(args: argparse.Namespace) -> None:
+    from maize_data import snapshots
+
+    cfg = load_yaml(Path(args.config))
+    try:
+        df = snapshots.restore(cfg, args.artifact, args.run)
+    except (LookupError, ValueError) as e:
+        raise SystemExit(str(e)) from None
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if out.suffix == ".parquet":
+        df.to_parquet(out, engine="pyarrow", compression="zstd", index=False)
+    else:
+        df.to_csv(out, index=False)
+    print(f"✅ {args.artifact} as of {args.run or 'latest'} -> {out} rows={len(df)}")
+
+def run_bundle(args: argparse.Namespace) -> None:
+    import json
+
+    from maize_data import bundle
+
+    if args.action == "list":
+        try:
+            b = bundle.Bundle(args.bundle)
+        except (OSError, ValueError) as e:
+            raise SystemExit(str(e)) from None
+        with b:
+            bad = b.verify() if args.verify else []
+            if args.json:
+                print(json.dumps({"run_id": b.run_id, "created_at": b.created_at, "members": [m.to_dict() for m in b.members.values()], "corrupt": bad}, indent=2))
             else:
-                run_uncomtrade_template(cfg, log); snap("uncomtrade", "uncomtrade")
+                print(f"{b.path}: {b.run_id} (packed {b.created_at}), {len(b.members)} members")
+                for m in b.members.values():
+                    print(f"  {m.path}  {m.bytes} -> {sum(m.chunks)} bytes  {m.codec}  {m.sha256[:12]}")
+                if args.verify:
+                    print(f"❌ {len(bad)} corrupt: {', '.join(bad)}" if bad else "✅ all members match their sha256")
+        if bad:
+            raise SystemExit(1)
+        return
 
-        log("Done.")
-    finally:
-        end_run(manifest_path, ctx.run_id)
-        log(f"Manifest finalized for run_id={ctx.run_id}")
+    cfg = load_yaml(Path(args.config))
+    try:
+        if args.action == "export":
+            out = bundle.export_bundle(cfg, args.run_id, Path(args.out) if args.out else None, log=lambda _: None)
+            print(f"✅ Bundle: {out} ({out.stat().st_size} bytes)")
+        else:
+            stats = bundle.import_bundle(cfg, Path(args.bundle), log=lambda _: None)
+            print(f"✅ Imported {args.bundle}: written={stats['written']} skipped={stats['skipped']} bytes={stats['bytes']}")
+    except (LookupError, OSError, ValueError) as e:
+        raise SystemExit(str(e)) from None
+
+def run_gc(args: argparse.Namespace) -> None:
+    cfg = load_yaml(Path(args.config))
+    out_dir = Path(cfg.get("global", {}).get("out_dir", "data_raw"))
+    stats = store.gc(store.store_root(out_dir), out_dir / "_MANIFEST.json", dry_run=bool(args.dry_run))
+    prefix = "would remove" if args.dry_run else "removed"
+    print(
+        f"Store gc: {prefix} views={stats['views_removed']} blobs={stats['blobs_removed']} "
+        f"bytes={stats['bytes_freed']}"
+    )
+
+def run_plan(args: argparse.Namespace) -> None:
+    import json
+
+    from maize_data.plan import build_plan, format_plan
+
+    cfg = load_yaml(Path(args.config))
+    cfg.setdefault("global", {})["force_download"] = bool(args.force)
+    rows = build_plan(cfg, skip_auth=bool(args.skip_auth))
+    print(json.dumps(rows, indent=2) if args.json else format_plan(rows))
+
+def run_status(args: argparse.Namespace) -> None:
+    import json
+
+    from maize_data.plan import build_status, format_status
+
+    rows = build_status(load_yaml(Path(args.config)))
+    print(json.dumps(rows, indent=2) if args.json else format_status(rows))
+
+def run_validate(args: argparse.Namespace) -> None:
+    import json
+
+    from maize_data.validate import format_report, validate
+
+    result = validate(load_yaml(Path(args.config)), out_dir=args.out_dir, jobs=args.jobs)
+    print(json.dumps(result, indent=2) if args.json else format_report(result, verbose=bool(args.verbose)))
+    if result["errors"] or (args.strict and result["warnings"]):
+        raise SystemExit(1)
+
+def run_panel(args: argparse.Namespace) -> None:
+    from maize_data.panel import build_panel
+
+    res = build_panel(load_yaml(Path(args.config)), panel_dir=Path(args.out) if args.out else None, force=args.force)
+    print(f"✅ {res['path']} rows={res['rows']} rebuilt={len(res['rebuilt'])} unchanged={len(res['kept'])}")
+
+def run_features(args: argparse.Namespace) -> None:
+    from maize_data.features import build_features
+
+    res = build_features(load_yaml(Path(args.config)), force=args.force)
+    print(f"✅ {res['daily']} points={res['points']} cached={res['cached']}")
+    if res["missing_points"]:
+        print(f"Points without a POWER file: {', '.join(res['missing_points'])}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,173 @@
+# src/maize_data/compress.py
+from __future__ import annotations
+
+import io
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+# zstd at rest for text artifacts (`global.compression`): with `format: zstd`, downloaders write
+# `<name>.csv.zst` / `<name>.json.zst` while streaming instead of `<name>.csv` / `<name>.json`, and
+# `maize_data compact` recompresses older plain files in place. Either variant counts as "the file" for
+# skip checks, readers and validation, so turning compression on or off never triggers a refetch.
+# Module level stays stdlib-only (plan.py uses it); zstandard loads on first (de)compression.
+
+ZST = ".zst"
+
+# Formats that compress well; zip/Parquet/NetCDF/images are already compressed and stay as they are.
+TEXT_SUFFIXES = {".csv", ".json", ".geojson", ".txt", ".tsv", ".xml"}
+
+def settings(cfg: dict[str, Any]) -> dict[str, Any]:
+    c = cfg.get("global", {}).get("compression") or {}
+    fmt = str(c.get("format", "none")).lower()
+    if fmt not in ("none", "zstd"):
+        raise ValueError(f"global.compression.format must be none or zstd, got {fmt!r}")
+    return {
+        "format": fmt,
+        "level": int(c.get("level", 3)),
+        "compact_level": int(c.get("compact_level", 19)),
+        "keep_runs": int(c.get("keep_runs", 3)),
+    }
+
+def plain(path: Path) -> Path:
+    """`x.csv.zst` -> `x.csv`; other paths unchanged."""
+    return path.with_suffix("") if path.suffix == ZST else path
+
+def inner_suffix(path: Path) -> str:
+    """Suffix of the content: `.csv` for both `x.csv` and `x.csv.zst`."""
+    return plain(path).suffix.lower()
+
+def variants(path: Path) -> list[Path]:
+    p = plain(path)
+    return [p, p.with_name(p.name + ZST)]
+
+def existing(path: Path) -> Path | None:
+    """Whichever of `path` / `path.zst` is on disk (plain first)."""
+    for p in variants(path):
+        if p.exists():
+            return p
+    return None
+
+def target(cfg: dict[str, Any], path: Path) -> Path:
+    """Where a downloader should write `path`: with `.zst` appended when compressing and the format is text."""
+    p = plain(path)
+    if settings(cfg)["format"] == "zstd" and p.suffix.lower() in TEXT_SUFFIXES:
+        return p.with_name(p.name + ZST)
+    return p
+
+@contextmanager
+def open_write(path: Path, level: int = 3, text: bool = False) -> Iterator[IO[Any]]:
+    """
+    File for `path` (atomic, see io.atomic_path), zstd-compressed on the fly when it ends in `.zst`;
+    text mode is UTF-8 with newline="". On success the other variant of the same file is removed
+    so readers never see two.
+    """
+    from maize_data.io import atomic_path
+
+    with atomic_path(path) as tmp, tmp.open("wb") as raw:
+        if path.suffix == ZST:
+            import zstandard
+
+            f: IO[bytes] = zstandard.ZstdCompressor(level=level).stream_writer(raw, closefd=False)
+        else:
+            f = raw
+        with f:
+            if not text:
+                yield f
+            else:
+                w = io.TextIOWrapper(f, encoding="utf-8", newline="")
+                yield w
+                w.flush()
+                w.detach()
+    for other in variants(path):
+        if other != path:
+            other.unlink(missing_ok=True)
+
+def write_text(path: Path, text: str, level: int = 3) -> Path:
+    with open_write(path, level) as f:
+        f.write(text.encode("utf-8"))
+    return path
+
+class _ZstdReader(io.RawIOBase):
+    """Decompressing reader that raises EOFError on a truncated stream (zstandard's stream_reader just stops)."""
+
+    def __init__(self, raw: IO[bytes]) -> None:
+        import zstandard
+
+        self._raw = raw
+        self._new = zstandard.ZstdDecompressor().decompressobj
+        self._d = self._new()
+        self._fed = False  # input given to the current frame
+        self._buf = b""
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> int:
+        while self._pos >= len(self._buf):
+            self._buf, self._pos = b"", 0
+            data = self._raw.read(1 << 16)
+            if not data:
+                if self._fed:
+                    raise EOFError("truncated zstd stream")
+                return 0
+            while data:
+                self._fed = True
+                self._buf += self._d.decompress(data)
+                if not self._d.eof:
+                    break
+                # frame complete; concatenated frames follow in unused_data
+                data, self._d, self._fed = self._d.unused_data, self._new(), False
+        n = min(len(b), len(self._buf) - self._pos)
+        b[:n] = memoryview(self._buf)[self._pos : self._pos + n]
+        self._pos += n
+        return n
+
+@contextmanager
+def open_read(path: Path, text: bool = True) -> Iterator[IO[Any]]:
+    """Opens a plain or `.zst` file; text mode is UTF-8 with newline="" (ready for csv.reader)."""
+    with path.open("rb") as raw:
+        f: IO[Any] = io.BufferedReader(_ZstdReader(raw), 1 << 20) if path.suffix == ZST else raw
+        yield io.TextIOWrapper(f, encoding="utf-8", newline="") if text else f
+
+def read_text(path: Path) -> str:
+    with open_read(path, text=False) as f:
+        return f.read().decode("utf-8")
+
+def compress_file(path: Path, level: int = 19) -> Path:
+    """Replaces plain `path` with `path.zst` (atomic; the plain file is removed only after the swap)."""
+    out = path.with_name(path.name + ZST)
+    with path.open("rb") as src, open_write(out, level) as dst:
+        while True:
+            chunk = src.read(1 << 20)
+            if not chunk:
+                break
+            dst.write(chunk)
+    return out
+
+def compact_candidates(runs: list[dict[str, Any]], out_dir: Path, keep_runs: int) -> list[tuple[str, Path]]:
+    """
+    (source, path) of plain text artifacts whose current version was written more than `keep_runs` manifest
+    runs ago. A file's version is its recorded (bytes, modified_utc); files changed since they were last
+    recorded, and `_`-prefixed bookkeeping (indexes, chunk dirs, the content store), are left alone.
+    """
+    since: dict[str, tuple[int, tuple[Any, Any]]] = {}
+    owner: dict[str, str] = {}
+    for i, run in enumerate(runs):
+        for source, rec in run.get("sources", {}).items():
+            for meta in rec.get("files", []):
+                sig = (meta.get("bytes"), meta.get("modified_utc"))
+                prev = since.get(meta["path"])
+                if prev is None or prev[1] != sig:
+                    since[meta["path"]] = (i, sig)
+                owner[meta["path"]] = source
+    cutoff = len(runs) - keep_runs
+    out = []
+    for rel, (i, (size, _)) in sorted(since.items()):
+        p = out_dir / rel
+        if i >= cutoff or p.suffix.lower() not in TEXT_SUFFIXES or any(part.startswith("_") for part in Path(rel).parts):
+            continue
+        if p.is_file() and p.stat().st_size == size:
+            out.append((owner[rel], p))
+    return out
@@ -9,6 +9,9 @@ __all__ = [
     "run_geoboundaries_adm1",
     "run_url_list",
     "run_uncomtrade_template",
+    "arun_kamis",
+    "arun_nasa_power",
+    "arun_url_list",
 ]
 
 def run_kamis(*args, **kwargs):
@@ -46,3 +49,17 @@ def run_url_list(*args, **kwargs):
 def run_uncomtrade_template(*args, **kwargs):
     from .uncomtrade import run_uncomtrade_template as f
     return f(*args, **kwargs)
+
+# asyncio variants (see maize_data.aio); the other sources run their blocking runner in a thread there
+
+async def arun_kamis(*args, **kwargs):
+    from .kamis import arun_kamis as f
+    return await f(*args, **kwargs)
+
+async def arun_nasa_power(*args, **kwargs):
+    from .nasa_power import arun_nasa_power as f
+    return await f(*args, **kwargs)
+
+async def arun_url_list(*args, **kwargs):
+    from .url_list_downloader import arun_url_list as f
+    return await f(*args, **kwargs)
@@ -4,6 +4,9 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any, Callable
 
+from maize_data import metrics
+from maize_data.io import atomic_path, in_shard
+
 def run_era5_cds(cfg: dict[str, Any], log: Callable[[str], None]) -> None:
     s = cfg["sources"]["era5_cds"]
     out_dir = Path(cfg["global"]["out_dir"]) / "era5"
@@ -24,23 +27,27 @@ def run_era5_cds(cfg: dict[str, Any], log: Callable[[str], None]) -> None:
 
     c = cdsapi.Client()
     for year in range(year_from, year_to + 1):
+        if not in_shard(cfg, f"era5:{year}"):
+            continue
         out_nc = out_dir / f"era5_{year}.nc"
         if out_nc.exists():
             log(f"ERA5: exists, skipping {out_nc}")
             continue
         log(f"ERA5: downloading year={year} vars={len(variables)} bbox={area}")
-        c.retrieve(
-            dataset,
-            {
-                "product_type": "reanalysis",
-                "variable": variables,
-                "year": str(year),
-                "month": [f"{m:02d}" for m in range(1, 13)],
-                "day": [f"{d:02d}" for d in range(1, 32)],
-                "time": [f"{h:02d}:00" for h in range(24)],
-                "area": area,
-                "format": "netcdf",
-            },
-            str(out_nc),
-        )
+        with metrics.span("network", year=year), atomic_path(out_nc) as tmp:
+            c.retrieve(
+                dataset,
+                {
+                    "product_type": "reanalysis",
+                    "variable": variables,
+                    "year": str(year),
+                    "month": [f"{m:02d}" for m in range(1, 13)],
+                    "day": [f"{d:02d}" for d in range(1, 32)],
+                    "time": [f"{h:02d}:00" for h in range(24)],
+                    "area": area,
+                    "format": "netcdf",
+                },
+                str(tmp),
+            )
+        metrics.current().add_written(out_nc)
         log(f"ERA5: saved {out_nc}")
@@ -4,8 +4,10 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any, Callable
 
-import requests
-from maize_data.io import http_settings
+from maize_data import metrics
+from maize_data.io import atomic_path, http_session, http_settings
+
+API = "https://www.geoboundaries.org/api/current/gbOpen"
 
 def run_geoboundaries_adm1(cfg: dict[str, Any], log: Callable[[str], None]) -> None:
     force = bool(cfg["global"].get("force_download", False))
@@ -23,8 +25,9 @@ def run_geoboundaries_adm1(cfg: dict[str, Any], log: Callable[[str], None]) -> N
         log(f"geoBoundaries: exists, skipping {out_path}")
         return
 
-    api = f"https://www.geoboundaries.org/api/current/gbOpen/{iso3}/{adm}/"
-    meta = requests.get(api, timeout=timeout).json()
+    api = f"{s.get('api_base', API).rstrip('/')}/{iso3}/{adm}/"
+    session = http_session(cfg, "geoboundaries_adm1", log=log)
+    meta = session.get(api, timeout=timeout).json()
 
     # Prefer ZIP if available
     url = meta.get("staticDownloadLink") or meta.get("downloadURL") or meta.get("gjDownloadURL")
@@ -32,6 +35,8 @@ def run_geoboundaries_adm1(cfg: dict[str, Any], log: Callable[[str], None]) -> N
         raise KeyError(f"No download URL found in geoBoundaries metadata. Keys: {list(meta.keys())}")
 
     log(f"geoBoundaries: downloading {iso3}/{adm} from {url}")
-    z = requests.get(url, timeout=timeout).content
-    out_path.write_bytes(z)
+    z = session.get(url, timeout=timeout).content
+    with metrics.span("write"), atomic_path(out_path) as tmp:
+        tmp.write_bytes(z)
+    metrics.current().add_written(out_path)
     log(f"geoBoundaries: saved {out_path}")
@@ -1,12 +1,46 @@
 # src/maize_data/downloaders/hdx_ckan.py
 from __future__ import annotations
 
+from io import BytesIO
 from pathlib import Path
 from typing import Any, Callable
 
 import pandas as pd
-import requests
-from maize_data.io import http_settings
+from maize_data import metrics
+from maize_data.compress import existing
+from maize_data.io import http_session, http_settings, warm
+from maize_data.tables import table_path, write_table
+
+def choose_resource(resources: list[dict[str, Any]], country_hint: str) -> dict[str, Any]:
+    # Choose CSV resource with Kenya in name/description if possible
+    def score(r: dict[str, Any]) -> int:
+        text = (r.get("name", "") + " " + r.get("description", "")).lower()
+        fmt = (r.get("format", "") or "").lower()
+        sc = 0
+        if "csv" in fmt:
+            sc += 2
+        if country_hint.lower() in text:
+            sc += 3
+        if "food price" in text:
+            sc += 1
+        return sc
+
+    resources_sorted = sorted(resources, key=score, reverse=True)
+    return next((r for r in resources_sorted if (r.get("format","").lower() == "csv") and r.get("url")), resources_sorted[0])
+
+# package_show answers younger than this are reused in a resident process: the change probe's call serves the download
+PACKAGE_REUSE_SECONDS = 300
+
+def package_show(session, base: str, package_id: str, timeout: int) -> dict[str, Any]:
+    def fetch() -> dict[str, Any]:
+        r = session.get(f"{base}/api/3/action/package_show", params={"id": package_id}, timeout=timeout)
+        r.raise_for_status()
+        pkg = r.json()
+        if not pkg.get("success"):
+            raise RuntimeError(f"HDX package_show failed: {pkg.get('error')}")
+        return pkg
+
+    return warm("ckan_package", f"{base}/{package_id}", fetch, max_age=PACKAGE_REUSE_SECONDS)
 
 def run_hdx_ckan_wfp_prices(cfg: dict[str, Any], log: Callable[[str], None]) -> None:
 
@@ -20,35 +54,23 @@ def run_hdx_ckan_wfp_prices(cfg: dict[str, Any], log: Callable[[str], None]) ->
     out_dir = Path(cfg["global"]["out_dir"]) / "wfp_hdx"
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    out_path = out_dir / "wfp_food_prices_raw.csv"
-    if out_path.exists() and not force:
+    out_path = table_path(cfg, out_dir / "wfp_food_prices_raw.csv")
+    if existing(out_path) and not force:
         log(f"HDX: exists, skipping {out_path}")
         return
-    pkg_url = f"{base}/api/3/action/package_show"
-    pkg = requests.get(pkg_url, params={"id": package_id}, timeout=timeout).json()
-    if not pkg.get("success"):
-        raise RuntimeError(f"HDX package_show failed: {pkg}")
-
-    resources = pkg["result"]["resources"]
-    # Choose CSV resource with Kenya in name/description if possible
-    def score(r: dict[str, Any]) -> int:
-        text = (r.get("name", "") + " " + r.get("description", "")).lower()
-        fmt = (r.get("format", "") or "").lower()
-        sc = 0
-        if "csv" in fmt:
-            sc += 2
-        if country_hint.lower() in text:
-            sc += 3
-        if "food price" in text:
-            sc += 1
-        return sc
+    session = http_session(cfg, "hdx_wfp_prices", log=log)
+    pkg = package_show(session, base, package_id, timeout)
 
-    resources_sorted = sorted(resources, key=score, reverse=True)
-    chosen = next((r for r in resources_sorted if (r.get("format","").lower() == "csv") and r.get("url")), resources_sorted[0])
+    chosen = choose_resource(pkg["result"]["resources"], country_hint)
     url = chosen["url"]
 
     log(f"HDX: downloading package={package_id} resource='{chosen.get('name')}' url={url}")
-    df = pd.read_csv(url)
-    out_path = out_dir / "wfp_food_prices_raw.csv"
-    df.to_csv(out_path, index=False)
+    r = session.get(url, timeout=timeout)
+    r.raise_for_status()
+    with metrics.span("parse"):
+        df = pd.read_csv(BytesIO(r.content))
+    with metrics.span("write"):
+        write_table(cfg, df, out_path, "hdx_wfp_prices")
+    metrics.current().add_rows(len(df))
+    metrics.current().add_written(out_path)
     log(f"HDX: saved {out_path} rows={len(df)}")
@@ -1,8 +1,9 @@
 # src/maize_data/downloaders/kamis.py
 from __future__ import annotations
 
+import contextvars
 import re
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any, Callable
 
@@ -10,24 +11,40 @@ import pandas as pd
 import requests
 from bs4 import BeautifulSoup
 
-from maize_data.io import http_settings
+from maize_data import metrics
+from maize_data.io import atomic_path, http_session, http_settings, in_shard, should_skip, stat_version, warm
+from maize_data.tables import table_path, write_table
+from maize_data.throttle import throttle_settings
 from io import StringIO
 
 BASE = "https://kamis.kilimo.go.ke/site/market"
 
+# Products are crawled by `concurrency` threads draining one work queue. They share one session (its
+# connection pool sized to the crawlers) and, through it, the adaptive HostBudget of the KAMIS host, so
+# adding crawlers never pushes the server past what it answers well (see throttle.py). `products: all` takes every product in the cached dropdown
+# catalog (_products.csv) and writes one partition per product:
+#   kamis/all/product_id=<id>/part-0.<csv|parquet>   (pd.read_parquet("kamis/all") reads them as one table)
+# Named products keep their kamis_product<id>_<slug>_perpage<n> files. With `max_age_hours`, outputs older
+# than that are crawled again, so a nightly run refreshes the catalog without --force.
+# arun_kamis (maize_data.aio) does the same on an event loop, with every product in flight at once.
+STORE_DIRNAME = "all"
+
 def _norm(s: str) -> str:
     s = s.strip().lower()
     s = re.sub(r"\s+", " ", s)
     return s
 
-def _fetch_product_catalog(session: requests.Session, timeout: int) -> pd.DataFrame:
+def _fetch_product_catalog(session: requests.Session, timeout: int, base: str = BASE) -> pd.DataFrame:
     """
     Returns a DataFrame with columns: product_id (int), product_name (str)
     Parsed from the <select> dropdown on the market page.
     """
-    r = session.get(BASE, timeout=timeout)
+    r = session.get(base, timeout=timeout)
     r.raise_for_status()
-    soup = BeautifulSoup(r.text, "lxml")
+    return _parse_product_catalog(r.text)
+
+def _parse_product_catalog(html: str) -> pd.DataFrame:
+    soup = BeautifulSoup(html, "lxml")
 
     # Find the product select. Most pages use name="product".
     sel = soup.find("select", attrs={"name": "product"})
@@ -102,84 +119,223 @@ def _read_market_table(html: str) -> pd.DataFrame:
 
     return tables[-1]
 
-def run_kamis(cfg: dict[str, Any], log: Callable[[str], None]) -> None:
-    force = bool(cfg["global"].get("force_download", False))
-    timeout, sleep_s = http_settings(cfg)
+def store_path(cfg: dict[str, Any], out_dir: Path, pid: int) -> Path:
+    """Partition of product `pid` in the all-products store (kamis/all/product_id=<pid>/part-0.*)."""
+    return table_path(cfg, out_dir / STORE_DIRNAME / f"product_id={pid}" / "part-0.csv")
+
+def _crawl(
+    session: requests.Session,
+    base: str,
+    pid: int,
+    name: str,
+    per_page: int,
+    max_offsets: int,
+    timeout: int,
+    log: Callable[[str], None],
+) -> pd.DataFrame | None:
+    """Every page of one product; a failing page ends the product with the rows fetched so far."""
+    chunks: list[pd.DataFrame] = []
+    for i in range(max_offsets):
+        offset = i * per_page
+        url = f"{base}/{offset}" if offset > 0 else base
+        params = {"product": pid, "per_page": per_page}
+
+        try:
+            r = session.get(url, params=params, timeout=timeout)
+            r.raise_for_status()
+            df = _page(r.text, pid, name, offset, log)
+        except Exception as e:
+            log(f"KAMIS: product={pid} offset={offset} error: {e}")
+            break
+        if df is None:
+            break
+        chunks.append(df)
+        # If the page returned fewer rows than per_page, it's likely the last chunk.
+        if len(df) < per_page:
+            break
+    return _combine(chunks)
+
+def _page(html: str, pid: int, name: str, offset: int, log: Callable[[str], None]) -> pd.DataFrame | None:
+    """One results page as rows tagged with the product and offset; None when it is empty (the end)."""
+    with metrics.span("parse"):
+        df = _read_market_table(html)
+    if df.empty:
+        log(f"KAMIS: product={pid} offset={offset} -> empty, stopping.")
+        return None
+    df["product_id"] = pid
+    df["product_name"] = name
+    df["offset"] = offset
+    log(f"KAMIS: product={pid} offset={offset} rows={len(df)}")
+    return df
 
+def _combine(chunks: list[pd.DataFrame]) -> pd.DataFrame | None:
+    if not chunks:
+        return None
+    out = pd.concat(chunks, ignore_index=True)
+
+    # light de-dup, just in case pagination overlaps
+    key_cols = [c for c in ["Commodity", "Classification", "Market", "County", "Date"] if c in out.columns]
+    if key_cols:
+        out = out.drop_duplicates(subset=key_cols + ["Wholesale", "Retail"], keep="last")
+    return out
+
+def _options(cfg: dict[str, Any]) -> dict[str, Any]:
     s = cfg["sources"]["kamis"]
     out_dir = Path(cfg["global"]["out_dir"]) / "kamis"
     out_dir.mkdir(parents=True, exist_ok=True)
-
-    # Config knobs (new)
-    products = s.get("products", ["Dry Maize"])
-    per_page = int(s.get("per_page", 3000))
-    max_offsets = int(s.get("max_offsets", 1000))  # safety cap
-
-    # Cache product catalog locally (so you can inspect ids & names)
-    products_csv = out_dir / "_products.csv"
-
-    session = requests.Session()
-
-    if products_csv.exists() and not force:
-        prod_df = pd.read_csv(products_csv)
+    catalog_age = s.get("catalog_max_age_hours")
+    return {
+        "force": bool(cfg["global"].get("force_download", False)),
+        "timeout": http_settings(cfg)[0],
+        "out_dir": out_dir,
+        "products": s.get("products", ["Dry Maize"]),
+        "per_page": int(s.get("per_page", 3000)),
+        "max_offsets": int(s.get("max_offsets", 1000)),  # safety cap
+        "base": s.get("base_url", BASE).rstrip("/"),
+        # more crawlers than the host budget's ceiling would only queue on it
+        "crawlers": max(1, int(s.get("concurrency", throttle_settings(cfg, "kamis").max))),
+        "max_age": float(s["max_age_hours"]) if s.get("max_age_hours") is not None else None,
+        # Cache product catalog locally (so you can inspect ids & names)
+        "products_csv": out_dir / "_products.csv",
+        "catalog_age": float(catalog_age) if catalog_age is not None else None,
+    }
+
+def _cached_catalog(o: dict[str, Any]) -> pd.DataFrame | None:
+    """The saved catalog, unless this run must refetch it."""
+    products_csv = o["products_csv"]
+    # the catalog rarely changes: with catalog_max_age_hours a forced refresh keeps a recent one
+    fresh_catalog = o["catalog_age"] is not None and should_skip(products_csv, False, o["catalog_age"])
+    if not products_csv.exists() or (o["force"] and not fresh_catalog):
+        return None
+    # parsed once per file version in a resident process (io.warm)
+    return warm("kamis_catalog", str(products_csv), lambda: pd.read_csv(products_csv), version=stat_version(products_csv))
+
+def _save_catalog(o: dict[str, Any], prod_df: pd.DataFrame, log: Callable[[str], None]) -> None:
+    with metrics.span("write"), atomic_path(o["products_csv"]) as tmp:
+        prod_df.to_csv(tmp, index=False)
+    log(f"KAMIS: saved product catalog -> {o['products_csv']} (n={len(prod_df)})")
+
+def _todo(cfg: dict[str, Any], o: dict[str, Any], prod_df: pd.DataFrame, log: Callable[[str], None]) -> list[tuple[int, str, Path]]:
+    """(product id, name, output path) for every product this run has to crawl."""
+    products, out_dir = o["products"], o["out_dir"]
+    jobs: list[tuple[int, str, Path]] = []
+    if products == "all":
+        for pid, prod_name in zip(prod_df["product_id"], prod_df["product_name"]):
+            if in_shard(cfg, f"kamis:{_norm(prod_name)}"):
+                jobs.append((int(pid), str(prod_name), store_path(cfg, out_dir, int(pid))))
     else:
-        log("KAMIS: fetching product dropdown catalog")
-        prod_df = _fetch_product_catalog(session, timeout=timeout)
-        prod_df.to_csv(products_csv, index=False)
-        log(f"KAMIS: saved product catalog -> {products_csv} (n={len(prod_df)})")
-
-    for prod_name in products:
-        pid = _resolve_product_id(prod_df, prod_name)
-        slug = re.sub(r"[^a-z0-9]+", "_", _norm(prod_name)).strip("_")
-
-        out_path = out_dir / f"kamis_product{pid}_{slug}_perpage{per_page}.csv"
-        if out_path.exists() and not force:
-            log(f"KAMIS: exists, skipping {out_path.name}")
-            continue
-
-        log(f"KAMIS: downloading product='{prod_name}' id={pid} per_page={per_page}")
+        for prod_name in products:
+            if not in_shard(cfg, f"kamis:{_norm(prod_name)}"):
+                continue
+            pid = _resolve_product_id(prod_df, prod_name)
+            slug = re.sub(r"[^a-z0-9]+", "_", _norm(prod_name)).strip("_")
+            jobs.append((pid, prod_name, table_path(cfg, out_dir / f"kamis_product{pid}_{slug}_perpage{o['per_page']}.csv")))
+
+    todo = []
+    for pid, prod_name, out_path in jobs:
+        if should_skip(out_path, o["force"], o["max_age"]):
+            log(f"KAMIS: exists, skipping {out_path.name if products != 'all' else out_path.parent.name}")
+        else:
+            todo.append((pid, prod_name, out_path))
+    if todo:
+        log(f"KAMIS: {len(todo)} products to crawl ({len(jobs) - len(todo)} fresh), crawlers={o['crawlers']}")
+    return todo
+
+def _save(cfg: dict[str, Any], o: dict[str, Any], out: pd.DataFrame | None, pid: int, prod_name: str, out_path: Path, log: Callable[[str], None]) -> int:
+    if out is None:
+        log(f"KAMIS: no data for product='{prod_name}' (id={pid})")
+        return 0
+    if o["products"] == "all":
+        out = out.drop(columns=["product_id"])  # carried by the product_id=<id> directory
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+    with metrics.span("write"):
+        write_table(cfg, out, out_path, "kamis")
+    metrics.current().add_rows(len(out))
+    metrics.current().add_written(out_path)
+    log(f"KAMIS: saved {out_path} rows={len(out)}")
+    return len(out)
+
+def _raise_failed(failed: list[str], todo: list[Any]) -> None:
+    if failed:
+        raise RuntimeError(f"KAMIS: {len(failed)} of {len(todo)} products failed (the others are saved): {failed[:5]}")
 
-        chunks: list[pd.DataFrame] = []
-        for i in range(max_offsets):
-            offset = i * per_page
-            url = f"{BASE}/{offset}" if offset > 0 else BASE
-            params = {"product": pid, "per_page": per_page}
+def run_kamis(cfg: dict[str, Any], log: Callable[[str], None]) -> None:
+    o = _options(cfg)
+    session = http_session(cfg, "kamis", pool_size=o["crawlers"], log=log)
 
+    prod_df = _cached_catalog(o)
+    if prod_df is None:
+        log("KAMIS: fetching product dropdown catalog")
+        prod_df = _fetch_product_catalog(session, timeout=o["timeout"], base=o["base"])
+        _save_catalog(o, prod_df, log)
+
+    todo = _todo(cfg, o, prod_df, log)
+    if not todo:
+        return
+
+    def crawl(pid: int, prod_name: str, out_path: Path) -> int:
+        log(f"KAMIS: downloading product='{prod_name}' id={pid} per_page={o['per_page']}")
+        out = _crawl(session, o["base"], pid, prod_name, o["per_page"], o["max_offsets"], o["timeout"], log)
+        return _save(cfg, o, out, pid, prod_name, out_path, log)
+
+    failed: list[str] = []
+    with ThreadPoolExecutor(max_workers=o["crawlers"], thread_name_prefix="kamis") as pool:
+        # copy_context keeps metrics.current() pointing at this source inside the crawlers
+        futures = {pool.submit(contextvars.copy_context().run, crawl, *job): job for job in todo}
+        for fut in as_completed(futures):
+            pid, prod_name, _ = futures[fut]
             try:
-                r = session.get(url, params=params, timeout=timeout)
-                r.raise_for_status()
-                df = _read_market_table(r.text)
-
-                # Stop if no rows
-                if df.empty:
-                    log(f"KAMIS: offset={offset} -> empty, stopping.")
+                fut.result()
+            except Exception as e:
+                log(f"KAMIS: product='{prod_name}' (id={pid}) failed: {type(e).__name__}: {e}")
+                failed.append(prod_name)
+    _raise_failed(failed, todo)
+
+async def arun_kamis(cfg: dict[str, Any], log: Callable[[str], None], client: Any = None) -> None:
+    """run_kamis on an event loop (see aio.py): every product crawled at once, each request held to the host budget."""
+    import asyncio
+
+    from maize_data import aio
+
+    o = _options(cfg)
+    async with aio.session(cfg, "kamis", log, client) as session:
+        prod_df = _cached_catalog(o)
+        if prod_df is None:
+            log("KAMIS: fetching product dropdown catalog")
+            r = await session.get(o["base"])
+            r.raise_for_status()
+            prod_df = await asyncio.to_thread(_parse_product_catalog, r.text)
+            await asyncio.to_thread(_save_catalog, o, prod_df, log)
+
+        todo = await asyncio.to_thread(_todo, cfg, o, prod_df, log)
+
+        async def crawl(pid: int, prod_name: str, out_path: Path) -> int:
+            log(f"KAMIS: downloading product='{prod_name}' id={pid} per_page={o['per_page']}")
+            chunks: list[pd.DataFrame] = []
+            for i in range(o["max_offsets"]):
+                offset = i * o["per_page"]
+                url = f"{o['base']}/{offset}" if offset > 0 else o["base"]
+                try:
+                    r = await session.get(url, params={"product": pid, "per_page": o["per_page"]})
+                    r.raise_for_status()
+                    # parsing is CPU work: off the loop, so other products keep downloading
+                    df = await asyncio.to_thread(_page, r.text, pid, prod_name, offset, log)
+                except Exception as e:
+                    log(f"KAMIS: product={pid} offset={offset} error: {e}")
+                    break
+                if df is None:
                     break
-
-                df["product_id"] = pid
-                df["product_name"] = prod_name
-                df["offset"] = offset
                 chunks.append(df)
-
-                log(f"KAMIS: offset={offset} rows={len(df)}")
-                time.sleep(sleep_s)
-
-                # If the page returned fewer rows than per_page, it's likely the last chunk.
-                if len(df) < per_page:
+                if len(df) < o["per_page"]:
                     break
-
-            except Exception as e:
-                log(f"KAMIS: offset={offset} error: {e}")
-                break
-
-        if chunks:
-            out = pd.concat(chunks, ignore_index=True)
-
-            # light de-dup, just in case pagination overlaps
-            key_cols = [c for c in ["Commodity", "Classification", "Market", "County", "Date"] if c in out.columns]
-            if key_cols:
-                out = out.drop_duplicates(subset=key_cols + ["Wholesale", "Retail"], keep="last")
-
-            out.to_csv(out_path, index=False)
-            log(f"KAMIS: saved {out_path} rows={len(out)}")
-        else:
-            log(f"KAMIS: no data for product='{prod_name}' (id={pid})")
+            return await asyncio.to_thread(_save, cfg, o, _combine(chunks), pid, prod_name, out_path, log)
+
+        results = await asyncio.gather(*(crawl(*job) for job in todo), return_exceptions=True)
+    failed: list[str] = []
+    for (pid, prod_name, _), res in zip(todo, results):
+        if isinstance(res, BaseException):
+            if isinstance(res, asyncio.CancelledError):
+                raise res
+            log(f"KAMIS: product='{prod_name}' (id={pid}) failed: {type(res).__name__}: {res}")
+            failed.append(prod_name)
+    _raise_failed(failed, todo)
@@ -1,55 +1,161 @@
 # src/maize_data/downloaders/nasa_power.py
 from __future__ import annotations
 
+import contextvars
+import csv
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any, Callable
 
-import pandas as pd
-import requests
-from maize_data.io import http_settings
+from maize_data import compress, metrics
+from maize_data.io import atomic_path, http_session, http_settings, in_shard
+from maize_data.manifest import params_key
+from maize_data.throttle import throttle_settings
 
 BASE = "https://power.larc.nasa.gov/api/temporal/daily/point"
 
-def run_nasa_power(cfg: dict[str, Any], log: Callable[[str], None]) -> None:
-    timeout, sleep_s = http_settings(cfg)
-    s = cfg["sources"]["nasa_power"]
+# nasa_power/_points.json: point id -> params_key of the request that produced power_daily_<id>.json.
+# A point whose coordinates (or parameters/dates) change is refetched; the other files stay.
+POINTS_INDEX = "_points.json"
 
-    points_csv = Path(s["points_csv"])
-    params = s.get("parameters", ["T2M", "PRECTOT"])
-    community = s.get("community", "AG")
+def point_request_key(lat: float, lon: float, params: list[str], community: str, start: str, end: str) -> str:
+    return params_key({"lat": round(lat, 6), "lon": round(lon, 6), "parameters": list(params), "community": community, "start": start, "end": end})
+
+class _PointIndex:
+    """POINTS_INDEX shared by the fetching workers; entries added by this run are merged into the file on save."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: dict[str, str] = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+        self.mine: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def set(self, pid: str, key: str) -> None:
+        with self._lock:
+            self.entries[pid] = self.mine[pid] = key
 
+    def save(self) -> None:
+        # re-read first: other shards may be updating their own points in a shared out_dir
+        with self._lock:
+            current = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+            current.update(self.mine)
+            with atomic_path(self.path) as tmp:
+                tmp.write_text(json.dumps(current, indent=2, sort_keys=True), encoding="utf-8")
+
+def _plan(cfg: dict[str, Any], log: Callable[[str], None]) -> tuple[dict[str, Any], _PointIndex, list[tuple[str, float, float, str, Path]]]:
+    """Options, the points index, and (point id, lat, lon, request key, output path) of every point to fetch."""
+    s = cfg["sources"]["nasa_power"]
+    params = s.get("parameters", ["T2M", "PRECTOT"])
     out_dir = Path(cfg["global"]["out_dir"]) / "nasa_power"
     out_dir.mkdir(parents=True, exist_ok=True)
+    o = {
+        "timeout": http_settings(cfg)[0],
+        "base": s.get("base_url", BASE),
+        "params": params,
+        "community": s.get("community", "AG"),
+        "start": cfg["global"]["start_date"].replace("-", ""),
+        "end": cfg["global"]["end_date"].replace("-", ""),
+        "level": compress.settings(cfg)["level"],
+        # points are fetched by up to the throttle ceiling of workers; the host budget decides how many run at once
+        "workers": max(1, int(s.get("concurrency", throttle_settings(cfg, "nasa_power").max))),
+    }
 
-    pts = pd.read_csv(points_csv)
-    start = cfg["global"]["start_date"].replace("-", "")
-    end = cfg["global"]["end_date"].replace("-", "")
+    points_csv = Path(s["points_csv"])
+    with points_csv.open("r", encoding="utf-8", newline="") as f:
+        pts = list(csv.DictReader(f))
+    index = _PointIndex(out_dir / POINTS_INDEX)
 
-    for row in pts.to_dict(orient="records"):
-        force = bool(cfg["global"].get("force_download", False))
+    force = bool(cfg["global"].get("force_download", False))
+    todo: list[tuple[str, float, float, str, Path]] = []
+    for row in pts:
         pid = str(row["id"])
+        if not in_shard(cfg, f"nasa_power:{pid}"):
+            continue
         lat = float(row["lat"])
         lon = float(row["lon"])
-        out_path = out_dir / f"power_daily_{pid}.json"
-        if out_path.exists() and not force:
-            log(f"NASA POWER: exists, skipping {out_path.name}")
-            continue
+        key = point_request_key(lat, lon, params, o["community"], o["start"], o["end"])
+        out_path = compress.target(cfg, out_dir / f"power_daily_{pid}.json")
+        have = compress.existing(out_path)
+        if have and not force:
+            if pid not in index.entries:  # downloaded before the index existed: assume it matches
+                index.set(pid, key)
+            if index.entries[pid] == key:
+                log(f"NASA POWER: exists, skipping {have.name}")
+                continue
+            log(f"NASA POWER: point={pid} request changed (coordinates/parameters/dates), refetching")
+        todo.append((pid, lat, lon, key, out_path))
+    return o, index, todo
 
-        q = {
-            "latitude": lat,
-            "longitude": lon,
-            "start": start,
-            "end": end,
-            "community": community,
-            "parameters": ",".join(params),
-            "format": "JSON",
-        }
-        log(f"NASA POWER: {pid} lat={lat} lon={lon}")
-        r = requests.get(BASE, params=q, timeout=timeout)
+def _query(o: dict[str, Any], lat: float, lon: float) -> dict[str, Any]:
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "start": o["start"],
+        "end": o["end"],
+        "community": o["community"],
+        "parameters": ",".join(o["params"]),
+        "format": "JSON",
+    }
+
+def _save(o: dict[str, Any], index: _PointIndex, pid: str, key: str, out_path: Path, body: bytes, log: Callable[[str], None]) -> None:
+    with metrics.span("write"), compress.open_write(out_path, o["level"]) as f:
+        f.write(body)
+    metrics.current().add_written(out_path)
+    index.set(pid, key)
+    index.save()
+    log(f"NASA POWER: saved {out_path}")
+
+def _raise_failed(failed: list[str], todo: list[Any]) -> None:
+    if failed:
+        raise RuntimeError(f"NASA POWER: {len(failed)} of {len(todo)} points failed (the others are saved): {sorted(failed)[:5]}")
+
+def run_nasa_power(cfg: dict[str, Any], log: Callable[[str], None]) -> None:
+    o, index, todo = _plan(cfg, log)
+    session = http_session(cfg, "nasa_power", pool_size=o["workers"], log=log)
+
+    def fetch(pid: str, lat: float, lon: float, key: str, out_path: Path) -> None:
+        log(f"NASA POWER: point={pid} lat={lat} lon={lon}")
+        r = session.get(o["base"], params=_query(o, lat, lon), timeout=o["timeout"])
+        r.raise_for_status()
+        _save(o, index, pid, key, out_path, r.content, log)
+
+    failed: list[str] = []
+    with ThreadPoolExecutor(max_workers=o["workers"], thread_name_prefix="power") as pool:
+        # copy_context keeps metrics.current() pointing at this source inside the workers
+        futures = {pool.submit(contextvars.copy_context().run, fetch, *job): job[0] for job in todo}
+        for fut in as_completed(futures):
+            try:
+                fut.result()
+            except Exception as e:
+                log(f"NASA POWER: point={futures[fut]} failed: {type(e).__name__}: {e}")
+                failed.append(futures[fut])
+    index.save()
+    _raise_failed(failed, todo)
+
+async def arun_nasa_power(cfg: dict[str, Any], log: Callable[[str], None], client: Any = None) -> None:
+    """run_nasa_power on an event loop (see aio.py): every point requested at once, held to the host budget."""
+    import asyncio
+
+    from maize_data import aio
+
+    o, index, todo = await asyncio.to_thread(_plan, cfg, log)
+
+    async def fetch(pid: str, lat: float, lon: float, key: str, out_path: Path) -> None:
+        log(f"NASA POWER: point={pid} lat={lat} lon={lon}")
+        r = await session.get(o["base"], params=_query(o, lat, lon))
         r.raise_for_status()
-        out_path = out_dir / f"power_daily_{pid}.json"
-        out_path.write_text(r.text, encoding="utf-8")
-        log(f"NASA POWER: saved {out_path}")
-        if sleep_s:
-            import time
-            time.sleep(sleep_s)
+        await asyncio.to_thread(_save, o, index, pid, key, out_path, r.content, log)
+
+    async with aio.session(cfg, "nasa_power", log, client) as session:
+        results = await asyncio.gather(*(fetch(*job) for job in todo), return_exceptions=True)
+    failed: list[str] = []
+    for job, res in zip(todo, results):
+        if isinstance(res, BaseException):
+            if isinstance(res, asyncio.CancelledError):
+                raise res
+            log(f"NASA POWER: point={job[0]} failed: {type(res).__name__}: {res}")
+            failed.append(job[0])
+    await asyncio.to_thread(index.save)
+    _raise_failed(failed, todo)
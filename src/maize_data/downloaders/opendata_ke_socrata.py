@@ -5,8 +5,10 @@ from pathlib import Path
 from typing import Any, Callable
 
 import pandas as pd
-import requests
-from maize_data.io import http_settings
+from maize_data import metrics
+from maize_data.compress import existing
+from maize_data.io import http_session, http_settings
+from maize_data.tables import table_path, write_table
 
 def run_opendata_ke_socrata(cfg: dict[str, Any], log: Callable[[str], None]) -> None:
     force = bool(cfg["global"].get("force_download", False))
@@ -15,25 +17,28 @@ def run_opendata_ke_socrata(cfg: dict[str, Any], log: Callable[[str], None]) ->
     dataset_id = s["dataset_id"]
     page_size = int(s.get("page_size", 50000))
 
-    base = f"https://www.opendata.go.ke/resource/{dataset_id}.csv"
+    domain = s.get("domain", "https://www.opendata.go.ke").rstrip("/")
+    base = f"{domain}/resource/{dataset_id}.csv"
     out_dir = Path(cfg["global"]["out_dir"]) / "opendata_ke"
     out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / f"{dataset_id}.csv"
-    if out_path.exists() and not force:
+    out_path = table_path(cfg, out_dir / f"{dataset_id}.csv")
+    if existing(out_path) and not force:
         log(f"Socrata: exists, skipping {out_path}")
         return
 
     log(f"Socrata: downloading dataset={dataset_id} page_size={page_size}")
 
+    session = http_session(cfg, "kenya_opendata_socrata", log=log)
     dfs = []
     offset = 0
     while True:
         url = f"{base}?$limit={page_size}&$offset={offset}"
-        r = requests.get(url, timeout=timeout)
+        r = session.get(url, timeout=timeout)
         r.raise_for_status()
         if not r.text.strip():
             break
-        df = pd.read_csv(pd.io.common.StringIO(r.text))
+        with metrics.span("parse"):
+            df = pd.read_csv(pd.io.common.StringIO(r.text))
         if df.empty:
             break
         dfs.append(df)
@@ -46,7 +51,10 @@ def run_opendata_ke_socrata(cfg: dict[str, Any], log: Callable[[str], None]) ->
 
     if dfs:
         out = pd.concat(dfs, ignore_index=True)
-        out.to_csv(out_path, index=False)
+        with metrics.span("write"):
+            write_table(cfg, out, out_path, "kenya_opendata_socrata")
+        metrics.current().add_rows(len(out))
+        metrics.current().add_written(out_path)
         log(f"Socrata: saved {out_path} rows={len(out)}")
     else:
         log("Socrata: no rows downloaded.")
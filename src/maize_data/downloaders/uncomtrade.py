@@ -1,13 +1,96 @@
 # src/maize_data/downloaders/uncomtrade.py
 from __future__ import annotations
 
+import contextvars
+import json
 import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Callable
 
 import pandas as pd
-import requests
-from maize_data.io import http_settings
+from maize_data import metrics
+from maize_data.compress import existing
+from maize_data.io import atomic_path, http_session, http_settings, in_shard
+from maize_data.manifest import sha256_text
+from maize_data.tables import table_path, write_table
+from maize_data.throttle import QuotaExhausted, QuotaScheduler
+
+# Work is split into HS code x year(s) x flow (x reporter, x partner batch) chunks fetched in parallel under
+# one QuotaScheduler (calls/second + calls/day of the subscription key). A chunk that comes back at the
+# record cap is split (years first, then partners) and re-fetched. Finished chunks are kept in
+# uncomtrade/_chunks/ so a failed or quota-limited run resumes where it stopped; each HS code's chunks
+# are merged into trade_hs<code>_<from>-<to> once all of them are in.
+
+@dataclass(frozen=True)
+class Chunk:
+    cmd: str
+    years: tuple[int, ...]
+    flow: str
+    reporter: str | None = None
+    partners: tuple[str, ...] | None = None
+
+    @property
+    def key(self) -> str:
+        parts = [f"hs{self.cmd}", f"{self.years[0]}-{self.years[-1]}", self.flow, f"r{self.reporter or 'all'}"]
+        parts.append("pall" if self.partners is None else f"p{sha256_text(','.join(self.partners))[:10]}")
+        return "_".join(parts)
+
+    def params(self, max_records: int) -> dict[str, Any]:
+        q: dict[str, Any] = {
+            "cmdCode": self.cmd,
+            "freqCode": "A",
+            "flowCode": self.flow,
+            "year": ",".join(map(str, self.years)),
+            "format": "json",
+            "max": max_records,
+        }
+        if self.reporter:
+            q["reporterCode"] = self.reporter
+        if self.partners:
+            q["partnerCode"] = ",".join(self.partners)
+        return q
+
+    def split(self) -> list["Chunk"]:
+        """Halves the years, then the partner list; [] when the chunk cannot get smaller."""
+        if len(self.years) > 1:
+            h = len(self.years) // 2
+            return [Chunk(self.cmd, self.years[:h], self.flow, self.reporter, self.partners),
+                    Chunk(self.cmd, self.years[h:], self.flow, self.reporter, self.partners)]
+        if self.partners and len(self.partners) > 1:
+            h = len(self.partners) // 2
+            return [Chunk(self.cmd, self.years, self.flow, self.reporter, self.partners[:h]),
+                    Chunk(self.cmd, self.years, self.flow, self.reporter, self.partners[h:])]
+        return []
+
+def _as_list(v: Any) -> list[str]:
+    if v is None:
+        return []
+    return [str(x) for x in (v if isinstance(v, list) else [v])]
+
+def plan_chunks(s: dict[str, Any]) -> dict[str, list[Chunk]]:
+    """Initial chunks per HS code from the source config."""
+    codes = _as_list(s.get("hs_codes")) or _as_list(s.get("hs_code", "1005"))
+    years = list(range(int(s.get("year_from", 2015)), int(s.get("year_to", 2025)) + 1))
+    per = max(1, int(s.get("years_per_chunk", 1)))
+    flows = _as_list(s.get("flows", ["M", "X"]))
+    reporters: list[str | None] = list(_as_list(s.get("reporters") or s.get("reporter"))) or [None]
+    partners = _as_list(s.get("partners"))
+    batch = max(1, int(s.get("partners_per_chunk", len(partners) or 1)))
+    partner_sets: list[tuple[str, ...] | None] = (
+        [tuple(partners[i : i + batch]) for i in range(0, len(partners), batch)] if partners else [None]
+    )
+    return {
+        cmd: [
+            Chunk(cmd, tuple(years[i : i + per]), flow, rep, ps)
+            for i in range(0, len(years), per)
+            for flow in flows
+            for rep in reporters
+            for ps in partner_sets
+        ]
+        for cmd in codes
+    }
 
 def run_uncomtrade_template(cfg: dict[str, Any], log: Callable[[str], None]) -> None:
     """
@@ -16,36 +99,161 @@ def run_uncomtrade_template(cfg: dict[str, Any], log: Callable[[str], None]) ->
     force = bool(cfg["global"].get("force_download", False))
     timeout, _ = http_settings(cfg)
     s = cfg["sources"]["uncomtrade"]
-    hs = s.get("hs_code", "1005")
     year_from = int(s.get("year_from", 2015))
     year_to = int(s.get("year_to", 2025))
+    max_records = int(s.get("max_records", 50000))
 
     api_key = os.getenv("UNCOMTRADE_API_KEY", "").strip() or None
 
     out_dir = Path(cfg["global"]["out_dir"]) / "uncomtrade"
+    chunk_dir = out_dir / "_chunks"
     out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / f"trade_hs{hs}_{year_from}-{year_to}.csv"
 
-    if out_path.exists() and not force:
-        log(f"UN Comtrade: exists, skipping {out_path}")
+    todo: dict[str, list[Chunk]] = {}
+    for cmd, chunks in plan_chunks(s).items():
+        out_path = table_path(cfg, out_dir / f"trade_hs{cmd}_{year_from}-{year_to}.csv")
+        if existing(out_path) and not force:
+            log(f"UN Comtrade: exists, skipping {out_path}")
+            continue
+        if force:
+            for p in chunk_dir.glob(f"hs{cmd}_*.json"):
+                first_year = json.loads(p.read_text(encoding="utf-8"))["params"]["year"].split(",")[0]
+                if in_shard(cfg, f"uncomtrade:{cmd}:{first_year}"):
+                    p.unlink(missing_ok=True)
+        todo[cmd] = chunks
+    if not todo:
         return
 
     # Placeholder endpoint (verify when you enable this)
-    url = "https://comtradeapi.worldbank.org/v1/get"
-    params = {
-        "cmdCode": hs,
-        "freqCode": "A",
-        "flowCode": "M,X",
-        "year": ",".join(map(str, range(year_from, year_to + 1))),
-        "format": "json",
-        "max": 50000,
-    }
+    url = s.get("url", "https://comtradeapi.worldbank.org/v1/get")
     headers = {"Ocp-Apim-Subscription-Key": api_key} if api_key else {}
+    session = http_session(cfg, "uncomtrade", log=log)
+    quota = QuotaScheduler(
+        float(s.get("rate_per_second", 1.0)),
+        int(s["daily_limit"]) if s.get("daily_limit") else None,
+        Path(s.get("quota_state", ".cache/uncomtrade_quota.json")),
+    )
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+
+    def chunk_file(chunk: Chunk) -> Path:
+        return chunk_dir / f"{chunk.key}.json"
+
+    def resolve(chunk: Chunk) -> tuple[list[Chunk], list[Chunk]]:
+        """(saved, still to fetch) for a chunk, following splits recorded by earlier runs."""
+        p = chunk_file(chunk)
+        if not p.exists():
+            return [], [chunk]
+        if not json.loads(p.read_text(encoding="utf-8")).get("split"):
+            return [chunk], []
+        saved, pending = [], []
+        for half in chunk.split():
+            a, b = resolve(half)
+            saved += a
+            pending += b
+        return saved, pending
+
+    def fetch(chunk: Chunk) -> list[Chunk]:
+        """Saves the chunk, or records the split and returns its halves when it came back at the cap."""
+        quota.acquire()
+        r = session.get(url, params=chunk.params(max_records), headers=headers, timeout=timeout)
+        r.raise_for_status()
+        with metrics.span("parse"):
+            js = r.json()
+        data = js.get("data") or []
+        truncated = len(data) >= max_records or int(js.get("count") or 0) > len(data)
+        halves = chunk.split() if truncated else []
+        if halves:
+            log(f"UN Comtrade: {chunk.key} hit the {max_records}-record cap, splitting into {len(halves)}")
+            rec: dict[str, Any] = {"params": chunk.params(max_records), "split": True}
+        else:
+            if truncated:
+                log(f"UN Comtrade: WARNING {chunk.key} is at the record cap and cannot be split further; keeping {len(data)} rows")
+            rec = {"params": chunk.params(max_records), "truncated": truncated, "data": data}
+        with metrics.span("write"), atomic_path(chunk_file(chunk)) as tmp:
+            tmp.write_text(json.dumps(rec), encoding="utf-8")
+        if not halves:
+            log(f"UN Comtrade: chunk {chunk.key} rows={len(data)}")
+        return halves
+
+    done: dict[str, list[Chunk]] = {}
+    pending: list[Chunk] = []
+    for cmd, chunks in todo.items():
+        done[cmd] = []
+        for chunk in chunks:
+            saved, missing = resolve(chunk)
+            done[cmd] += saved
+            # with --shard, each process fetches the chunks whose first year it owns
+            pending += [c for c in missing if in_shard(cfg, f"uncomtrade:{c.cmd}:{c.years[0]}")]
+    log(f"UN Comtrade: {len(pending)} chunks to fetch ({sum(map(len, done.values()))} already saved)")
+    failed: list[Chunk] = []
+    exhausted: QuotaExhausted | None = None
+
+    workers = max(1, int(s.get("concurrency", 4)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="comtrade") as pool:
+        running: dict[Future[list[Chunk]], Chunk] = {}
+
+        def submit(chunk: Chunk) -> None:
+            # copy_context keeps metrics.current() pointing at this source inside the worker
+            running[pool.submit(contextvars.copy_context().run, fetch, chunk)] = chunk
+
+        for chunk in pending:
+            submit(chunk)
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                chunk = running.pop(fut)
+                try:
+                    halves = fut.result()
+                except QuotaExhausted as e:
+                    exhausted = e
+                    failed.append(chunk)
+                    continue
+                except Exception as e:
+                    log(f"UN Comtrade: chunk {chunk.key} failed: {type(e).__name__}: {e}")
+                    failed.append(chunk)
+                    continue
+                if not halves:
+                    done[chunk.cmd].append(chunk)
+                for half in halves:
+                    if exhausted is None:
+                        submit(half)
+                    else:
+                        failed.append(half)
+
+    # only codes whose chunks all arrived are merged; the others keep their chunks for the next run
+    failed_codes = {c.cmd for c in failed}
+    for cmd in todo:
+        if cmd in failed_codes:
+            continue
+        # other shards may still be fetching their part of this code; the last one to finish merges
+        saved, missing = [], []
+        for chunk in todo[cmd]:
+            a, b = resolve(chunk)
+            saved += a
+            missing += b
+        if missing:
+            log(f"UN Comtrade: hs{cmd} waiting for {len(missing)} chunks from other shards; not merged yet")
+            continue
+        frames = [
+            pd.json_normalize(json.loads(chunk_file(c).read_text(encoding="utf-8"))["data"])
+            for c in sorted(saved, key=lambda c: c.key)
+        ]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        out_path = table_path(cfg, out_dir / f"trade_hs{cmd}_{year_from}-{year_to}.csv")
+        with metrics.span("write"):
+            write_table(cfg, df, out_path, "uncomtrade")
+        metrics.current().add_rows(len(df))
+        metrics.current().add_written(out_path)
+        log(f"UN Comtrade: saved {out_path} rows={len(df)} chunks={len(saved)}")
+        for p in chunk_dir.glob(f"hs{cmd}_*.json"):
+            p.unlink(missing_ok=True)
 
-    log("UN Comtrade: downloading (template; may require endpoint tweaks)")
-    r = requests.get(url, params=params, headers=headers, timeout=timeout)
-    r.raise_for_status()
-    js = r.json()
-    df = pd.json_normalize(js.get("data", []))
-    df.to_csv(out_path, index=False)
-    log(f"UN Comtrade: saved {out_path} rows={len(df)}")
+    try:
+        chunk_dir.rmdir()  # only succeeds once every code is merged
+    except OSError:
+        pass
+    if exhausted is not None:
+        raise RuntimeError(f"UN Comtrade: {exhausted}; {len(failed)} chunks left for the next run")
+    if failed:
+        keys = [c.key for c in failed[:5]]
+        raise RuntimeError(f"UN Comtrade: {len(failed)} chunks failed (saved chunks are kept for the next run): {keys}")
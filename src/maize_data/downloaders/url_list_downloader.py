@@ -1,39 +1,108 @@
 # src/maize_data/downloaders/url_list_downloader.py
 from __future__ import annotations
 
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any, Callable
 
-import requests
-from maize_data.io import http_settings
+from maize_data import compress, metrics
+from maize_data.io import http_session, http_settings, in_shard
+from maize_data.throttle import throttle_settings
 
-def run_url_list(cfg: dict[str, Any], log: Callable[[str], None], key: str) -> None:
-    timeout, sleep_s = http_settings(cfg)
+def _plan(cfg: dict[str, Any], log: Callable[[str], None], key: str) -> tuple[dict[str, Any], list[tuple[int, str, Path]]]:
+    """Options and (position, url, output path) of every URL to fetch."""
     s = cfg["sources"][key]
     urls_file = Path(s["urls_file"])
+    # set by change detection (--if-changed) for URLs whose ETag/Last-Modified moved upstream
+    refetch = set(s.get("refetch_urls", []))
 
     out_dir = Path(cfg["global"]["out_dir"]) / key
     out_dir.mkdir(parents=True, exist_ok=True)
 
     urls = [u.strip() for u in urls_file.read_text(encoding="utf-8").splitlines() if u.strip() and not u.strip().startswith("#")]
+    o = {
+        "timeout": http_settings(cfg)[0],
+        "total": len(urls),
+        "level": compress.settings(cfg)["level"],
+        # each URL's host has its own adaptive budget; workers only bound how many wait on them at once
+        "workers": max(1, int(s.get("concurrency", throttle_settings(cfg, key).max))),
+    }
     if not urls:
         log(f"{key}: no URLs found in {urls_file}")
-        return
-
+    todo: list[tuple[int, str, Path]] = []
     for i, url in enumerate(urls, 1):
+        if not in_shard(cfg, f"{key}:{url}"):
+            continue
         name = url.split("/")[-1] or f"file_{i}"
-        out_path = out_dir / name
-        if out_path.exists():
-            log(f"{key}: exists, skipping {out_path.name}")
+        out_path = compress.target(cfg, out_dir / name)
+        have = compress.existing(out_path)
+        if have and url not in refetch:
+            log(f"{key}: exists, skipping {have.name}")
             continue
-        log(f"{key}: downloading {i}/{len(urls)} {name}")
-        r = requests.get(url, stream=True, timeout=timeout)
+        todo.append((i, url, out_path))
+    return o, todo
+
+def _raise_failed(key: str, failed: list[str], todo: list[Any]) -> None:
+    if failed:
+        raise RuntimeError(f"{key}: {len(failed)} of {len(todo)} URLs failed (the others are saved): {failed[:5]}")
+
+def run_url_list(cfg: dict[str, Any], log: Callable[[str], None], key: str) -> None:
+    o, todo = _plan(cfg, log, key)
+    if not todo:
+        return
+    session = http_session(cfg, key, pool_size=o["workers"], log=log)
+
+    def fetch(i: int, url: str, out_path: Path) -> None:
+        log(f"{key}: downloading {i}/{o['total']} {out_path.name}")
+        r = session.get(url, stream=True, timeout=o["timeout"])
         r.raise_for_status()
-        with out_path.open("wb") as f:
+        # body is streamed straight to disk (through zstd for text formats when compressing),
+        # so network and write time are one span here
+        with metrics.span("network", url=url), compress.open_write(out_path, o["level"]) as f:
             for chunk in r.iter_content(chunk_size=1 << 20):
                 if chunk:
                     f.write(chunk)
-        if sleep_s:
-            import time
-            time.sleep(sleep_s)
+        metrics.current().add_written(out_path)
+        log(f"{key}: saved {out_path}")
+
+    failed: list[str] = []
+    with ThreadPoolExecutor(max_workers=o["workers"], thread_name_prefix=key) as pool:
+        # copy_context keeps metrics.current() pointing at this source inside the workers
+        futures = {pool.submit(contextvars.copy_context().run, fetch, *job): job[1] for job in todo}
+        for fut in as_completed(futures):
+            try:
+                fut.result()
+            except Exception as e:
+                log(f"{key}: {futures[fut]} failed: {type(e).__name__}: {e}")
+                failed.append(futures[fut])
+    _raise_failed(key, failed, todo)
+
+async def arun_url_list(cfg: dict[str, Any], log: Callable[[str], None], key: str, client: Any = None) -> None:
+    """run_url_list on an event loop (see aio.py): every URL at once, bodies streamed to disk off the loop."""
+    import asyncio
+
+    from maize_data import aio
+
+    o, todo = await asyncio.to_thread(_plan, cfg, log, key)
+
+    async def fetch(i: int, url: str, out_path: Path) -> None:
+        log(f"{key}: downloading {i}/{o['total']} {out_path.name}")
+        async with session.stream(url) as r:
+            r.raise_for_status()
+            with metrics.span("network", url=url), compress.open_write(out_path, o["level"]) as f:
+                async for chunk in r.aiter_bytes(1 << 20):
+                    await asyncio.to_thread(f.write, chunk)
+        metrics.current().add_written(out_path)
         log(f"{key}: saved {out_path}")
+
+    async with aio.session(cfg, key, log, client) as session:
+        results = await asyncio.gather(*(fetch(*job) for job in todo), return_exceptions=True)
+    failed: list[str] = []
+    for job, res in zip(todo, results):
+        if isinstance(res, BaseException):
+            if isinstance(res, asyncio.CancelledError):
+                raise res
+            log(f"{key}: {job[1]} failed: {type(res).__name__}: {res}")
+            failed.append(job[1])
+    _raise_failed(key, failed, todo)
@@ -6,13 +6,20 @@ from typing import Any, Callable
 
 import pandas as pd
 import requests
-from maize_data.io import http_settings
+from maize_data import metrics
+from maize_data.io import http_session, http_settings
+from maize_data.tables import write_table
 
-def _fetch_indicator(country: str, indicator: str, timeout: int) -> pd.DataFrame:
-    url = f"https://api.worldbank.org/v2/country/{country}/indicator/{indicator}"
-    r = requests.get(url, params={"format": "json", "per_page": 20000}, timeout=timeout)
+BASE = "https://api.worldbank.org/v2"
+
+def _fetch_indicator(
+    session: requests.Session, country: str, indicator: str, timeout: int, base: str = BASE
+) -> pd.DataFrame:
+    url = f"{base}/country/{country}/indicator/{indicator}"
+    r = session.get(url, params={"format": "json", "per_page": 20000}, timeout=timeout)
     r.raise_for_status()
-    meta, data = r.json()
+    with metrics.span("parse"):
+        meta, data = r.json()
     rows = []
     for d in data:
         if not d:
@@ -30,19 +37,25 @@ def run_worldbank_wdi(cfg: dict[str, Any], log: Callable[[str], None]) -> None:
     s = cfg["sources"]["worldbank_wdi"]
     country = s.get("country", "KEN")
     indicators = s.get("indicators", [])
+    base = s.get("base_url", BASE).rstrip("/")
 
     out_dir = Path(cfg["global"]["out_dir"]) / "worldbank_wdi"
     out_dir.mkdir(parents=True, exist_ok=True)
 
+    session = http_session(cfg, "worldbank_wdi", log=log)
     all_df = []
     for ind in indicators:
         log(f"WDI: fetching {country} {ind}")
-        df = _fetch_indicator(country, ind, timeout)
-        out_path = out_dir / f"{country}_{ind}.csv"
-        df.to_csv(out_path, index=False)
+        df = _fetch_indicator(session, country, ind, timeout, base=base)
+        with metrics.span("write"):
+            out_path = write_table(cfg, df, out_dir / f"{country}_{ind}.csv", "worldbank_wdi")
+        metrics.current().add_rows(len(df))
+        metrics.current().add_written(out_path)
         all_df.append(df)
         log(f"WDI: saved {out_path} rows={len(df)}")
 
     if all_df:
         merged = pd.concat(all_df, ignore_index=True)
-        merged.to_csv(out_dir / f"{country}_all_indicators.csv", index=False)
+        with metrics.span("write"):
+            merged_path = write_table(cfg, merged, out_dir / f"{country}_all_indicators.csv", "worldbank_wdi")
+        metrics.current().add_written(merged_path)
@@ -0,0 +1,199 @@
+# src/maize_data/features.py
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from maize_data.compress import existing, read_text
+from maize_data.io import atomic_path
+from maize_data.manifest import inputs_sha256, latest_file_entries, utc_now_iso
+
+# Weather features from the NASA POWER point files, computed once per input state and cached:
+#   <dir>/weather_daily_<key>.parquet    point_id, date, raw parameters, trailing rolling features
+#   <dir>/weather_weekly_<key>.parquet   point_id, week (Monday), sums/means per parameter
+#   <dir>/weather_monthly_<key>.parquet  point_id, month, sums/means per parameter
+# <key> hashes the points file, every power_daily_*.json, the parameters, the date range and the feature spec.
+# All points are loaded into one (point, day, parameter) array; windows are cumulative-sum differences.
+
+# Bump when feature definitions change so existing caches are not reused.
+FEATURES_VERSION = 1
+
+FILL_VALUE = -999.0
+
+DEFAULT_SPEC: dict[str, Any] = {
+    "rolling": {"PRECTOT": {"sum": [7, 30, 90]}, "PRECTOTCORR": {"sum": [7, 30, 90]}, "T2M": {"mean": [7, 30]}},
+    "gdd": {"base": 10.0, "cap": 30.0, "windows": [30, 90]},
+    "anomalies": {"params": ["T2M", "PRECTOT", "PRECTOTCORR"], "window": 30},
+    "sum_params": ["PRECTOT", "PRECTOTCORR"],  # summed in weekly/monthly tables; everything else is averaged
+    "min_coverage": 0.8,                       # windows with fewer valid days give NaN
+}
+
+def load_power(files: dict[str, Path], params: list[str], start: str, end: str) -> tuple[pd.DatetimeIndex, np.ndarray]:
+    """
+    Daily values for every point as one float array of shape (points, days, params), NaN where missing or filled (-999).
+    `files` maps point id -> power_daily_<id>.json (or .json.zst); rows follow its order.
+    """
+    days = pd.date_range(start, end, freq="D")
+    t0 = days[0].to_datetime64()
+    cube = np.full((len(files), len(days), len(params)), np.nan)
+    for i, path in enumerate(files.values()):
+        series = json.loads(read_text(path)).get("properties", {}).get("parameter", {})
+        for k, name in enumerate(params):
+            values = series.get(name)
+            if not values:
+                continue
+            stamps = pd.to_datetime(list(values.keys()), format="%Y%m%d").to_numpy()
+            pos = ((stamps - t0) // np.timedelta64(1, "D")).astype(np.int64)
+            ok = (pos >= 0) & (pos < len(days))
+            cube[i, pos[ok], k] = np.fromiter(values.values(), dtype=float, count=len(values))[ok]
+    cube[cube <= FILL_VALUE] = np.nan
+    return days, cube
+
+def rolling(x: np.ndarray, window: int, how: str, min_coverage: float) -> np.ndarray:
+    """
+    Trailing window over axis 1 (days) of a (points, days) array: the value at day t covers days t-window+1..t.
+    Sums are scaled up to the full window when a few days are missing.
+    """
+    valid = np.isfinite(x)
+    c = np.concatenate([np.zeros((x.shape[0], 1)), np.cumsum(np.where(valid, x, 0.0), axis=1)], axis=1)
+    n = np.concatenate([np.zeros((x.shape[0], 1)), np.cumsum(valid, axis=1)], axis=1)
+    total = c[:, window:] - c[:, :-window]
+    count = n[:, window:] - n[:, :-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+    out = mean * window if how == "sum" else mean
+    out[count < min_coverage * window] = np.nan
+    # the first window-1 days have no full window behind them
+    return np.concatenate([np.full((x.shape[0], window - 1), np.nan), out], axis=1)
+
+def doy_anomaly(x: np.ndarray, days: pd.DatetimeIndex) -> np.ndarray:
+    """Departure from each point's own day-of-year mean over the loaded range (Feb 29 shares Feb 28's slot)."""
+    doy = days.dayofyear.to_numpy() - 1
+    leap_after_feb = days.is_leap_year & (days.month > 2)
+    doy = np.where(leap_after_feb, doy - 1, doy)
+    doy = np.where((days.month == 2) & (days.day == 29), 58, doy)
+    valid = np.isfinite(x)
+    sums = np.zeros((x.shape[0], 365))
+    counts = np.zeros((x.shape[0], 365))
+    np.add.at(sums.T, doy, np.where(valid, x, 0.0).T)
+    np.add.at(counts.T, doy, valid.T.astype(float))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        clim = sums / counts
+    return x - clim[:, doy]
+
+def compute_features(ids: list[str], days: pd.DatetimeIndex, cube: np.ndarray, params: list[str], spec: dict[str, Any]) -> pd.DataFrame:
+    """Long table (one row per point and day) with the raw parameters and every configured feature."""
+    cols: dict[str, np.ndarray] = {name: cube[:, :, k] for k, name in enumerate(params)}
+    cover = float(spec.get("min_coverage", 0.8))
+    out = dict(cols)
+
+    for name, rules in (spec.get("rolling") or {}).items():
+        if name not in cols:
+            continue
+        for how, windows in rules.items():
+            for w in windows:
+                out[f"{name}_{how}_{w}d"] = rolling(cols[name], int(w), how, cover)
+
+    gdd = spec.get("gdd")
+    if gdd and ("T2M" in cols or {"T2M_MAX", "T2M_MIN"} <= cols.keys()):
+        base, cap = float(gdd.get("base", 10.0)), float(gdd.get("cap", 30.0))
+        if {"T2M_MAX", "T2M_MIN"} <= cols.keys():
+            tmean = (np.minimum(cols["T2M_MAX"], cap) + np.maximum(cols["T2M_MIN"], base)) / 2
+        else:
+            tmean = np.minimum(cols["T2M"], cap)
+        daily = np.clip(tmean - base, 0.0, None)
+        out["gdd"] = daily
+        for w in gdd.get("windows", []):
+            out[f"gdd_sum_{w}d"] = rolling(daily, int(w), "sum", cover)
+
+    anom = spec.get("anomalies")
+    if anom:
+        w = int(anom.get("window", 30))
+        for name in anom.get("params", []):
+            if name in cols:
+                out[f"{name}_anom_{w}d"] = rolling(doy_anomaly(cols[name], days), w, "mean", cover)
+
+    n_pts, n_days = len(ids), len(days)
+    frame = pd.DataFrame({k: v.reshape(-1).astype(np.float32) for k, v in out.items()})
+    frame.insert(0, "date", np.tile(days.to_numpy(), n_pts))
+    frame.insert(0, "point_id", pd.Categorical(np.repeat(np.asarray(ids, dtype=object), n_days)))
+    return frame
+
+def calendar(daily: pd.DataFrame, params: list[str], freq: str, spec: dict[str, Any]) -> pd.DataFrame:
+    """Weekly ("W") or monthly ("M") totals/means of the raw parameters per point."""
+    sums = set(spec.get("sum_params", []))
+    period = daily["date"].dt.to_period(freq).dt.start_time
+    label = "week" if freq == "W" else "month"
+    agg = {p: ("sum" if p in sums else "mean") for p in params if p in daily.columns}
+    g = daily.assign(**{label: period}).groupby(["point_id", label], observed=True, sort=True)
+    out = g.agg(agg)
+    out["days"] = g.size()
+    # a sum over a partly missing period would read as a dry spell
+    for p in sums & agg.keys():
+        out[p] = out[p].where(g[p].count() >= spec.get("min_coverage", 0.8) * out["days"])
+    return out.reset_index()
+
+def _settings(cfg: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any]]:
+    s = cfg["sources"]["nasa_power"]
+    fcfg = cfg.get("global", {}).get("features") or {}
+    spec = {**DEFAULT_SPEC, **{k: v for k, v in fcfg.items() if k != "dir"}}
+    return s, {"spec": spec, "dir": Path(fcfg.get("dir", "data/features"))}
+
+def build_features(cfg: dict[str, Any], force: bool = False, log: Callable[[str], None] = print) -> dict[str, Any]:
+    """Writes the daily/weekly/monthly tables unless a cache for the same inputs exists; returns their paths."""
+    s, opts = _settings(cfg)
+    out_dir = Path(cfg["global"]["out_dir"])
+    spec, feat_dir = opts["spec"], opts["dir"]
+    params = list(s.get("parameters", ["T2M", "PRECTOT"]))
+    start, end = cfg["global"]["start_date"], cfg["global"]["end_date"]
+
+    points_csv = Path(s["points_csv"])
+    ids = [str(i) for i in pd.read_csv(points_csv, usecols=["id"])["id"]]
+    found = {pid: existing(out_dir / "nasa_power" / f"power_daily_{pid}.json") for pid in ids}
+    files = {pid: p for pid, p in found.items() if p is not None}
+    if not files:
+        raise FileNotFoundError(f"No power_daily_*.json for the points in {points_csv} under {out_dir / 'nasa_power'}")
+
+    settings = json.dumps({"v": FEATURES_VERSION, "params": params, "start": start, "end": end, "spec": spec}, sort_keys=True)
+    key = inputs_sha256([points_csv, *files.values()], out_dir, latest_file_entries(out_dir / "_MANIFEST.json"), settings)[:16]
+    paths = {name: feat_dir / f"weather_{name}_{key}.parquet" for name in ("daily", "weekly", "monthly")}
+    result = {"key": key, "points": len(files), "missing_points": sorted(set(ids) - files.keys()), **{k: str(v) for k, v in paths.items()}}
+
+    if not force and all(p.exists() for p in paths.values()):
+        log(f"Features: cached {key} points={len(files)}")
+        return {**result, "cached": True}
+
+    days, cube = load_power(files, params, start, end)
+    daily = compute_features(list(files), days, cube, params, spec)
+    tables = {"daily": daily, "weekly": calendar(daily, params, "W", spec), "monthly": calendar(daily, params, "M", spec)}
+
+    feat_dir.mkdir(parents=True, exist_ok=True)
+    for name, df in tables.items():
+        with atomic_path(paths[name]) as tmp:
+            df.to_parquet(tmp, engine="pyarrow", compression="zstd", index=False)
+    # older caches for the same layout are superseded
+    for old in feat_dir.glob("weather_*_*.parquet"):
+        if old not in paths.values():
+            old.unlink(missing_ok=True)
+    (feat_dir / "_latest.json").write_text(json.dumps({**result, "built_at": utc_now_iso()}, indent=2), encoding="utf-8")
+    log(f"Features: built {key} points={len(files)} days={len(days)} columns={daily.shape[1]}")
+    return {**result, "cached": False}
+
+def load_features(cfg: dict[str, Any], table: str = "daily", log: Callable[[str], None] = print) -> pd.DataFrame:
+    """The cached feature table for the current inputs, building it first if needed."""
+    res = build_features(cfg, log=log)
+    return pd.read_parquet(res[table])
+
+def align(df: pd.DataFrame, features: pd.DataFrame, id_col: str = "county_id", date_col: str = "date") -> pd.DataFrame:
+    """
+    Left-joins daily features onto rows keyed by point id and date (e.g. the price panel: county_id matches the
+    points.csv ids built from the same boundaries). Features are trailing windows, so nothing after the date leaks in.
+    """
+    feats = features.rename(columns={"point_id": id_col, "date": date_col})
+    feats[id_col] = feats[id_col].astype(str)
+    left = df.assign(**{date_col: pd.to_datetime(df[date_col]).dt.normalize(), id_col: df[id_col].astype(str)})
+    return left.merge(feats, on=[id_col, date_col], how="left")
@@ -0,0 +1,215 @@
+# src/maize_data/http_cache.py
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from maize_data import metrics
+from maize_data.sessions import MeteredSession
+
+# Headers that describe the wire format, not the (decoded) body we store.
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+class HttpCache:
+    """
+    On-disk response cache: gzip bodies under <dir>/<aa>/<key>.gz, metadata + LRU clock in <dir>/index.sqlite.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int) -> None:
+        self.dir = cache_dir
+        self.max_bytes = max_bytes
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.dir / "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(method: str, url: str) -> str:
+        return hashlib.sha256(f"{method.upper()} {url}".encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> Path:
+        return self.dir / key[:2] / f"{key}.gz"
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status, headers, etag, last_modified, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        body_path = self._body_path(key)
+        if not body_path.exists():
+            self.delete(key)
+            return None
+        return {
+            "url": row[0],
+            "status": row[1],
+            "headers": json.loads(row[2]),
+            "etag": row[3],
+            "last_modified": row[4],
+            "stored_at": row[5],
+        }
+
+    def body(self, key: str) -> bytes | None:
+        try:
+            raw = self._body_path(key).read_bytes()
+        except FileNotFoundError:
+            # evicted between get() and here
+            return None
+        self.touch(key)
+        return gzip.decompress(raw)
+
+    def put(self, key: str, url: str, status: int, headers: dict[str, str], body: bytes) -> None:
+        headers = {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+        body_path = self._body_path(key)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = body_path.with_suffix(".tmp")
+        tmp.write_bytes(gzip.compress(body, compresslevel=6))
+        tmp.replace(body_path)
+
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    url,
+                    status,
+                    json.dumps(headers),
+                    headers.get("ETag") or headers.get("etag"),
+                    headers.get("Last-Modified") or headers.get("last-modified"),
+                    now,
+                    now,
+                    body_path.stat().st_size,
+                ),
+            )
+            self._db.commit()
+        self.evict()
+
+    def touch(self, key: str, revalidated: bool = False) -> None:
+        now = time.time()
+        with self._lock:
+            if revalidated:
+                self._db.execute("UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            else:
+                self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._db.commit()
+        self._body_path(key).unlink(missing_ok=True)
+
+    def evict(self) -> int:
+        """Drops least-recently-used entries until the compressed total fits max_bytes."""
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            victims = []
+            for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC"):
+                if total <= self.max_bytes:
+                    break
+                victims.append(key)
+                total -= size
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in victims])
+            self._db.commit()
+        for key in victims:
+            self._body_path(key).unlink(missing_ok=True)
+        return len(victims)
+
+_CACHES: dict[str, HttpCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+def shared_cache(cache_dir: Path, max_bytes: int) -> HttpCache:
+    """One HttpCache (and sqlite connection) per directory per process."""
+    key = str(cache_dir.resolve())
+    with _CACHES_LOCK:
+        if key not in _CACHES:
+            _CACHES[key] = HttpCache(cache_dir, max_bytes)
+        return _CACHES[key]
+
+def _cached_response(entry: dict[str, Any], body: bytes, request: requests.PreparedRequest) -> requests.Response:
+    r = requests.Response()
+    r.status_code = entry["status"]
+    r.headers = CaseInsensitiveDict(entry["headers"])
+    r._content = body
+    r.url = entry["url"]
+    r.encoding = get_encoding_from_headers(r.headers)
+    r.reason = "OK"
+    r.request = request
+    r.from_cache = True  # type: ignore[attr-defined]
+    return r
+
+class CachedSession(MeteredSession):
+    """
+    MeteredSession that serves GETs from an HttpCache.
+    Fresh entries (younger than ttl_seconds) are returned without a network call; stale ones are
+    revalidated with If-None-Match / If-Modified-Since. Streaming requests bypass the cache.
+    """
+
+    def __init__(self, cache: HttpCache, ttl_seconds: float, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+
+    def request(self, method: str, url: str, *args: Any, **kwargs: Any) -> requests.Response:  # type: ignore[override]
+        if method.upper() != "GET" or kwargs.get("stream"):
+            return super().request(method, url, *args, **kwargs)
+
+        params = kwargs.get("params", args[0] if args else None)
+        prepared = self.prepare_request(requests.Request(method, url, params=params, headers=kwargs.get("headers")))
+        key = HttpCache.make_key(method, prepared.url or url)
+
+        entry = self.cache.get(key)
+        body = self.cache.body(key) if entry is not None else None
+        if body is None:
+            entry = None
+        elif time.time() - entry["stored_at"] < self.ttl_seconds:
+            metrics.current().observe_cache_hit()
+            return _cached_response(entry, body, prepared)
+
+        if entry is not None:
+            headers = dict(kwargs.get("headers") or {})
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+            kwargs["headers"] = headers
+
+        r = super().request(method, url, *args, **kwargs)
+
+        if r.status_code == 304 and body is not None:
+            self.cache.touch(key, revalidated=True)
+            metrics.current().observe_cache_hit()
+            return _cached_response(entry, body, prepared)
+
+        if r.status_code == 200 and "no-store" not in r.headers.get("Cache-Control", "").lower():
+            self.cache.put(key, r.url, r.status_code, dict(r.headers), r.content)
+        return r
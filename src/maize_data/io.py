@@ -1,33 +1,73 @@
 # src/maize_data/io.py
 from __future__ import annotations
 
+import hashlib
 import os
+import shutil
+import threading
 import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Callable, Iterator
 
 import yaml
-from dotenv import load_dotenv
 
 def setup_env() -> None:
+    # imported here so plan/status never pay for it
+    from dotenv import load_dotenv
+
     load_dotenv(override=False)
 
 def load_yaml(path: Path) -> dict[str, Any]:
     with path.open("r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
-def make_logger(log_dir: str) -> Callable[[str], None]:
-    Path(log_dir).mkdir(parents=True, exist_ok=True)
-    log_path = Path(log_dir) / "download.log"
+# Objects a resident process (`maize_data serve`) keeps between runs: HTTP sessions with their keep-alive pools,
+# catalogs, manifest indexes. Off by default, so one-shot commands build everything fresh as before.
+_WARM: dict[tuple[str, str], tuple[Any, float, Any]] = {}
+_WARM_ON = False
+_WARM_LOCK = threading.Lock()
+
+def keep_warm(enabled: bool = True) -> None:
+    global _WARM_ON
+    _WARM_ON = enabled
+    if not enabled:
+        with _WARM_LOCK:
+            _WARM.clear()
+
+def warm(kind: str, name: str, build: Callable[[], Any], version: Any = None, max_age: float | None = None) -> Any:
+    """
+    `build()`, kept per (kind, name) while keep_warm() is on and reused until `version` changes (e.g. a file's
+    stat_version) or the value is older than `max_age` seconds. Values are shared: callers must not mutate them.
+    """
+    if not _WARM_ON:
+        return build()
+    key = (kind, name)
+    with _WARM_LOCK:
+        hit = _WARM.get(key)
+    if hit is not None and hit[0] == version and (max_age is None or time.monotonic() - hit[1] < max_age):
+        return hit[2]
+    value = build()
+    with _WARM_LOCK:
+        _WARM[key] = (version, time.monotonic(), value)
+    return value
 
-    def log(msg: str) -> None:
-        ts = time.strftime("%Y-%m-%d %H:%M:%S")
-        line = f"[{ts}] {msg}"
-        print(line)
-        with log_path.open("a", encoding="utf-8") as f:
-            f.write(line + "\n")
+def stat_version(path: Path) -> tuple[int, int] | None:
+    """(mtime_ns, size) of `path`, None if missing: a cheap "has this file changed" key for warm()."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
 
-    return log
+def make_logger(log_dir: str, max_mb: float = 20, backups: int = 5) -> Callable[[str], None]:
+    """
+    Returns a non-blocking `log(msg)`; see runlog.RunLogger. Call `.close()` on it to flush before exit
+    (an atexit hook does this too).
+    """
+    from maize_data.runlog import RunLogger
+
+    return RunLogger(Path(log_dir), max_bytes=int(max_mb * 1024 * 1024), backups=backups)
 
 def http_settings(cfg: dict[str, Any]) -> tuple[int, float]:
     g = cfg.get("global", {})
@@ -35,5 +75,108 @@ def http_settings(cfg: dict[str, Any]) -> tuple[int, float]:
     sleep_s = float(os.getenv("HTTP_SLEEP_SECONDS", g.get("http_sleep_seconds", 1.0)))
     return timeout, sleep_s
 
-def should_skip(path: Path, force: bool) -> bool:
-    return path.exists() and (not force)
+def http_session(cfg: dict[str, Any], source: str, pool_size: int | None = None, log: Callable[[str], None] | None = None):
+    """
+    Session for one source's downloader: metered (see metrics.py), retrying on 429/5xx, and holding every
+    request to the per-host adaptive budget (`global.throttle`, see throttle.py; limit changes go to `log`).
+    With `global.http_cache.enabled`, GETs go through the shared on-disk cache
+    (ttl from cache_ttl).
+    `global.compression.accept_encoding` narrows the content codings offered (default: all decodable ones).
+    Pass `pool_size` when several threads share the session, so none waits for a pooled connection.
+    Under keep_warm() the session (and its open connections) is reused by the source's next run.
+    """
+    # the cache ttl is part of the key: a revalidating run must not pick up a session that serves hits as fresh
+    key = f"{source}:{pool_size or ''}:{cache_ttl(cfg, source)}"
+    return warm("session", key, lambda: _new_session(cfg, source, pool_size, log))
+
+def _new_session(cfg: dict[str, Any], source: str, pool_size: int | None, log: Callable[[str], None] | None):
+    from maize_data.sessions import MeteredSession
+
+    g = cfg.get("global", {})
+    opts: dict[str, Any] = {"retries": int(g.get("http_retries", 3)), "backoff": float(g.get("http_backoff_seconds", 1.0))}
+    encodings = (g.get("compression") or {}).get("accept_encoding")
+    if encodings:
+        opts["accept_encoding"] = [str(e) for e in encodings]
+    if pool_size:
+        opts["pool_size"] = int(pool_size)
+    from maize_data.throttle import host_budget, throttle_settings
+
+    limits = throttle_settings(cfg, source)
+    opts["budget_for"] = lambda url: host_budget(url, limits, log)
+
+    c = g.get("http_cache") or {}
+    if not c.get("enabled", False):
+        return MeteredSession(**opts)
+
+    from maize_data.http_cache import CachedSession, shared_cache
+
+    cache = shared_cache(Path(c.get("dir", ".cache/http")), int(float(c.get("max_mb", 2048)) * 1024 * 1024))
+    return CachedSession(cache, ttl_seconds=cache_ttl(cfg, source), **opts)
+
+def cache_ttl(cfg: dict[str, Any], source: str) -> float:
+    """
+    Seconds a cached GET is served without asking upstream: `sources.<source>.cache_ttl_seconds`, else
+    `global.http_cache.ttl_seconds`. With `global.http_cache.revalidate` every hit is revalidated first (0).
+    """
+    c = cfg.get("global", {}).get("http_cache") or {}
+    if c.get("revalidate", False):
+        return 0.0
+    s = cfg.get("sources", {}).get(source, {})
+    return float(s.get("cache_ttl_seconds", c.get("ttl_seconds", 86400)))
+
+def parse_shard(text: str) -> tuple[int, int]:
+    """"i/N" (1-based, as typed on the command line) -> (index 0..N-1, N)."""
+    try:
+        i, n = (int(x) for x in text.split("/"))
+    except ValueError:
+        raise ValueError(f"--shard expects i/N, e.g. 2/4; got {text!r}") from None
+    if n < 1 or not 1 <= i <= n:
+        raise ValueError(f"--shard {text}: need 1 <= i <= N")
+    return i - 1, n
+
+def in_shard(cfg: dict[str, Any], key: str) -> bool:
+    """
+    Whether this process owns work unit `key` under `global.shard` ({"index", "count"}; unsharded: always).
+    Ownership hashes the key, so adding a point or a year never moves the others to a different shard.
+    """
+    sh = cfg.get("global", {}).get("shard")
+    if not sh or int(sh["count"]) <= 1:
+        return True
+    return int(hashlib.sha256(key.encode("utf-8")).hexdigest()[:8], 16) % int(sh["count"]) == int(sh["index"])
+
+def should_skip(path: Path, force: bool, max_age_hours: float | None = None) -> bool:
+    """Exists (plain or as `.zst`, see compress.py), not forced, and younger than `max_age_hours` if given."""
+    from maize_data.compress import existing
+
+    found = existing(path)
+    if found is None or force:
+        return False
+    return max_age_hours is None or time.time() - found.stat().st_mtime < max_age_hours * 3600
+
+@contextmanager
+def atomic_path(path: Path) -> Iterator[Path]:
+    """
+    Yields a temp path next to `path`; it replaces `path` only if the block succeeds.
+    Replacing (instead of truncating in place) keeps hardlinked copies of the old file intact.
+    The block may also create a directory at the temp path (partitioned Parquet); an existing
+    directory at `path` is moved aside first and removed after the swap.
+    """
+    tmp = path.with_name(f".{path.name}.part")
+    try:
+        yield tmp
+        if tmp.is_dir() and path.exists():
+            old = path.with_name(f".{path.name}.old")
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(path, old)
+            os.replace(tmp, path)
+            if old.is_dir():
+                shutil.rmtree(old)
+            else:
+                old.unlink()
+        else:
+            os.replace(tmp, path)
+    finally:
+        if tmp.is_dir():
+            shutil.rmtree(tmp)
+        elif tmp.exists():
+            tmp.unlink()
@@ -0,0 +1,330 @@
+# src/maize_data/loader.py
+from __future__ import annotations
+
+import fnmatch
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable
+
+from maize_data.compress import existing, inner_suffix, open_read, plain, read_text
+from maize_data.io import load_yaml
+from maize_data.manifest import load_manifest, sha256_text
+from maize_data.sources import BY_NAME
+from maize_data.tables import SCHEMAS, typed
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# `maize_data.load(source, ...)`: the newest recorded artifacts of a source as one DataFrame.
+# Artifacts come from the last manifest run that recorded the source (never from hard-coded paths); a
+# partitioned Parquet directory or a hive `key=value` tree counts as one artifact. Only the requested
+# columns are read, the date range is pushed down into Parquet (row groups and year= partitions are
+# skipped) or applied per chunk while streaming a CSV, and NASA POWER point files not asked for are never
+# opened. CSV is typed like Parquet (tables.typed), so both formats give the same dtypes.
+# Results stay in an in-process LRU keyed by the artifacts' content hashes and the query, bounded by
+# `global.load.cache_mb` (default 1024) of DataFrame memory.
+
+CSV_CHUNK_ROWS = 200_000
+
+# sources whose rows carry a year (int) rather than a date
+YEAR_COLUMNS = {"worldbank_wdi": "date", "uncomtrade": "period"}
+
+class _LRU:
+    """DataFrames by key, evicting the least recently used past `max_bytes` (deep memory usage)."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[Any, tuple[pd.DataFrame, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: Any) -> pd.DataFrame | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: Any, df: pd.DataFrame) -> None:
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._items:
+                self._bytes -= self._items.pop(key)[1]
+            if size > self.max_bytes:
+                return  # would evict everything and still not fit
+            self._items[key] = (df, size)
+            self._bytes += size
+            self._trim()
+
+    def _trim(self) -> None:
+        while self._bytes > self.max_bytes and self._items:
+            _, (_, size) = self._items.popitem(last=False)
+            self._bytes -= size
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._trim()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def info(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+_CACHE = _LRU(1024 * 1024 * 1024)
+
+def cache_info() -> dict[str, int]:
+    return _CACHE.info()
+
+def clear_cache() -> None:
+    _CACHE.clear()
+
+def dataset_root(rel: Path) -> Path | None:
+    """The artifact a recorded file belongs to: itself, its partitioned `.parquet` dir, or the dir above its hive parts."""
+    parts = rel.parts
+    if any(p.startswith("_") for p in parts):
+        return None  # indexes, chunk dirs, the content store
+    for i, p in enumerate(parts[:-1]):
+        if p.endswith(".parquet"):
+            return Path(*parts[: i + 1])
+        if "=" in p:
+            return Path(*parts[:i])
+    return rel
+
+def artifacts(cfg: dict[str, Any], source: str, pattern: str | None = None) -> dict[Path, list[tuple[Path, str]]]:
+    """
+    Newest artifacts of `source` (optionally those whose name matches the glob `pattern`):
+    artifact path -> [(file on disk, content hash)]. The hash is the manifest sha256 while the file
+    still has the recorded size, otherwise its size and mtime.
+    """
+    if source not in BY_NAME:
+        raise ValueError(f"unknown source {source!r}; one of {sorted(BY_NAME)}")
+    out_dir = Path(cfg["global"]["out_dir"])
+    manifest_path = out_dir / "_MANIFEST.json"
+    runs = load_manifest(manifest_path).get("runs", [])
+    rec = next((r["sources"][source] for r in reversed(runs) if source in r.get("sources", {})), None)
+    if rec is None:
+        raise FileNotFoundError(f"{source}: nothing recorded in {manifest_path}; run `maize_data download` first")
+
+    found: dict[Path, list[tuple[Path, str]]] = {}
+    for meta in rec.get("files", []):
+        root = dataset_root(Path(meta["path"]))
+        if root is None or (pattern and not fnmatch.fnmatch(root.name, pattern)):
+            continue
+        path = existing(out_dir / meta["path"])
+        if path is None:
+            raise FileNotFoundError(f"{source}: {meta['path']} is in the manifest but not on disk")
+        st = path.stat()
+        sha = meta.get("sha256") if meta.get("bytes") == st.st_size else None
+        found.setdefault(out_dir / root, []).append((path, sha or f"{st.st_size}:{st.st_mtime_ns}"))
+    if not found:
+        raise FileNotFoundError(f"{source}: no artifacts{f' matching {pattern!r}' if pattern else ''} in the last recorded run")
+    return found
+
+def _bounds(date_range: tuple[Any, Any] | None) -> tuple[pd.Timestamp | None, pd.Timestamp | None]:
+    import pandas as pd
+
+    if not date_range:
+        return None, None
+    lo, hi = date_range
+    return (pd.Timestamp(lo) if lo is not None else None, pd.Timestamp(hi) if hi is not None else None)
+
+def _in_range(values: pd.Series, lo: Any, hi: Any) -> pd.Series:
+    keep = values.notna()
+    if lo is not None:
+        keep &= values >= lo
+    if hi is not None:
+        keep &= values <= hi
+    return keep
+
+def _hive_values(path: Path, root: Path) -> dict[str, str]:
+    return dict(p.split("=", 1) for p in path.relative_to(root).parts[:-1] if "=" in p)
+
+def _read_parquet(root: Path, columns: list[str] | None, date_col: str | None, lo: Any, hi: Any) -> pd.DataFrame:
+    import pandas as pd
+
+    filters = []
+    if date_col is not None:
+        if lo is not None:
+            filters.append((date_col, ">=", lo))
+        if hi is not None:
+            filters.append((date_col, "<=", hi))
+    df = pd.read_parquet(root, engine="pyarrow", columns=columns, filters=filters or None)
+    if root.is_dir():
+        # pyarrow reads hive partition values (product_id=3) as categoricals; numeric ones go back to numbers
+        for c in df.columns:
+            if isinstance(df[c].dtype, pd.CategoricalDtype) and pd.api.types.is_integer_dtype(df[c].cat.categories):
+                df[c] = df[c].astype("int64")
+    return df
+
+def _read_csv(path: Path, source: str, columns: list[str] | None, date_col: str | None, lo: Any, hi: Any) -> pd.DataFrame:
+    """Streams the CSV in chunks, keeping only the wanted columns and rows, then types it like Parquet."""
+    import pandas as pd
+
+    usecols = None
+    if columns is not None:
+        # typed() turns "30.00/Kg" prices into <col> + <col>_unit; both come from the raw <col>
+        units = set(SCHEMAS.get(source, {}).get("unit_prices", []))
+        raw = {c[: -len("_unit")] if c.endswith("_unit") and c[: -len("_unit")] in units else c for c in columns}
+        if date_col is not None:
+            raw.add(date_col)
+        usecols = lambda c: c in raw  # noqa: E731 - also tolerates hive columns that are not in the file
+    kept = []
+    with open_read(path) as f:
+        for chunk in pd.read_csv(f, usecols=usecols, chunksize=CSV_CHUNK_ROWS):
+            if date_col is not None and date_col in chunk.columns and (lo is not None or hi is not None):
+                when = pd.to_numeric(chunk[date_col], errors="coerce") if source in YEAR_COLUMNS else pd.to_datetime(chunk[date_col], errors="coerce")
+                chunk = chunk[_in_range(when, lo, hi)]
+            kept.append(chunk)
+    df = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame()
+    return typed(df, source)
+
+def _read_power(path: Path, point: str, columns: list[str] | None, lo: Any, hi: Any) -> pd.DataFrame:
+    """One POWER point file as rows of point_id, date and the requested parameters (-999 fill -> NaN)."""
+    import numpy as np
+    import pandas as pd
+
+    from maize_data.features import FILL_VALUE
+
+    series = json.loads(read_text(path)).get("properties", {}).get("parameter", {})
+    wanted = [c for c in (columns or list(series)) if c in series]
+    df = pd.DataFrame({c: pd.Series(series[c], dtype=float) for c in wanted})
+    df.index = pd.to_datetime(df.index, format="%Y%m%d")
+    df = df.sort_index()
+    df = df[_in_range(df.index.to_series(), lo, hi).to_numpy()]
+    df = df.mask(df <= FILL_VALUE, np.nan).astype(np.float32)
+    df.insert(0, "point_id", point)
+    return df.rename_axis("date").reset_index()[["point_id", "date", *wanted]]
+
+def _power_point(root: Path) -> str | None:
+    """Point id of a POWER artifact (`power_daily_<id>.json`, or `.json.zst` when compressed); None for other files."""
+    name = plain(root).name
+    if name.startswith("power_daily_") and name.endswith(".json"):
+        return name[len("power_daily_") : -len(".json")]
+    return None
+
+def _date_column(source: str) -> str | None:
+    if source in YEAR_COLUMNS:
+        return YEAR_COLUMNS[source]
+    dates = SCHEMAS.get(source, {}).get("dates")
+    return dates[0] if dates else None
+
+def _read_artifact(
+    root: Path, files: list[Path], source: str, columns: list[str] | None, date_range: tuple[Any, Any] | None
+) -> pd.DataFrame:
+    date_col = _date_column(source)
+    lo, hi = _bounds(date_range)
+    if date_col is not None and source in YEAR_COLUMNS:
+        lo, hi = (lo.year if lo is not None else None), (hi.year if hi is not None else None)
+
+    if source == "nasa_power":
+        return _read_power(files[0], _power_point(root) or root.name, columns, lo, hi)
+    if inner_suffix(files[0]) == ".parquet":
+        # a single file, a year= partitioned dir or a hive tree: pyarrow prunes partitions and row groups
+        df = _read_parquet(root if root.is_dir() else files[0], columns, date_col, lo, hi)
+        if SCHEMAS.get(source, {}).get("partition") == "year" and columns is None:
+            df = df.drop(columns=["year"], errors="ignore")  # write_table's layout, not a column of the data
+        return df
+    if inner_suffix(files[0]) != ".csv":
+        raise ValueError(f"{source}: {root.name} is not a table (CSV/Parquet)")
+
+    import pandas as pd
+
+    frames = []
+    for f in sorted(files):
+        df = _read_csv(f, source, columns, date_col, lo, hi)
+        for k, v in _hive_values(f, root).items():
+            df[k] = int(v) if v.isdigit() else v
+        frames.append(df)
+    return _concat(frames)
+
+def _concat(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenates, keeping columns categorical when they were in every part (pandas falls back to object)."""
+    import pandas as pd
+
+    if len(frames) == 1:
+        return frames[0]
+    cats = set.intersection(*({c for c in f.columns if isinstance(f[c].dtype, pd.CategoricalDtype)} for f in frames)) if frames else set()
+    out = pd.concat(frames, ignore_index=True)
+    for c in cats:
+        out[c] = out[c].astype("category")
+    return out
+
+def _config(config: dict[str, Any] | str | Path) -> dict[str, Any]:
+    return config if isinstance(config, dict) else load_yaml(Path(config))
+
+def load(
+    source: str,
+    columns: Iterable[str] | None = None,
+    date_range: tuple[Any, Any] | None = None,
+    points: Iterable[str] | None = None,
+    artifact: str | None = None,
+    config: dict[str, Any] | str | Path = "configs/download.yaml",
+    cache: bool = True,
+) -> pd.DataFrame:
+    """
+    The newest downloaded data of `source` (a key under `sources:`) as one DataFrame.
+
+    columns     only these columns (pushed down into Parquet / `usecols` for CSV)
+    date_range  (start, end), inclusive, either may be None; years for worldbank_wdi / uncomtrade
+    points      NASA POWER point ids (nasa_power only); other points' files are not read
+    artifact    glob on artifact names, e.g. "KEN_all_*" for WDI; when several artifacts match they are
+                concatenated with an `artifact` column
+    config      config dict or path (for global.out_dir and global.load.cache_mb)
+
+    The result is shared with the cache: copy it before modifying in place.
+    """
+    cfg = _config(config)
+    _CACHE.resize(int(float((cfg.get("global", {}).get("load") or {}).get("cache_mb", 1024)) * 1024 * 1024))
+    found = artifacts(cfg, source, artifact)
+    if points is not None:
+        if source != "nasa_power":
+            raise ValueError("points= only applies to nasa_power")
+        wanted = set(map(str, points))
+        found = {root: files for root, files in found.items() if _power_point(root) in wanted}
+        if not found:
+            raise FileNotFoundError(f"nasa_power: none of the points {sorted(wanted)} are downloaded")
+    elif source == "nasa_power":
+        found = {root: files for root, files in found.items() if _power_point(root) is not None}
+
+    cols = list(columns) if columns is not None else None
+    span = tuple(str(x) if x is not None else None for x in date_range) if date_range else None
+    key = (
+        source,
+        sha256_text("\n".join(f"{root}:{h}" for root, files in sorted(found.items()) for _, h in sorted(files))),
+        tuple(cols) if cols is not None else None,
+        span,
+    )
+    if cache:
+        hit = _CACHE.get(key)
+        if hit is not None:
+            return hit
+
+    frames = []
+    for root, files in sorted(found.items()):
+        df = _read_artifact(root, [p for p, _ in files], source, cols, date_range)
+        if len(found) > 1 and source != "nasa_power":
+            df["artifact"] = root.name
+        frames.append(df)
+    out = _concat(frames)
+    if cols is not None:
+        keys = ["point_id", "date"] if source == "nasa_power" else []
+        extra = [c for c in ("artifact",) if c in out.columns and c not in cols]
+        out = out[keys + [c for c in cols if c in out.columns and c not in keys] + extra]
+    if len(found) > 1 and "artifact" in out.columns:
+        out["artifact"] = out["artifact"].astype("category")
+    if source == "nasa_power":
+        out["point_id"] = out["point_id"].astype("category")
+    if cache:
+        _CACHE.put(key, out)
+    return out
@@ -5,10 +5,15 @@ import hashlib
 import json
 import os
 import subprocess
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
+
+from maize_data.compress import existing
+from maize_data.io import atomic_path, stat_version, warm
 
 SCHEMA_VERSION = 1
 
@@ -20,6 +25,10 @@ def sha256_text(text: str) -> str:
     h.update(text.encode("utf-8"))
     return h.hexdigest()
 
+def params_key(obj: Any) -> str:
+    """Short stable hash of JSON-able request parameters (dict key order does not matter)."""
+    return sha256_text(json.dumps(obj, sort_keys=True, default=str))[:16]
+
 def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
     h = hashlib.sha256()
     with path.open("rb") as f:
@@ -37,9 +46,14 @@ def try_git_rev() -> str | None:
     except Exception:
         return None
 
+# Pipeline stages and asyncio sources read and update manifests from several threads: every read, write and
+# read-modify-write (`editing`) holds this lock, and writes replace the file so other processes never see half of it.
+_LOCK = threading.RLock()
+
 def load_manifest(path: Path) -> dict[str, Any]:
-    if path.exists():
-        return json.loads(path.read_text(encoding="utf-8"))
+    with _LOCK:
+        if path.exists():
+            return json.loads(path.read_text(encoding="utf-8"))
     return {
         "schema_version": SCHEMA_VERSION,
         "project": "maize-external-data",
@@ -48,12 +62,26 @@ def load_manifest(path: Path) -> dict[str, Any]:
 
 def save_manifest(path: Path, manifest: dict[str, Any]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    with _LOCK, atomic_path(path) as tmp:
+        tmp.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+
+@contextmanager
+def editing(path: Path) -> Iterator[dict[str, Any]]:
+    """The manifest at `path`, saved when the block succeeds; no other thread reads or writes it meanwhile."""
+    with _LOCK:
+        manifest = load_manifest(path)
+        yield manifest
+        save_manifest(path, manifest)
 
 def list_files_recursive(root: Path) -> list[Path]:
     if not root.exists():
         return []
-    return [p for p in root.rglob("*") if p.is_file()]
+    # dot-files are in-flight temp files (atomic_path), possibly another shard's; `_`-prefixed directories
+    # (e.g. uncomtrade/_chunks) hold work in progress that is merged and removed, not artifacts
+    return [
+        p for p in root.rglob("*")
+        if p.is_file() and not p.name.startswith(".") and not any(d.startswith("_") for d in p.relative_to(root).parts[:-1])
+    ]
 
 def file_meta(path: Path, base_dir: Path, do_hash: bool) -> dict[str, Any]:
     st = path.stat()
@@ -65,6 +93,11 @@ def file_meta(path: Path, base_dir: Path, do_hash: bool) -> dict[str, Any]:
     }
     if do_hash:
         meta["sha256"] = sha256_file(path)
+    if path.suffix == ".parquet":
+        # footer only: column names/types and row count (global.output_format: parquet)
+        from maize_data.tables import parquet_schema
+
+        meta["schema"] = parquet_schema(path)
     return meta
 
 @dataclass
@@ -77,6 +110,7 @@ class RunContext:
     skip_auth: bool
     force: bool
     hash_files: bool
+    content_store: bool = False
 
 def start_run(
     manifest_path: Path,
@@ -85,6 +119,7 @@ def start_run(
     skip_auth: bool,
     force: bool,
     hash_files: bool,
+    content_store: bool = False,
 ) -> RunContext:
     rid = f"run_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}"
     ctx = RunContext(
@@ -96,32 +131,32 @@ def start_run(
         skip_auth=skip_auth,
         force=force,
         hash_files=hash_files,
+        content_store=content_store,
     )
 
-    manifest = load_manifest(manifest_path)
-    manifest["runs"].append(
-        {
-            "run_id": ctx.run_id,
-            "started_at": ctx.started_at,
-            "ended_at": None,
-            "config_path": ctx.config_path,
-            "config_sha256": ctx.config_sha256,
-            "git_rev": ctx.git_rev,
-            "skip_auth": ctx.skip_auth,
-            "force": ctx.force,
-            "hash_files": ctx.hash_files,
-            "sources": {},
-            "notes": [],
-        }
-    )
-    save_manifest(manifest_path, manifest)
+    with editing(manifest_path) as manifest:
+        manifest["runs"].append(
+            {
+                "run_id": ctx.run_id,
+                "started_at": ctx.started_at,
+                "ended_at": None,
+                "config_path": ctx.config_path,
+                "config_sha256": ctx.config_sha256,
+                "git_rev": ctx.git_rev,
+                "skip_auth": ctx.skip_auth,
+                "force": ctx.force,
+                "hash_files": ctx.hash_files,
+                "content_store": ctx.content_store,
+                "sources": {},
+                "notes": [],
+            }
+        )
     return ctx
 
 def append_note(manifest_path: Path, run_id: str, note: str) -> None:
-    manifest = load_manifest(manifest_path)
-    run = next(r for r in manifest["runs"] if r["run_id"] == run_id)
-    run.setdefault("notes", []).append({"at": utc_now_iso(), "note": note})
-    save_manifest(manifest_path, manifest)
+    with editing(manifest_path) as manifest:
+        run = next(r for r in manifest["runs"] if r["run_id"] == run_id)
+        run.setdefault("notes", []).append({"at": utc_now_iso(), "note": note})
 
 def record_source(
     manifest_path: Path,
@@ -131,7 +166,9 @@ def record_source(
     base_out_dir: Path,
     source_out_dir: Path,
     hash_files: bool,
-) -> None:
+    metrics: dict[str, Any] | None = None,
+    fingerprint: dict[str, Any] | None = None,
+) -> dict[str, Any]:
     files = list_files_recursive(source_out_dir)
     payload = {
         "params": source_params,
@@ -140,14 +177,114 @@ def record_source(
         "files": [file_meta(p, base_out_dir, hash_files) for p in sorted(files)],
         "recorded_at": utc_now_iso(),
     }
+    if metrics is not None:
+        payload["metrics"] = metrics
+    if fingerprint is not None:
+        payload["fingerprint"] = fingerprint
+
+    with editing(manifest_path) as manifest:
+        run = next(r for r in manifest["runs"] if r["run_id"] == run_id)
+        run["sources"][source_name] = payload
+    return payload
+
+def latest_file_entries(manifest_path: Path) -> dict[str, dict[str, Any]]:
+    """Latest recorded entry per file path (relative to out_dir), across all runs. Read-only (see io.warm)."""
 
-    manifest = load_manifest(manifest_path)
-    run = next(r for r in manifest["runs"] if r["run_id"] == run_id)
-    run["sources"][source_name] = payload
-    save_manifest(manifest_path, manifest)
+    def build() -> dict[str, dict[str, Any]]:
+        files: dict[str, dict[str, Any]] = {}
+        for run in load_manifest(manifest_path).get("runs", []):
+            for rec in run.get("sources", {}).values():
+                for meta in rec.get("files", []):
+                    files[meta["path"]] = meta
+        return files
+
+    return warm("latest_files", str(manifest_path), build, version=stat_version(manifest_path))
+
+def inputs_sha256(paths: list[Path], base_dir: Path, recorded: dict[str, dict[str, Any]], extra: str = "") -> str:
+    """
+    One hash over the contents of `paths` (directories: every file under them) plus `extra`.
+    Reuses the sha256 in `recorded` (latest_file_entries) when the size still matches, so unchanged
+    downloads are not re-read.
+    """
+    digests = []
+    for p in paths:
+        files = sorted(f for f in p.rglob("*") if f.is_file()) if p.is_dir() else [p]
+        for f in files:
+            rel = str(f.relative_to(base_dir)) if f.is_relative_to(base_dir) else str(f)
+            meta = recorded.get(rel, {})
+            sha = meta.get("sha256") if meta.get("bytes") == f.stat().st_size else None
+            digests.append(f"{rel}:{sha or sha256_file(f)}")
+    return sha256_text("\n".join(digests + [extra]))
 
 def end_run(manifest_path: Path, run_id: str) -> None:
-    manifest = load_manifest(manifest_path)
-    run = next(r for r in manifest["runs"] if r["run_id"] == run_id)
-    run["ended_at"] = utc_now_iso()
-    save_manifest(manifest_path, manifest)
+    with editing(manifest_path) as manifest:
+        run = next(r for r in manifest["runs"] if r["run_id"] == run_id)
+        run["ended_at"] = utc_now_iso()
+
+def shard_fragment_path(out_dir: Path, index: int, count: int) -> Path:
+    """Manifest written by `download --shard i/N` instead of _MANIFEST.json (index is 0-based)."""
+    return out_dir / "_shards" / f"shard-{index + 1}-of-{count}.json"
+
+def _sum_metrics(a: dict[str, Any], b: dict[str, Any]) -> dict[str, Any]:
+    out = dict(a)
+    for k, v in b.items():
+        if k == "wall_s":  # shards run side by side
+            out[k] = max(out.get(k, 0.0), v)
+        elif isinstance(v, dict):  # phases_s, status_codes
+            prev = out.get(k, {})
+            out[k] = {kk: round(prev.get(kk, 0) + v.get(kk, 0), 3) for kk in sorted(set(prev) | set(v))}
+        elif isinstance(v, (int, float)):
+            out[k] = out.get(k, 0) + v
+    return out
+
+def merge_shards(manifest_path: Path, fragments: list[Path]) -> dict[str, Any]:
+    """
+    Combines the latest run of every shard fragment into one run appended to `manifest_path`:
+    per source the union of recorded files still on disk (newest entry per path), summed metrics, all notes.
+    """
+    runs = []
+    for frag in sorted(fragments):
+        frag_runs = load_manifest(frag).get("runs", [])
+        if frag_runs:
+            runs.append((frag.name, frag_runs[-1]))
+    if not runs:
+        raise ValueError("no shard runs to merge")
+    configs = {r["config_sha256"] for _, r in runs}
+    if len(configs) > 1:
+        raise ValueError(f"shards ran with different configs ({len(configs)} distinct config_sha256)")
+
+    first = min((r for _, r in runs), key=lambda r: r["started_at"])
+    merged: dict[str, Any] = {
+        **{k: first.get(k) for k in ("config_path", "config_sha256", "git_rev", "skip_auth", "force", "hash_files", "content_store")},
+        "run_id": f"run_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}",
+        "started_at": first["started_at"],
+        "ended_at": max((r.get("ended_at") or "" for _, r in runs), default="") or None,
+        "shards": [{"fragment": name, "run_id": r["run_id"], "started_at": r["started_at"], "ended_at": r.get("ended_at")} for name, r in runs],
+        "sources": {},
+        "notes": [],
+    }
+    for name, r in runs:
+        merged["notes"] += [{**n, "note": f"[{name}] {n['note']}"} for n in r.get("notes", [])]
+        for source, rec in r.get("sources", {}).items():
+            cur = merged["sources"].get(source)
+            if cur is None:
+                merged["sources"][source] = {**rec, "files": list(rec.get("files", []))}
+                continue
+            files = {f["path"]: f for f in cur["files"]}
+            for f in rec.get("files", []):
+                if f["path"] not in files or f.get("modified_utc", "") >= files[f["path"]].get("modified_utc", ""):
+                    files[f["path"]] = f
+            cur["files"] = [files[k] for k in sorted(files)]
+            cur["recorded_at"] = max(cur["recorded_at"], rec["recorded_at"])
+            if "metrics" in rec:
+                cur["metrics"] = _sum_metrics(cur.get("metrics", {}), rec["metrics"])
+            cur.setdefault("fingerprint", rec.get("fingerprint"))
+    # a shard that finished later may have removed what an earlier one recorded (merged Comtrade chunks)
+    out_dir = manifest_path.parent
+    for rec in merged["sources"].values():
+        rec["files"] = [f for f in rec["files"] if existing(out_dir / f["path"]) is not None]
+        rec["file_count"] = len(rec["files"])
+
+    with editing(manifest_path) as manifest:
+        manifest["runs"].append(merged)
+    return merged
@@ -0,0 +1,158 @@
+# src/maize_data/metrics.py
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+@dataclass
+class SourceMetrics:
+    source: str
+    run_id: str | None = None
+    wall_s: float = 0.0
+    phases: dict[str, float] = field(default_factory=dict)
+    requests: int = 0
+    retries: int = 0
+    cache_hits: int = 0
+    status_codes: dict[str, int] = field(default_factory=dict)
+    bytes_received: int = 0
+    bytes_written: int = 0
+    rows: int = 0
+    last_latency_s: float | None = None
+    spans: list[dict[str, Any]] = field(default_factory=list)
+    on_written: Callable[[Path, int], None] | None = field(default=None, repr=False)  # (path, bytes), e.g. aio events
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_phase(self, name: str, seconds: float, start: float | None = None, **attrs: Any) -> None:
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+            if start is not None:
+                self.spans.append({"name": name, "start": start, "duration_s": seconds, **attrs})
+
+    def observe_response(
+        self, status: int, n_bytes: int, seconds: float, start: float, retries: int = 0, url: str = ""
+    ) -> None:
+        with self._lock:
+            self.requests += 1
+            self.retries += retries
+            self.bytes_received += n_bytes
+            self.status_codes[str(status)] = self.status_codes.get(str(status), 0) + 1
+            self.last_latency_s = seconds
+        self.add_phase("network", seconds, start=start, status=status, bytes=n_bytes, url=url)
+
+    def observe_cache_hit(self) -> None:
+        with self._lock:
+            self.cache_hits += 1
+
+    def add_rows(self, n: int) -> None:
+        with self._lock:
+            self.rows += int(n)
+
+    def add_written(self, path: Path) -> None:
+        size = sum(p.stat().st_size for p in path.rglob("*") if p.is_file()) if path.is_dir() else path.stat().st_size
+        with self._lock:
+            self.bytes_written += size
+        if self.on_written is not None:
+            self.on_written(path, size)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "wall_s": round(self.wall_s, 3),
+                "phases_s": {k: round(v, 3) for k, v in sorted(self.phases.items())},
+                "requests": self.requests,
+                "retries": self.retries,
+                "cache_hits": self.cache_hits,
+                "status_codes": dict(sorted(self.status_codes.items())),
+                "bytes_received": self.bytes_received,
+                "bytes_written": self.bytes_written,
+                "rows": self.rows,
+            }
+
+_current: ContextVar[SourceMetrics | None] = ContextVar("maize_data_metrics", default=None)
+_unscoped = SourceMetrics(source="unscoped")
+
+def current() -> SourceMetrics:
+    """Metrics of the source being downloaded; a throwaway sink when called outside `source()`."""
+    return _current.get() or _unscoped
+
+@contextmanager
+def source(name: str, run_id: str | None = None) -> Iterator[SourceMetrics]:
+    m = SourceMetrics(source=name, run_id=run_id)
+    token = _current.set(m)
+    start = time.time()
+    t0 = time.perf_counter()
+    try:
+        yield m
+    finally:
+        m.wall_s = time.perf_counter() - t0
+        with m._lock:
+            m.spans.insert(0, {"name": "source", "start": start, "duration_s": m.wall_s})
+        _current.reset(token)
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    m = current()
+    start = time.time()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        m.add_phase(name, time.perf_counter() - t0, start=start, **attrs)
+
+def sleep(seconds: float) -> None:
+    """time.sleep that is accounted as throttle time."""
+    if seconds > 0:
+        with span("throttle"):
+            time.sleep(seconds)
+
+def _escape(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**kv: Any) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in kv.items()) + "}"
+
+def write_prometheus(path: Path, run_id: str, all_metrics: list[SourceMetrics]) -> None:
+    """Node-exporter textfile format; written via rename so the collector never reads a partial file."""
+    lines = [
+        "# HELP maize_data_run_timestamp_seconds Unix time the run's metrics were written.",
+        "# TYPE maize_data_run_timestamp_seconds gauge",
+        f"maize_data_run_timestamp_seconds{_labels(run_id=run_id)} {time.time():.0f}",
+    ]
+    gauges = [
+        ("source_wall_seconds", "Wall time spent in the source downloader.", lambda m: [({}, m.wall_s)]),
+        ("source_phase_seconds", "Time per phase (network, parse, write, throttle).", lambda m: [({"phase": k}, v) for k, v in sorted(m.phases.items())]),
+        ("source_requests", "HTTP requests sent upstream.", lambda m: [({}, m.requests)]),
+        ("source_retries", "HTTP retries.", lambda m: [({}, m.retries)]),
+        ("source_cache_hits", "Responses served from the HTTP cache.", lambda m: [({}, m.cache_hits)]),
+        ("source_http_responses", "HTTP responses by status code.", lambda m: [({"code": k}, v) for k, v in sorted(m.status_codes.items())]),
+        ("source_bytes_received", "Bytes received from upstream.", lambda m: [({}, m.bytes_received)]),
+        ("source_bytes_written", "Bytes written to out_dir.", lambda m: [({}, m.bytes_written)]),
+        ("source_rows", "Tabular rows produced.", lambda m: [({}, m.rows)]),
+    ]
+    for name, help_text, values in gauges:
+        lines.append(f"# HELP maize_data_{name} {help_text}")
+        lines.append(f"# TYPE maize_data_{name} gauge")
+        for m in all_metrics:
+            for extra, v in values(m):
+                lines.append(f"maize_data_{name}{_labels(source=m.source, **extra)} {v:g}")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+def write_spans(path: Path, m: SourceMetrics) -> None:
+    """Appends this source's spans as JSON lines (one object per span)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with m._lock:
+        spans = list(m.spans)
+    with path.open("a", encoding="utf-8") as f:
+        for s in spans:
+            f.write(json.dumps({"run_id": m.run_id, "source": m.source, **s}) + "\n")
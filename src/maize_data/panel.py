@@ -0,0 +1,238 @@
+# src/maize_data/panel.py
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from maize_data.boundaries import norm_name, slugify
+from maize_data.compress import inner_suffix, plain
+from maize_data.io import atomic_path
+from maize_data.manifest import inputs_sha256, latest_file_entries, utc_now_iso
+from maize_data.tables import find_table, read_table, split_unit_price
+
+# One normalized price panel over KAMIS, Socrata and WFP (HDX):
+#   date, county, county_id, market, commodity, wholesale_kes_per_kg, retail_kes_per_kg, source
+# Each input artifact (a KAMIS product file, the Socrata dataset, the WFP table) is normalized into its own
+# partition under <panel_dir>/parts/; a partition is rebuilt only when the hashes of its inputs change.
+
+# Bump when normalization changes so every partition is rebuilt once.
+PANEL_VERSION = 1
+
+# Duplicate (date, county, market, commodity) rows across sources keep the first source in this order.
+SOURCE_PRIORITY = ["kamis", "opendata_ke", "wfp_hdx"]
+
+KEYS = ["date", "county_id", "market_key", "commodity"]
+COLUMNS = ["date", "county", "county_id", "market", "commodity", "wholesale_kes_per_kg", "retail_kes_per_kg", "source"]
+
+COMMODITY_ALIASES = {
+    "dry maize": "maize",
+    "maize white": "maize",
+    "maize (white)": "maize",
+    "maize grain": "maize",
+    "maize (white, dry)": "maize",
+    "maize flour": "maize flour",
+    "maize flour (white)": "maize flour",
+    "beans rosecoco": "beans (rosecoco)",
+    "red sorghum": "sorghum (red)",
+}
+
+_UNIT_KG = {"kg": 1.0, "kilogram": 1.0, "g": 0.001, "gram": 0.001, "ton": 1000.0, "tonne": 1000.0, "mt": 1000.0}
+
+def unit_to_kg(units: pd.Series) -> pd.Series:
+    """Kilograms per unit: "Kg" -> 1, "90 KG" -> 90, "50 kg bag" -> 50, "MT" -> 1000; anything else NaN."""
+    u = units.astype("string").str.strip().str.lower()
+    cats = pd.Series(u.dropna().unique(), dtype="string")
+    # resolve once per distinct unit string, then map back
+    m = cats.str.extract(r"^(\d+(?:\.\d+)?)?\s*(kgs?|kilograms?|g|grams?|tonnes?|tons?|mt)\b")
+    qty = pd.to_numeric(m[0], errors="coerce").fillna(1.0)
+    base = m[1].str.rstrip("s").map(_UNIT_KG)
+    factors = dict(zip(cats, (qty * base.astype(float)).to_numpy()))
+    return u.map(factors).astype(float)
+
+def _commodity(s: pd.Series) -> pd.Series:
+    def one(v: str) -> str:
+        n = re.sub(r"\s+", " ", str(v).strip().lower())
+        return COMMODITY_ALIASES.get(n, norm_name(n))
+
+    uniq = {v: one(v) for v in s.dropna().unique()}
+    return s.map(uniq)
+
+def _market_key(s: pd.Series) -> pd.Series:
+    uniq = {v: re.sub(r"\s+market$", "", norm_name(str(v))) for v in s.dropna().unique()}
+    return s.map(uniq)
+
+def _county_id(s: pd.Series) -> pd.Series:
+    uniq = {v: re.sub(r"_county$", "", slugify(str(v))) for v in s.dropna().unique()}
+    return s.map(uniq)
+
+def _finish(df: pd.DataFrame, source: str) -> pd.DataFrame:
+    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.normalize()
+    df["commodity"] = _commodity(df["commodity"])
+    df["county_id"] = _county_id(df["county"])
+    df["market_key"] = _market_key(df["market"])
+    df["source"] = source
+    df = df.dropna(subset=["date", "commodity"])
+    df = df[df["wholesale_kes_per_kg"].notna() | df["retail_kes_per_kg"].notna()]
+    # one row per key within a source (KAMIS pages can overlap, WFP has several units per market/day)
+    agg = {"county": "first", "market": "first", "wholesale_kes_per_kg": "mean", "retail_kes_per_kg": "mean", "source": "first"}
+    return df.groupby(KEYS, sort=True, dropna=False, observed=True, as_index=False).agg(agg)
+
+def normalize_kamis(path: Path) -> pd.DataFrame:
+    df = read_table(path)
+    out = pd.DataFrame({"date": df["Date"], "county": df["County"], "market": df["Market"], "commodity": df["Commodity"]})
+    for col, name in (("Wholesale", "wholesale_kes_per_kg"), ("Retail", "retail_kes_per_kg")):
+        if f"{col}_unit" in df.columns:  # Parquet output: already split
+            value, unit = pd.to_numeric(df[col], errors="coerce"), df[f"{col}_unit"]
+        else:
+            value, unit = split_unit_price(df[col])
+        out[name] = value.astype(float) / unit_to_kg(unit.fillna("kg"))
+    return _finish(out, "kamis")
+
+def _normalize_wfp_like(df: pd.DataFrame, source: str, fx: dict[int, float], cols: dict[str, str]) -> pd.DataFrame:
+    df = df.rename(columns={v: k for k, v in cols.items()})
+    df = df[~df["date"].astype("string").fillna("").str.startswith("#")]  # HXL tag row
+    date = pd.to_datetime(df["date"], errors="coerce")
+    price = pd.to_numeric(df["price"], errors="coerce").astype(float)
+    currency = df["currency"].astype("string").str.upper() if "currency" in df.columns else pd.Series("KES", index=df.index)
+    # USD (or anything non-KES quoted alongside usdprice) goes through WDI's official LCU/USD rate for that year
+    rate = date.dt.year.map(fx).astype(float)
+    kes = np.where(currency == "KES", price, np.where(currency == "USD", price * rate, np.nan))
+    per_kg = kes / unit_to_kg(df["unit"]).to_numpy()
+    ptype = df["pricetype"].astype("string").str.lower() if "pricetype" in df.columns else pd.Series("retail", index=df.index)
+    out = pd.DataFrame({
+        "date": date,
+        "county": df["county"],
+        "market": df["market"],
+        "commodity": df["commodity"],
+        "wholesale_kes_per_kg": np.where(ptype == "wholesale", per_kg, np.nan),
+        "retail_kes_per_kg": np.where(ptype == "retail", per_kg, np.nan),
+    })
+    return _finish(out, source)
+
+WFP_COLUMNS = {
+    "date": "date", "county": "admin1", "market": "market", "commodity": "commodity",
+    "unit": "unit", "pricetype": "pricetype", "currency": "currency", "price": "price",
+}
+
+def fx_table(cfg: dict[str, Any], out_dir: Path) -> Path | None:
+    """The WDI PA.NUS.FCRF download for `sources.worldbank_wdi.country`, if there is one."""
+    country = cfg.get("sources", {}).get("worldbank_wdi", {}).get("country", "KEN")
+    return find_table(out_dir / "worldbank_wdi" / f"{country}_PA.NUS.FCRF.csv")
+
+def load_fx(p: Path | None) -> dict[int, float]:
+    """Year -> local currency per USD from the WDI exchange-rate table (fx_table)."""
+    if p is None:
+        return {}
+    df = read_table(p)
+    df = df.dropna(subset=["value"])
+    return {int(y): float(v) for y, v in zip(pd.to_numeric(df["date"], errors="coerce"), df["value"]) if pd.notna(y)}
+
+def _partitions(cfg: dict[str, Any], out_dir: Path) -> dict[str, tuple[str, list[Path], Callable[[], pd.DataFrame]]]:
+    """partition name -> (source, input paths, loader)."""
+    sources = cfg.get("sources", {})
+    pcfg = cfg.get("global", {}).get("panel") or {}
+    fx = load_fx(fx_table(cfg, out_dir))
+    parts: dict[str, tuple[str, list[Path], Callable[[], pd.DataFrame]]] = {}
+
+    kamis_dir = out_dir / "kamis"
+    stems = sorted({plain(p).stem for p in kamis_dir.glob("kamis_product*") if inner_suffix(p) in (".csv", ".parquet")})
+    for stem in stems:
+        path = find_table(kamis_dir / f"{stem}.csv")
+        parts[f"kamis__{stem}"] = ("kamis", [path], lambda path=path: normalize_kamis(path))
+    # `products: all` store: kamis/all/product_id=<id>/part-0.*
+    for d in sorted(kamis_dir.glob("all/product_id=*")):
+        path = find_table(d / "part-0.csv")
+        if path is not None:
+            parts[f"kamis__all_{d.name.split('=', 1)[1]}"] = ("kamis", [path], lambda path=path: normalize_kamis(path))
+
+    soc = sources.get("kenya_opendata_socrata", {})
+    if soc.get("dataset_id"):
+        path = find_table(out_dir / "opendata_ke" / f"{soc['dataset_id']}.csv")
+        if path is not None:
+            cols = {**WFP_COLUMNS, **(pcfg.get("socrata_columns") or {})}
+            parts[f"opendata_ke__{plain(path).stem}"] = (
+                "opendata_ke", [path], lambda path=path, cols=cols: _normalize_wfp_like(read_table(path), "opendata_ke", fx, cols)
+            )
+
+    path = find_table(out_dir / "wfp_hdx" / "wfp_food_prices_raw.csv")
+    if path is not None:
+        parts["wfp_hdx__wfp_food_prices_raw"] = (
+            "wfp_hdx", [path], lambda path=path: _normalize_wfp_like(read_table(path), "wfp_hdx", fx, WFP_COLUMNS)
+        )
+    return parts
+
+def build_panel(
+    cfg: dict[str, Any],
+    panel_dir: Path | None = None,
+    force: bool = False,
+    log: Callable[[str], None] = print,
+) -> dict[str, Any]:
+    """Rebuilds changed partitions, then the combined, de-duplicated `<panel_dir>/price_panel.parquet`."""
+    out_dir = Path(cfg.get("global", {}).get("out_dir", "data_raw"))
+    pcfg = cfg.get("global", {}).get("panel") or {}
+    panel_dir = Path(panel_dir or pcfg.get("dir", "data/price_panel"))
+    parts_dir = panel_dir / "parts"
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    state_path = panel_dir / "_state.json"
+    state = json.loads(state_path.read_text(encoding="utf-8")) if state_path.exists() else {"partitions": {}}
+
+    recorded = latest_file_entries(out_dir / "_MANIFEST.json")
+    # the FX table feeds every WFP-like partition, so it is part of their fingerprint
+    fx_path = fx_table(cfg, out_dir)
+    settings = json.dumps({"v": PANEL_VERSION, "panel": pcfg}, sort_keys=True)
+
+    parts = _partitions(cfg, out_dir)
+    rebuilt, kept = [], []
+    for name, (source, paths, loader) in parts.items():
+        inputs = paths + ([fx_path] if fx_path is not None and source != "kamis" else [])
+        fp = inputs_sha256(inputs, out_dir, recorded, settings)
+        target = parts_dir / f"{name}.parquet"
+        prev = state["partitions"].get(name, {})
+        if not force and prev.get("fingerprint") == fp and target.exists():
+            kept.append(name)
+            continue
+        df = loader()
+        with atomic_path(target) as tmp:
+            df.to_parquet(tmp, engine="pyarrow", compression="zstd", index=False)
+        state["partitions"][name] = {"fingerprint": fp, "source": source, "rows": len(df), "built_at": utc_now_iso()}
+        rebuilt.append(name)
+        log(f"Panel: rebuilt {name} rows={len(df)}")
+
+    # inputs that disappeared take their partition with them
+    for name in [n for n in state["partitions"] if n not in parts]:
+        (parts_dir / f"{name}.parquet").unlink(missing_ok=True)
+        del state["partitions"][name]
+        rebuilt.append(name)
+        log(f"Panel: dropped {name}")
+
+    panel_path = panel_dir / "price_panel.parquet"
+    if rebuilt or force or not panel_path.exists():
+        frames = [pd.read_parquet(parts_dir / f"{n}.parquet") for n in sorted(state["partitions"])]
+        panel = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS + ["market_key"])
+        rank = panel["source"].map({s: i for i, s in enumerate(SOURCE_PRIORITY)}).fillna(len(SOURCE_PRIORITY))
+        before = len(panel)
+        panel = (
+            panel.assign(_rank=rank)
+            .sort_values(KEYS + ["_rank"], kind="stable")
+            .drop_duplicates(subset=KEYS, keep="first")
+        )
+        panel = panel[COLUMNS].reset_index(drop=True)
+        for c in ("county", "county_id", "market", "commodity", "source"):
+            panel[c] = panel[c].astype("category")
+        with atomic_path(panel_path) as tmp:
+            panel.to_parquet(tmp, engine="pyarrow", compression="zstd", index=False)
+        state["rows"] = len(panel)
+        state["duplicates_dropped"] = before - len(panel)
+        state["built_at"] = utc_now_iso()
+        log(f"Panel: wrote {panel_path} rows={len(panel)} duplicates_dropped={before - len(panel)}")
+    else:
+        log(f"Panel: up to date ({len(kept)} partitions unchanged)")
+
+    with atomic_path(state_path) as tmp:
+        tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    return {"rebuilt": rebuilt, "kept": kept, "rows": state.get("rows"), "path": str(panel_path)}
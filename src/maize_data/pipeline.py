@@ -0,0 +1,223 @@
+# src/maize_data/pipeline.py
+from __future__ import annotations
+
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from maize_data.io import atomic_path
+from maize_data.manifest import inputs_sha256, latest_file_entries, utc_now_iso
+from maize_data.sources import SourceSpec
+
+# Sources and derived stages as one DAG:
+#
+#   geoboundaries_adm1 -> points (configs/points.csv) -> nasa_power -> features
+#   kamis, kenya_opendata_socrata, hdx_wfp_prices, worldbank_wdi -> panel
+#   every other source stands alone
+#
+# A stage's fingerprint hashes its config slice and the content of its declared inputs (files it reads,
+# including upstream outputs). It runs when that fingerprint differs from the one in <out_dir>/_PIPELINE.json,
+# when an output is missing, or when forced; ready stages run in parallel.
+
+PRICE_SOURCES = ["kamis", "kenya_opendata_socrata", "hdx_wfp_prices", "worldbank_wdi"]
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[], None]
+    deps: list[str] = field(default_factory=list)
+    inputs: list[Path] = field(default_factory=list)
+    outputs: list[Path] = field(default_factory=list)
+    settings: Any = None
+
+def build_stages(
+    cfg: dict[str, Any],
+    sources: list[SourceSpec],
+    run_source: Callable[[SourceSpec], None],
+    log: Callable[[str], None] = print,
+) -> dict[str, Stage]:
+    """Stages for the given (enabled) sources plus the derived stages whose inputs are among them."""
+    g = cfg.get("global", {})
+    out_dir = Path(g.get("out_dir", "data_raw"))
+    pcfg = g.get("pipeline") or {}
+    scfg = cfg.get("sources", {})
+    names = {s.name for s in sources}
+    window = {k: g.get(k) for k in ("start_date", "end_date", "output_format")}
+    stages: dict[str, Stage] = {}
+
+    for spec in sources:
+        s = {k: v for k, v in scfg.get(spec.name, {}).items() if k != "enabled"}
+        st = Stage(
+            spec.name,
+            run=lambda spec=spec: run_source(spec),
+            outputs=[out_dir / spec.out_subdir],
+            settings={"source": s, **window},
+        )
+        if spec.name == "nasa_power":
+            st.inputs.append(Path(s["points_csv"]))
+        elif "urls_file" in s:
+            st.inputs.append(Path(s["urls_file"]))
+        stages[spec.name] = st
+
+    if "geoboundaries_adm1" in names and "nasa_power" in names and pcfg.get("points_from_boundaries", False):
+        from maize_data.boundaries import build_points
+
+        gb = scfg["geoboundaries_adm1"]
+        zip_path = out_dir / "boundaries" / f"geoboundaries_{gb.get('iso3', 'KEN')}_{gb.get('adm', 'ADM1')}.zip"
+        points_csv = Path(scfg["nasa_power"]["points_csv"])
+
+        def run_points() -> None:
+            n = build_points(zip_path, points_csv)
+            log(f"Pipeline: points -> {points_csv} rows={n}")
+
+        stages["points"] = Stage("points", run_points, ["geoboundaries_adm1"], [zip_path], [points_csv])
+        stages["nasa_power"].deps.append("points")
+
+    if "nasa_power" in names:
+        from maize_data.features import build_features
+
+        s = scfg["nasa_power"]
+        stages["features"] = Stage(
+            "features",
+            run=lambda: build_features(cfg, log=log),
+            deps=["nasa_power"],
+            inputs=[Path(s["points_csv"]), out_dir / "nasa_power"],
+            outputs=[Path((g.get("features") or {}).get("dir", "data/features")) / "_latest.json"],
+            settings={"features": g.get("features"), **window},
+        )
+
+    prices = [n for n in PRICE_SOURCES if n in names]
+    if prices:
+        from maize_data.panel import build_panel
+
+        stages["panel"] = Stage(
+            "panel",
+            run=lambda: build_panel(cfg, log=log),
+            deps=prices,
+            inputs=[stages[n].outputs[0] for n in prices],
+            outputs=[Path((g.get("panel") or {}).get("dir", "data/price_panel")) / "price_panel.parquet"],
+            settings={"panel": g.get("panel")},
+        )
+    return stages
+
+def topo_order(stages: dict[str, Stage]) -> list[str]:
+    order: list[str] = []
+    state: dict[str, int] = {}
+
+    def visit(n: str, path: list[str]) -> None:
+        if state.get(n) == 2:
+            return
+        if state.get(n) == 1:
+            raise ValueError(f"pipeline cycle: {' -> '.join(path + [n])}")
+        state[n] = 1
+        for d in stages[n].deps:
+            if d in stages:
+                visit(d, path + [n])
+        state[n] = 2
+        order.append(n)
+
+    for n in stages:
+        visit(n, [])
+    return order
+
+def fingerprint(stage: Stage, out_dir: Path, recorded: dict[str, dict[str, Any]]) -> str:
+    inputs = [p for p in stage.inputs if p.exists()]
+    settings = json.dumps({"stage": stage.name, "settings": stage.settings, "missing": [str(p) for p in stage.inputs if not p.exists()]}, sort_keys=True, default=str)
+    return inputs_sha256(inputs, out_dir, recorded, settings)
+
+def load_state(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {"stages": {}}
+
+def run_pipeline(
+    stages: dict[str, Stage],
+    out_dir: Path,
+    jobs: int = 4,
+    force: set[str] | bool = False,
+    dry_run: bool = False,
+    log: Callable[[str], None] = print,
+) -> dict[str, str]:
+    """
+    Runs stale stages as their dependencies finish; returns stage -> "ran" | "fresh" | "failed" | "blocked"
+    (or "run" / "maybe" / "fresh" with dry_run, where "maybe" means an upstream stage would run first).
+    """
+    order = topo_order(stages)
+    state_path = out_dir / "_PIPELINE.json"
+    state = load_state(state_path)
+    lock = threading.Lock()
+    forced = set(stages) if force is True else set(force or ())
+
+    def stale(name: str, fp: str) -> bool:
+        st = stages[name]
+        prev = state["stages"].get(name, {})
+        return name in forced or prev.get("fingerprint") != fp or not all(p.exists() for p in st.outputs)
+
+    if dry_run:
+        recorded = latest_file_entries(out_dir / "_MANIFEST.json")
+        plan: dict[str, str] = {}
+        for name in order:
+            if any(plan.get(d) in ("run", "maybe") for d in stages[name].deps):
+                plan[name] = "maybe"
+            else:
+                plan[name] = "run" if stale(name, fingerprint(stages[name], out_dir, recorded)) else "fresh"
+        return plan
+
+    result: dict[str, str] = {}
+
+    def save() -> None:
+        with atomic_path(state_path) as tmp:
+            tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+
+    def execute(name: str) -> str:
+        st = stages[name]
+        # inputs may be outputs of stages that just finished, so the fingerprint is taken now
+        recorded = latest_file_entries(out_dir / "_MANIFEST.json")
+        fp = fingerprint(st, out_dir, recorded)
+        if not stale(name, fp):
+            log(f"Pipeline: {name} fresh")
+            return "fresh"
+        log(f"Pipeline: {name} running")
+        t0 = time.perf_counter()
+        st.run()
+        with lock:
+            state["stages"][name] = {"fingerprint": fp, "ran_at": utc_now_iso(), "seconds": round(time.perf_counter() - t0, 3)}
+            save()
+        log(f"Pipeline: {name} done in {time.perf_counter() - t0:.1f}s")
+        return "ran"
+
+    waiting = {n: {d for d in stages[n].deps if d in stages} for n in order}
+    with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="stage") as pool:
+        running: dict[Future[str], str] = {}
+
+        def launch() -> None:
+            for n in [n for n, deps in waiting.items() if not deps]:
+                del waiting[n]
+                running[pool.submit(execute, n)] = n
+
+        def block(name: str) -> None:
+            for n, deps in list(waiting.items()):
+                if name in deps:
+                    del waiting[n]
+                    result[n] = "blocked"
+                    log(f"Pipeline: {n} blocked ({name} failed)")
+                    block(n)
+
+        launch()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                try:
+                    result[name] = fut.result()
+                except Exception as e:
+                    result[name] = "failed"
+                    log(f"Pipeline: {name} failed: {type(e).__name__}: {e}")
+                    block(name)
+                    continue
+                for deps in waiting.values():
+                    deps.discard(name)
+            launch()
+    return {n: result[n] for n in order if n in result}
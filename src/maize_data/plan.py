@@ -0,0 +1,268 @@
+# src/maize_data/plan.py
+from __future__ import annotations
+
+import csv
+import json
+import math
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from maize_data.compress import ZST, existing
+from maize_data.io import should_skip
+from maize_data.manifest import load_manifest
+from maize_data.sources import SourceSpec, enabled_sources
+from maize_data.tables import table_suffix
+
+# Everything here must stay stdlib-only: plan/status are called by schedulers and health checks,
+# which should not pay for pandas/requests imports. See scripts/check_import_time.py.
+
+def _norm(s: str) -> str:
+    return re.sub(r"\s+", " ", s.strip().lower())
+
+def _kamis_catalog(path: Path) -> list[tuple[int, str]]:
+    if not path.exists():
+        return []
+    with path.open("r", encoding="utf-8", newline="") as f:
+        return [(int(r["product_id"]), r["product_name"]) for r in csv.DictReader(f)]
+
+def _kamis_resolve(catalog: list[tuple[int, str]], name: str) -> int | None:
+    """Same rules as downloaders.kamis._resolve_product_id (exact, then unique substring), without pandas."""
+    target = _norm(name)
+    exact = [pid for pid, n in catalog if _norm(n) == target]
+    if len(exact) == 1:
+        return exact[0]
+    contains = [pid for pid, n in catalog if target in _norm(n)]
+    return contains[0] if len(contains) == 1 else None
+
+def _size(path: Path) -> int:
+    # partitioned Parquet outputs are directories
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file()) if path.is_dir() else path.stat().st_size
+
+def _unit(path: Path, fetch: bool, est_requests: int, note: str = "") -> dict[str, Any]:
+    # a compressed artifact (x.csv.zst) stands in for x.csv, as it does for the downloaders
+    path = existing(path) or path
+    exists = path.exists()
+    return {
+        "path": str(path),
+        "exists": exists,
+        "bytes": _size(path) if exists else None,
+        "action": ("refetch" if exists else "fetch") if fetch else "skip",
+        "est_requests": est_requests if fetch else 0,
+        "note": note,
+    }
+
+def plan_source(cfg: dict[str, Any], spec: SourceSpec) -> list[dict[str, Any]]:
+    """
+    Mirrors each downloader's skip rule (`should_skip`-style: exists and not force) per work unit.
+    Request counts are estimates: paginated sources use the size of the previous artifact when there is one.
+    """
+    g = cfg.get("global", {})
+    force = bool(g.get("force_download", False))
+    s = cfg.get("sources", {}).get(spec.name, {})
+    out = Path(g.get("out_dir", "data_raw")) / spec.out_subdir
+    ext = table_suffix(cfg)
+    # Parquet and .csv.zst are compressed: ~12 bytes per row instead of ~100-120 in CSV
+    def per_row(p: Path, csv_bytes: int) -> int:
+        return 12 if p.suffix in (".parquet", ZST) else csv_bytes
+
+    def needed(p: Path) -> bool:
+        return force or existing(p) is None
+
+    units: list[dict[str, Any]] = []
+
+    if spec.name == "kamis":
+        per_page = int(s.get("per_page", 3000))
+        catalog_path = out / "_products.csv"
+        units.append(_unit(catalog_path, needed(catalog_path), 1))
+        catalog = _kamis_catalog(catalog_path)
+        max_age = float(s["max_age_hours"]) if s.get("max_age_hours") is not None else None
+        products = s.get("products", ["Dry Maize"])
+        if products == "all":
+            # one partition per catalog product, see downloaders/kamis.py
+            if not catalog:
+                units.append(_unit(out / "all", True, 1, "every product; count unknown until the catalog is cached"))
+            for pid, _ in catalog:
+                p = out / "all" / f"product_id={pid}" / f"part-0{ext}"
+                found = existing(p)
+                est = math.ceil(_size(found) / per_row(found, 120) / per_page) + 1 if found else 1
+                stale = found is not None and not force and not should_skip(p, force, max_age)
+                units.append(_unit(p, not should_skip(p, force, max_age), est, "older than max_age_hours" if stale else ""))
+            products = []
+        for prod in products:
+            slug = re.sub(r"[^a-z0-9]+", "_", _norm(prod)).strip("_")
+            pid = _kamis_resolve(catalog, prod)
+            if pid is None:
+                # catalog not cached yet (or ambiguous name): the id is only known after fetching it
+                matches = sorted(out.glob(f"kamis_product*_{slug}_perpage{per_page}{ext}*"))
+                p = matches[0] if matches else out / f"kamis_product?_{slug}_perpage{per_page}{ext}"
+                note = "product id unresolved"
+            else:
+                p = out / f"kamis_product{pid}_{slug}_perpage{per_page}{ext}"
+                note = ""
+            # ~120 bytes per KAMIS row in CSV form; +1 for the final short/empty page
+            found = existing(p)
+            est = math.ceil(_size(found) / per_row(found, 120) / per_page) + 1 if found else 1
+            stale = found is not None and not force and not should_skip(p, force, max_age)
+            note = note or ("older than max_age_hours" if stale else "" if found else "pages unknown until first run")
+            units.append(_unit(p, not should_skip(p, force, max_age), est, note))
+
+    elif spec.name == "kenya_opendata_socrata":
+        p = out / f"{s['dataset_id']}{ext}"
+        page = int(s.get("page_size", 50000))
+        found = existing(p)
+        est = math.ceil(_size(found) / per_row(found, 100) / page) + 1 if found else 1
+        units.append(_unit(p, needed(p), est))
+
+    elif spec.name == "hdx_wfp_prices":
+        p = out / f"wfp_food_prices_raw{ext}"
+        units.append(_unit(p, needed(p), 2))
+
+    elif spec.name == "worldbank_wdi":
+        country = s.get("country", "KEN")
+        for ind in s.get("indicators", []):
+            units.append(_unit(out / f"{country}_{ind}{ext}", True, 1, "always refetched"))
+
+    elif spec.name == "nasa_power":
+        from maize_data.downloaders.nasa_power import POINTS_INDEX, point_request_key
+
+        points_csv = Path(s["points_csv"])
+        with points_csv.open("r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        index_path = out / POINTS_INDEX
+        index = json.loads(index_path.read_text(encoding="utf-8")) if index_path.exists() else {}
+        params = s.get("parameters", ["T2M", "PRECTOT"])
+        start, end = g["start_date"].replace("-", ""), g["end_date"].replace("-", "")
+        for r in rows:
+            pid = str(r["id"])
+            p = out / f"power_daily_{pid}.json"
+            key = point_request_key(float(r["lat"]), float(r["lon"]), params, s.get("community", "AG"), start, end)
+            moved = existing(p) is not None and index.get(pid, key) != key
+            units.append(_unit(p, needed(p) or moved, 1, "request changed" if moved else ""))
+
+    elif spec.name == "era5_cds":
+        for year in range(int(g["start_date"][:4]), int(g["end_date"][:4]) + 1):
+            p = out / f"era5_{year}.nc"
+            units.append(_unit(p, not p.exists(), 1, "CDS queue; --force ignored"))
+
+    elif spec.name == "geoboundaries_adm1":
+        p = out / f"geoboundaries_{s.get('iso3', 'KEN')}_{s.get('adm', 'ADM1')}.zip"
+        units.append(_unit(p, needed(p), 2))
+
+    elif spec.runner == "run_url_list":
+        urls_file = Path(s["urls_file"])
+        lines = urls_file.read_text(encoding="utf-8").splitlines() if urls_file.exists() else []
+        urls = [u.strip() for u in lines if u.strip() and not u.strip().startswith("#")]
+        for i, url in enumerate(urls, 1):
+            p = out / (url.split("/")[-1] or f"file_{i}")
+            units.append(_unit(p, existing(p) is None, 1, "--force ignored"))
+
+    elif spec.name == "uncomtrade":
+        # one request per year-group x flow x reporter x partner batch (see downloaders/uncomtrade.plan_chunks);
+        # chunks that hit the record cap add more
+        y0, y1 = int(s.get("year_from", 2015)), int(s.get("year_to", 2025))
+        listed = lambda v: v if isinstance(v, list) else ([v] if v is not None else [])  # noqa: E731
+        partners = listed(s.get("partners"))
+        chunks = (
+            math.ceil((y1 - y0 + 1) / max(1, int(s.get("years_per_chunk", 1))))
+            * len(listed(s.get("flows", ["M", "X"])))
+            * max(1, len(listed(s.get("reporters") or s.get("reporter"))))
+            * max(1, math.ceil(len(partners) / max(1, int(s.get("partners_per_chunk", len(partners) or 1)))))
+        )
+        for hs in listed(s.get("hs_codes")) or listed(s.get("hs_code", "1005")):
+            p = out / f"trade_hs{hs}_{y0}-{y1}{ext}"
+            units.append(_unit(p, needed(p), chunks, f"{chunks} chunks"))
+
+    return units
+
+def _last_records(manifest: dict[str, Any]) -> dict[str, tuple[str, dict[str, Any]]]:
+    last: dict[str, tuple[str, dict[str, Any]]] = {}
+    for run in manifest.get("runs", []):
+        for name, rec in run.get("sources", {}).items():
+            last[name] = (run["run_id"], rec)
+    return last
+
+def build_plan(cfg: dict[str, Any], skip_auth: bool = False) -> list[dict[str, Any]]:
+    rows = []
+    for spec in enabled_sources(cfg):
+        if spec.needs_auth and skip_auth:
+            rows.append({"source": spec.name, "skipped": "skip-auth", "units": []})
+            continue
+        try:
+            units = plan_source(cfg, spec)
+        except (KeyError, OSError, ValueError) as e:
+            rows.append({"source": spec.name, "error": f"{type(e).__name__}: {e}", "units": []})
+            continue
+        rows.append(
+            {
+                "source": spec.name,
+                "fetch": sum(u["action"] != "skip" for u in units),
+                "skip": sum(u["action"] == "skip" for u in units),
+                "est_requests": sum(u["est_requests"] for u in units),
+                "units": units,
+            }
+        )
+    return rows
+
+def _age(seconds: float) -> str:
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{seconds / size:.1f}{unit}"
+    return f"{seconds:.0f}s"
+
+def build_status(cfg: dict[str, Any]) -> list[dict[str, Any]]:
+    g = cfg.get("global", {})
+    out_dir = Path(g.get("out_dir", "data_raw"))
+    last = _last_records(load_manifest(out_dir / "_MANIFEST.json"))
+    now = time.time()
+
+    rows = []
+    for spec in enabled_sources(cfg):
+        d = out_dir / spec.out_subdir
+        files = [p for p in d.rglob("*") if p.is_file()] if d.exists() else []
+        stats = [p.stat() for p in files]
+        newest = max((st.st_mtime for st in stats), default=None)
+        row: dict[str, Any] = {
+            "source": spec.name,
+            "files": len(files),
+            "bytes": sum(st.st_size for st in stats),
+            "newest_file_utc": datetime.fromtimestamp(newest, tz=timezone.utc).replace(microsecond=0).isoformat() if newest else None,
+            "age": _age(now - newest) if newest else None,
+        }
+        if spec.name in last:
+            run_id, rec = last[spec.name]
+            row["last_run_id"] = run_id
+            row["last_recorded_at"] = rec.get("recorded_at")
+            if rec.get("metrics"):
+                row["last_wall_s"] = rec["metrics"].get("wall_s")
+                row["last_requests"] = rec["metrics"].get("requests")
+        rows.append(row)
+    return rows
+
+def format_plan(rows: list[dict[str, Any]], verbose: bool = True) -> str:
+    lines = []
+    for r in rows:
+        if "skipped" in r or "error" in r:
+            lines.append(f"{r['source']:24s} {r.get('skipped') or 'ERROR ' + r['error']}")
+            continue
+        lines.append(f"{r['source']:24s} fetch={r['fetch']:<4d} skip={r['skip']:<4d} est_requests~{r['est_requests']}")
+        if verbose:
+            for u in r["units"]:
+                if u["action"] != "skip":
+                    note = f"  ({u['note']})" if u["note"] else ""
+                    lines.append(f"    {u['action']:7s} {u['path']}{note}")
+    total = sum(r.get("est_requests", 0) for r in rows)
+    lines.append(f"{'TOTAL':24s} est_requests~{total}")
+    return "\n".join(lines)
+
+def format_status(rows: list[dict[str, Any]]) -> str:
+    lines = [f"{'source':24s} {'files':>6s} {'MB':>9s} {'age':>7s}  last_run"]
+    for r in rows:
+        mb = f"{r['bytes'] / 2**20:.1f}"
+        last = r.get("last_run_id", "-")
+        if r.get("last_wall_s") is not None:
+            last += f" ({r['last_wall_s']}s, {r.get('last_requests')} req)"
+        lines.append(f"{r['source']:24s} {r['files']:6d} {mb:>9s} {r['age'] or '-':>7s}  {last}")
+    return "\n".join(lines)
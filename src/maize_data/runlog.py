@@ -0,0 +1,159 @@
+# src/maize_data/runlog.py
+from __future__ import annotations
+
+import atexit
+import json
+import queue
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, TextIO
+
+from maize_data import metrics
+
+# "offset=3000 rows=1000" style tokens in messages become structured fields
+_KV = re.compile(r"\b([a-z_][a-z0-9_]*)=([^\s,]+)")
+_STOP = object()
+
+def _coerce(v: str) -> Any:
+    for cast in (int, float):
+        try:
+            return cast(v)
+        except ValueError:
+            pass
+    return v
+
+class _RotatingFile:
+    def __init__(self, path: Path, max_bytes: int, backups: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._f: TextIO = path.open("a", encoding="utf-8")
+        self._size = path.stat().st_size
+
+    def write(self, text: str) -> None:
+        if self.max_bytes and self._size + len(text) > self.max_bytes and self._size > 0:
+            self._rotate()
+        self._f.write(text)
+        self._size += len(text)
+
+    def _rotate(self) -> None:
+        self._f.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                src.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._f = self.path.open("a", encoding="utf-8")
+        self._size = 0
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+class RunLogger:
+    """
+    Drop-in for the old `log(msg)` callable. Calls only enqueue a record; a background thread
+    batches them to stdout, logs/download.log (text) and logs/download.jsonl (one JSON object per line),
+    rotating both by size.
+    """
+
+    def __init__(
+        self,
+        log_dir: Path,
+        max_bytes: int = 20 * 1024 * 1024,
+        backups: int = 5,
+        echo: bool = True,
+        flush_interval: float = 0.5,
+        batch_size: int = 512,
+    ) -> None:
+        log_dir.mkdir(parents=True, exist_ok=True)
+        self.context: dict[str, Any] = {}
+        self.echo = echo
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._q: queue.SimpleQueue[Any] = queue.SimpleQueue()
+        self._text = _RotatingFile(log_dir / "download.log", max_bytes, backups)
+        self._json = _RotatingFile(log_dir / "download.jsonl", max_bytes, backups)
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="maize-data-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __call__(self, msg: str, **fields: Any) -> None:
+        m = metrics.current()
+        rec = {"ts": time.time(), "msg": msg, **self.context}
+        if m.source != "unscoped":
+            rec["source"] = m.source
+            if m.last_latency_s is not None:
+                rec["latency_ms"] = round(m.last_latency_s * 1000, 1)
+        rec.update(fields)
+        with self._close_lock:
+            if not self._closed:
+                self._q.put(rec)
+                return
+        # late messages (e.g. from atexit handlers) are written synchronously
+        self._write([rec])
+
+    def set_context(self, **fields: Any) -> None:
+        """Fields (e.g. run_id) attached to every later record."""
+        self.context.update(fields)
+
+    def _format(self, rec: dict[str, Any]) -> tuple[str, str]:
+        ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(rec["ts"]))
+        text = f"[{ts}] {rec['msg']}\n"
+        structured: dict[str, Any] = {"ts": f"{ts.replace(' ', 'T')}.{int(rec['ts'] * 1000) % 1000:03d}"}
+        structured.update((k, _coerce(v)) for k, v in _KV.findall(rec["msg"]))
+        structured.update((k, v) for k, v in rec.items() if k != "ts")
+        return text, json.dumps(structured, ensure_ascii=False, default=str) + "\n"
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch: list[dict[str, Any]] = []
+            try:
+                item = self._q.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._q.get_nowait()
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: list[dict[str, Any]]) -> None:
+        if not batch:
+            return
+        texts, jsons = zip(*(self._format(r) for r in batch))
+        text = "".join(texts)
+        if self.echo:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        self._text.write(text)
+        self._json.write("".join(jsons))
+        self._text.flush()
+        self._json.flush()
+
+    def close(self) -> None:
+        """Flushes everything queued so far and stops the writer thread."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._q.put(_STOP)
+        self._thread.join()
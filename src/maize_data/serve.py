@@ -0,0 +1,249 @@
+# src/maize_data/serve.py
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import random
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+
+from maize_data import io, throttle
+from maize_data.manifest import load_manifest, utc_now_iso
+from maize_data.sources import SourceSpec, enabled_sources
+
+# `maize_data serve`: one resident process instead of a cron'd `download`. Each enabled source is refreshed on its
+# own cadence (`sources.<name>.refresh_hours`, default `global.serve.refresh_hours`), pushed back by a random
+# 0..`jitter_seconds` so sources (and several servers) do not fire together. Sources that come due together share
+# one manifest run. A refresh is a forced download, or with `if_changed` a change-detection probe first for the
+# sources that have one (changes.py); cached responses are revalidated, never served as fresh. A failed source is retried after `retry_seconds`, doubling up to its cadence.
+#
+# Between runs the process keeps what a cold `download` rebuilds (io.keep_warm): HTTP sessions with their open
+# connections, the per-host throttle state, the KAMIS catalog, CKAN package metadata and the manifest indexes.
+# The schedule starts from the manifest, so a restart does not refetch what is still fresh.
+#
+# A small HTTP endpoint on `host:port` (local only by default) answers
+#   GET  /healthz          "ok"
+#   GET  /status           JSON: per source cadence, last run/outcome, next due time; throttle state
+#   POST /refresh/<name>   make a source due now
+# SIGTERM/SIGINT stop the loop after the source in progress; config changes need a restart.
+
+@dataclass
+class SourceState:
+    spec: SourceSpec
+    every_s: float
+    next_due: float  # time.time()
+    last_run_id: str | None = None
+    last_finished: str | None = None
+    last_status: str | None = None  # ok / unchanged / failed
+    last_error: str | None = None
+    last_wall_s: float | None = None
+    failures: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "refresh_hours": round(self.every_s / 3600, 3),
+            "next_due": datetime.fromtimestamp(self.next_due, timezone.utc).isoformat(),
+            "last_run_id": self.last_run_id,
+            "last_finished": self.last_finished,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "last_wall_s": self.last_wall_s,
+            "failures": self.failures,
+        }
+
+def settings(cfg: dict[str, Any]) -> dict[str, Any]:
+    s = cfg.get("global", {}).get("serve") or {}
+    return {
+        "host": str(s.get("host", "127.0.0.1")),
+        "port": int(s.get("port", 8765)),
+        "refresh_hours": float(s.get("refresh_hours", 24)),
+        "jitter_seconds": float(s.get("jitter_seconds", 300)),
+        "retry_seconds": float(s.get("retry_seconds", 900)),
+        "if_changed": bool(s.get("if_changed", True)),
+    }
+
+def _last_recorded(manifest_path: Path) -> dict[str, tuple[str, float]]:
+    """Per source: (run_id, recorded_at as a timestamp) of its latest manifest record."""
+    last: dict[str, tuple[str, float]] = {}
+    for run in load_manifest(manifest_path).get("runs", []):
+        for name, rec in run.get("sources", {}).items():
+            if rec.get("recorded_at"):
+                last[name] = (run["run_id"], datetime.fromisoformat(rec["recorded_at"]).timestamp())
+    return last
+
+class Scheduler:
+    """Due-time loop over the enabled sources; `status()` and `refresh()` are safe to call from other threads."""
+
+    def __init__(self, args: argparse.Namespace, config_path: Path, cfg: dict[str, Any], log: Callable[[str], None]) -> None:
+        self.args = args
+        self.config_path = config_path
+        self.cfg = cfg
+        self.log = log
+        self.opts = settings(cfg)
+        self.started = time.time()
+        self.running: str | None = None
+        self.runs = 0
+        self._lock = threading.Lock()
+        self.stop = threading.Event()
+        self._wake = threading.Event()
+
+        g = cfg.get("global", {})
+        last = _last_recorded(Path(g.get("out_dir", "data_raw")) / "_MANIFEST.json")
+        self.states: dict[str, SourceState] = {}
+        for spec in enabled_sources(cfg):
+            if spec.needs_auth and args.skip_auth:
+                continue
+            every = 3600 * float(cfg["sources"][spec.name].get("refresh_hours", self.opts["refresh_hours"]))
+            st = SourceState(spec, every, 0.0)
+            if spec.name in last:
+                st.last_run_id, recorded = last[spec.name]
+                st.last_finished = datetime.fromtimestamp(recorded, timezone.utc).isoformat()
+                st.next_due = recorded + every
+            st.next_due = max(st.next_due, self.started) + self._jitter()
+            self.states[spec.name] = st
+            self.log(f"Serve: {spec.name} every {every / 3600:g}h, next at {st.to_dict()['next_due']}")
+
+    def _jitter(self) -> float:
+        return random.uniform(0, self.opts["jitter_seconds"])
+
+    def refresh(self, name: str) -> bool:
+        with self._lock:
+            st = self.states.get(name)
+            if st is None:
+                return False
+            st.next_due = time.time()
+        self._wake.set()
+        return True
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "started_at": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+                "uptime_s": round(time.time() - self.started, 1),
+                "runs": self.runs,
+                "running": self.running,
+                "sources": {name: st.to_dict() for name, st in self.states.items()},
+                "throttle": throttle.summary(),
+            }
+
+    def run_forever(self) -> None:
+        while not self.stop.is_set():
+            with self._lock:
+                now = time.time()
+                due = sorted((st for st in self.states.values() if st.next_due <= now), key=lambda st: st.next_due)
+                wait = min((st.next_due for st in self.states.values()), default=now + 3600) - now
+            if not due:
+                self._wake.wait(max(wait, 0.0))
+                self._wake.clear()
+                continue
+            self.tick(due)
+            # run ids have one-second resolution
+            self.stop.wait(1.0)
+
+    def tick(self, due: list[SourceState]) -> None:
+        """One manifest run for every source that is due."""
+        from maize_data.cli import DownloadRun
+
+        # forced so the downloaders refetch instead of skipping existing files, and revalidating so they do not
+        # re-serve cache entries younger than cache_ttl_seconds (often longer than the cadence) as a fresh run;
+        # a fresh copy per run, since DownloadRun and change detection adjust the config they are given
+        cfg = copy.deepcopy(self.cfg)
+        g = cfg.setdefault("global", {})
+        g["http_cache"] = {**(g.get("http_cache") or {}), "revalidate": True}
+        run = DownloadRun(self.args, self.config_path, cfg, log=self.log)
+        try:
+            for st in due:
+                if self.stop.is_set():
+                    break
+                with self._lock:
+                    self.running = st.spec.name
+                t0 = time.perf_counter()
+                fetched = len(run.collected)
+                status, error = "ok", None
+                try:
+                    run.run_source(st.spec, self.opts["if_changed"])
+                    if len(run.collected) == fetched:
+                        status = "unchanged"  # the probe matched the last run's fingerprint
+                except Exception as e:
+                    status, error = "failed", f"{type(e).__name__}: {e}"
+                    run.log(f"Serve: {st.spec.name} failed: {error}")
+                with self._lock:
+                    self.running = None
+                    st.last_run_id = run.ctx.run_id
+                    st.last_finished = utc_now_iso()
+                    st.last_status, st.last_error = status, error
+                    st.last_wall_s = round(time.perf_counter() - t0, 3)
+                    st.failures = st.failures + 1 if error else 0
+                    delay = min(st.every_s, self.opts["retry_seconds"] * 2 ** (st.failures - 1)) if error else st.every_s
+                    st.next_due = time.time() + delay + self._jitter()
+                run.log(f"Serve: {st.spec.name} {status} in {st.last_wall_s}s, next at {st.to_dict()['next_due']}")
+        finally:
+            run.close()
+            with self._lock:
+                self.runs += 1
+
+def _handler(scheduler: Scheduler) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code: int, body: Any) -> None:
+            data = (json.dumps(body, indent=2) if not isinstance(body, str) else body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "text/plain; charset=utf-8" if isinstance(body, str) else "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path == "/healthz":
+                self._reply(200, "ok\n")
+            elif self.path in ("/", "/status"):
+                self._reply(200, scheduler.status())
+            else:
+                self._reply(404, {"error": f"unknown path {self.path}"})
+
+        def do_POST(self) -> None:  # noqa: N802
+            name = self.path.removeprefix("/refresh/")
+            if name != self.path and scheduler.refresh(name):
+                self._reply(202, {"refresh": name})
+            else:
+                self._reply(404, {"error": f"no scheduled source for {self.path}"})
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass  # status polls would drown the run log
+
+    return Handler
+
+def serve(args: argparse.Namespace, config_path: Path, cfg: dict[str, Any], log: Callable[[str], None]) -> None:
+    """Runs the scheduler until SIGTERM/SIGINT, with the status endpoint in a background thread."""
+    io.keep_warm()
+    scheduler = Scheduler(args, config_path, cfg, log)
+    if not scheduler.states:
+        raise SystemExit("serve: no enabled sources to schedule")
+
+    server = None
+    opts = scheduler.opts
+    if opts["port"]:
+        server = ThreadingHTTPServer((opts["host"], opts["port"]), _handler(scheduler))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="maize_data-status", daemon=True).start()
+        log(f"Serve: status on http://{opts['host']}:{server.server_address[1]}/status")
+
+    def stop(signum: int, _frame: Any) -> None:
+        log(f"Serve: {signal.Signals(signum).name}, stopping after the current source")
+        scheduler.stop.set()
+        scheduler._wake.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        scheduler.run_forever()
+    finally:
+        if server is not None:
+            server.shutdown()
+        log(f"Serve: stopped after {scheduler.runs} runs")
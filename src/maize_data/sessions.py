@@ -0,0 +1,103 @@
+# src/maize_data/sessions.py
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+from maize_data import metrics, throttle
+
+if TYPE_CHECKING:
+    from maize_data.throttle import HostBudget
+
+# Content codings urllib3 can decode here: gzip and deflate always, br with brotli installed,
+# zstd with backports.zstd (Python < 3.14) or compression.zstd. Never advertise one we cannot undo.
+DECODABLE = [e.strip() for e in ACCEPT_ENCODING.split(",")]
+
+class _Retry(Retry):
+    """Retry that tells the host's budget about each failed attempt (and its Retry-After) before sleeping."""
+
+    def sleep(self, response: Any = None) -> None:
+        retry_after = self.get_retry_after(response) if response is not None else None
+        throttle.signal_retry(response.status if response is not None else None, retry_after)
+        super().sleep(response)
+
+class MeteredSession(requests.Session):
+    """
+    requests.Session that reports every upstream call (status, bytes, latency, retries) to the
+    active source's metrics, and retries idempotent requests on 429/5xx honoring Retry-After.
+    Asks for compressed bodies (`accept_encoding`, limited to DECODABLE); responses are decoded transparently
+    and `bytes_received` counts what came over the wire.
+    With `budget_for` (url -> HostBudget or None), each network call holds a slot of its host's budget
+    and reports its outcome to it (see throttle.py).
+    """
+
+    def __init__(
+        self,
+        retries: int = 3,
+        backoff: float = 1.0,
+        accept_encoding: list[str] | None = None,
+        pool_size: int = 10,
+        budget_for: Callable[[str], HostBudget | None] | None = None,
+    ) -> None:
+        super().__init__()
+        wanted = [e for e in (accept_encoding or DECODABLE) if e in DECODABLE]
+        self.headers["Accept-Encoding"] = ", ".join(wanted) or "identity"
+        self.budget_for = budget_for
+        retry: Retry | int = 0
+        if retries > 0:
+            retry = _Retry(
+                total=retries,
+                backoff_factor=backoff,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET", "HEAD"),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+        # pool_size: keep-alive connections per host; size it to the number of threads sharing the session
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method: str, url: str, *args: Any, **kwargs: Any) -> requests.Response:  # type: ignore[override]
+        budget = self.budget_for(url) if self.budget_for is not None else None
+        if budget is None:
+            return self._send(method, url, *args, **kwargs)
+        with budget.slot() as started:
+            t0 = time.perf_counter()
+            try:
+                r = self._send(method, url, *args, **kwargs)
+            except (requests.Timeout, requests.ConnectionError):
+                budget.record(started, None, time.perf_counter() - t0)
+                raise
+            retry_after = r.headers.get("Retry-After") if r.status_code in throttle.CONGESTION else None
+            budget.record(started, r.status_code, time.perf_counter() - t0, _seconds(retry_after))
+        return r
+
+    def _send(self, method: str, url: str, *args: Any, **kwargs: Any) -> requests.Response:
+        start = time.time()
+        t0 = time.perf_counter()
+        r = super().request(method, url, *args, **kwargs)
+        elapsed = time.perf_counter() - t0
+
+        if kwargs.get("stream"):
+            n_bytes = int(r.headers.get("Content-Length") or 0)
+        else:
+            # bytes read off the socket (compressed); 0 when urllib3 did not track them
+            n_bytes = getattr(r.raw, "tell", lambda: 0)() or len(r.content)
+        retry_state = getattr(r.raw, "retries", None)
+        retries = len(retry_state.history) if retry_state is not None else 0
+        metrics.current().observe_response(r.status_code, n_bytes, elapsed, start, retries=retries, url=r.url)
+        return r
+
+def _seconds(retry_after: str | None) -> float | None:
+    if not retry_after:
+        return None
+    try:
+        return Retry().parse_retry_after(retry_after)
+    except ValueError:
+        return None
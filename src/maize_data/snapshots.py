@@ -0,0 +1,225 @@
+# src/maize_data/snapshots.py
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+from maize_data.compress import inner_suffix, open_read, plain
+from maize_data.io import atomic_path
+from maize_data.loader import dataset_root
+from maize_data.manifest import sha256_text, utc_now_iso
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Row-level history of tabular sources (`global.snapshots`). Each table artifact gets a chain under
+#   <out_dir>/_snapshots/<artifact path>/
+#     chain.json                  [{run_id, kind: base|delta, file, rows, inserts, updates, deletes, sig}]
+#     base-<run_id>.parquet       the whole table (all columns as strings, exactly as downloaded)
+#     delta-<run_id>.parquet      changed rows with `_op` = I (insert) / U (update) / D (delete)
+# The first snapshot is a base; later runs whose artifact changed store only the rows that differ, keyed by the
+# source's natural key (KEYS). A new base is written every `rebase_every` deltas, when a delta would be larger than
+# `rebase_ratio` x the table, or when the columns change. Any recorded run is rebuilt by applying the deltas after
+# the newest base at or before it (see `reconstruct` and `maize_data restore`).
+
+# Natural keys; columns missing from a table are ignored, and rows repeating a key are told apart by occurrence.
+KEYS: dict[str, list[str]] = {
+    "kamis": ["product_id", "Commodity", "Classification", "Grade", "Sex", "Market", "County", "Date"],
+    "kenya_opendata_socrata": ["date", "admin1", "admin2", "market", "commodity", "unit", "pricetype", "currency"],
+    "hdx_wfp_prices": ["date", "admin1", "admin2", "market", "commodity", "unit", "pricetype", "currency"],
+}
+
+DUP = "_dup"
+OP = "_op"
+
+def settings(cfg: dict[str, Any]) -> dict[str, Any]:
+    s = cfg.get("global", {}).get("snapshots") or {}
+    out_dir = Path(cfg.get("global", {}).get("out_dir", "data_raw"))
+    return {
+        "enabled": bool(s.get("enabled", False)),
+        "sources": list(s.get("sources", list(KEYS))),
+        "dir": Path(s.get("dir", out_dir / "_snapshots")),
+        "rebase_every": max(1, int(s.get("rebase_every", 30))),
+        "rebase_ratio": float(s.get("rebase_ratio", 0.5)),
+    }
+
+def read_raw(path: Path) -> pd.DataFrame:
+    """
+    A table as downloaded: every column a string, "" for empty cells. Takes a CSV (.csv.zst), a Parquet file, or a
+    partitioned directory of either (hive `key=value` directories become columns).
+    """
+    import pandas as pd
+
+    parts = sorted(p for p in path.rglob("*") if p.is_file() and not p.name.startswith(".")) if path.is_dir() else [path]
+    if parts and inner_suffix(parts[0]) == ".parquet":
+        df = pd.read_parquet(path, engine="pyarrow")
+        return df.astype("string").fillna("").astype(object)
+    frames = []
+    for p in parts:
+        with open_read(p) as f:
+            df = pd.read_csv(f, dtype=str, keep_default_na=False)
+        for k, v in (d.split("=", 1) for d in p.relative_to(path).parts[:-1] if "=" in d):
+            df[k] = v
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True) if len(frames) != 1 else frames[0]
+
+def _keyed(df: pd.DataFrame, source: str) -> tuple[pd.DataFrame, list[str]]:
+    """`df` with a unique key: the natural key columns present plus an occurrence counter for repeats."""
+    key = [c for c in KEYS.get(source, []) if c in df.columns] or [c for c in df.columns]
+    # repeats are numbered in value order, so reordering rows upstream never shows up as a change
+    order = df.sort_values(list(df.columns), kind="stable").index
+    df = df.copy()
+    df[DUP] = df.loc[order].groupby(key, sort=False).cumcount().reindex(df.index)
+    return df, key + [DUP]
+
+def diff(old: pd.DataFrame, new: pd.DataFrame, key: list[str]) -> pd.DataFrame:
+    """
+    Rows of `new` that are inserts (I) or updates (U) and keys of `old` that are deletes (D), as one frame with `_op`.
+    Both tables must have the same columns and a unique `key`; values are compared as strings, column by column.
+    """
+    import numpy as np
+    import pandas as pd
+
+    values = [c for c in new.columns if c not in key]
+    m = old.merge(new, on=key, how="outer", suffixes=("_old", ""), indicator=True)
+    ins = m["_merge"] == "right_only"
+    dels = m["_merge"] == "left_only"
+    both = m["_merge"] == "both"
+    changed = np.zeros(len(m), dtype=bool)
+    for c in values:
+        changed |= (m[f"{c}_old"].to_numpy() != m[c].to_numpy())
+    upd = both.to_numpy() & changed
+
+    out = m.loc[ins.to_numpy() | upd | dels.to_numpy(), key + values].copy()
+    out[OP] = np.where(ins[out.index], "I", np.where(dels[out.index], "D", "U"))
+    # a delete carries the old row so the delta alone says what disappeared
+    d = dels[out.index].to_numpy()
+    for c in values:
+        out.loc[d, c] = m.loc[out.index[d], f"{c}_old"]
+    return out.reset_index(drop=True)
+
+def apply(base: pd.DataFrame, delta: pd.DataFrame, key: list[str]) -> pd.DataFrame:
+    """`base` with `delta` applied: updated and deleted keys removed, inserted and updated rows added."""
+    import pandas as pd
+
+    if delta.empty:
+        return base
+    gone = delta.loc[delta[OP] != "I", key]
+    idx = pd.MultiIndex.from_frame(base[key])
+    kept = base[~idx.isin(pd.MultiIndex.from_frame(gone))] if len(gone) else base
+    added = delta.loc[delta[OP] != "D"].drop(columns=[OP])
+    return pd.concat([kept, added[base.columns]], ignore_index=True)
+
+def _chain_dir(opts: dict[str, Any], rel: Path) -> Path:
+    return opts["dir"] / rel
+
+def load_chain(chain_dir: Path) -> list[dict[str, Any]]:
+    p = chain_dir / "chain.json"
+    return json.loads(p.read_text(encoding="utf-8")) if p.exists() else []
+
+def _save_chain(chain_dir: Path, chain: list[dict[str, Any]]) -> None:
+    with atomic_path(chain_dir / "chain.json") as tmp:
+        tmp.write_text(json.dumps(chain, indent=2), encoding="utf-8")
+
+def _write(df: pd.DataFrame, path: Path) -> None:
+    with atomic_path(path) as tmp:
+        df.to_parquet(tmp, engine="pyarrow", compression="zstd", index=False)
+
+def reconstruct(chain_dir: Path, source: str, run_id: str | None = None) -> pd.DataFrame:
+    """The table as it was after `run_id` (default: the latest snapshot), in the downloaded column order."""
+    import pandas as pd
+
+    chain = load_chain(chain_dir)
+    upto = [e for e in chain if run_id is None or e["run_id"] <= run_id]
+    if not upto:
+        first = chain[0]["run_id"] if chain else None
+        raise LookupError(f"{chain_dir}: no snapshot at or before {run_id} (first: {first})")
+    start = max(i for i, e in enumerate(upto) if e["kind"] == "base")
+    df = pd.read_parquet(chain_dir / upto[start]["file"])
+    df, key = _keyed(df, source)
+    for e in upto[start + 1 :]:
+        df = apply(df, pd.read_parquet(chain_dir / e["file"]), key)
+    return df.sort_values(key, kind="stable").drop(columns=[DUP]).reset_index(drop=True)
+
+def snapshot_artifact(opts: dict[str, Any], out_dir: Path, rel: Path, source: str, run_id: str, sig: str) -> dict[str, Any] | None:
+    """Adds this run's version of one artifact to its chain; None when its rows are unchanged since the last snapshot."""
+    # compaction renames x.csv to x.csv.zst without changing the rows: one chain for both
+    chain_dir = _chain_dir(opts, rel.with_suffix("") if rel.suffix == ".zst" else rel)
+    chain = load_chain(chain_dir)
+    if chain and chain[-1]["sig"] == sig:
+        return None
+    new = read_raw(out_dir / rel)
+    entry: dict[str, Any] = {"run_id": run_id, "recorded_at": utc_now_iso(), "rows": len(new), "sig": sig}
+
+    deltas = len(chain) - 1 - max((i for i, e in enumerate(chain) if e["kind"] == "base"), default=0)
+    delta = None
+    if chain and deltas < opts["rebase_every"]:
+        old = reconstruct(chain_dir, source)
+        if list(old.columns) == list(new.columns):
+            (old_k, key), (new_k, _) = _keyed(old, source), _keyed(new, source)
+            delta = diff(old_k, new_k, key)
+            if delta.empty:
+                # same rows in different bytes (compaction to .zst, a re-download): remember the new signature only
+                chain[-1]["sig"] = sig
+                _save_chain(chain_dir, chain)
+                return None
+            if len(delta) > opts["rebase_ratio"] * max(len(new), 1):
+                delta = None  # most of the table changed: a base is smaller and faster to read back
+
+    chain_dir.mkdir(parents=True, exist_ok=True)
+    if delta is None:
+        entry.update(kind="base", file=f"base-{run_id}.parquet")
+        _write(new, chain_dir / entry["file"])
+    else:
+        ops = delta[OP].value_counts()
+        entry.update(kind="delta", file=f"delta-{run_id}.parquet", inserts=int(ops.get("I", 0)), updates=int(ops.get("U", 0)), deletes=int(ops.get("D", 0)))
+        _write(delta, chain_dir / entry["file"])
+    _save_chain(chain_dir, chain + [entry])
+    return entry
+
+def snapshot_source(cfg: dict[str, Any], source: str, run_id: str, files: list[dict[str, Any]], log: Callable[[str], None] = print) -> int:
+    """Snapshots the table artifacts among one source's manifest entries; returns how many changed."""
+    opts = settings(cfg)
+    out_dir = Path(cfg["global"]["out_dir"])
+    artifacts: dict[Path, list[str]] = {}
+    for meta in files:
+        root = dataset_root(Path(meta["path"]))
+        if root is not None and inner_suffix(Path(meta["path"])) in (".csv", ".parquet"):
+            # the plain path, so compaction (x.csv -> x.csv.zst) alone does not look like a different artifact
+            artifacts.setdefault(root, []).append(f"{plain(Path(meta['path']))}:{meta.get('sha256') or (meta['bytes'], meta['modified_utc'])}")
+    changed = 0
+    for rel, sigs in sorted(artifacts.items()):
+        entry = snapshot_artifact(opts, out_dir, rel, source, run_id, sha256_text("\n".join(sorted(sigs))))
+        if entry is None:
+            continue
+        changed += 1
+        if entry["kind"] == "base":
+            log(f"Snapshots: {rel} base rows={entry['rows']}")
+        else:
+            log(f"Snapshots: {rel} delta +{entry['inserts']} ~{entry['updates']} -{entry['deletes']} (rows={entry['rows']})")
+    return changed
+
+def restore(cfg: dict[str, Any], artifact: str, run_id: str | None = None) -> pd.DataFrame:
+    """`artifact` (path under out_dir, e.g. kamis/kamis_product1_dry_maize_perpage3000.csv) as of `run_id`."""
+    from maize_data.sources import SOURCES
+
+    rel = Path(artifact)
+    rel = rel.with_suffix("") if rel.suffix == ".zst" else rel
+    source = next((s.name for s in SOURCES if s.out_subdir == rel.parts[0]), None)
+    if source is None:
+        raise ValueError(f"{artifact}: not under a source directory")
+    chain_dir = _chain_dir(settings(cfg), rel)
+    if not (chain_dir / "chain.json").exists():
+        raise LookupError(f"{artifact}: no snapshot chain under {chain_dir}")
+    return reconstruct(chain_dir, source, run_id)
+
+def list_chains(cfg: dict[str, Any]) -> list[dict[str, Any]]:
+    """Every chain under the snapshot dir: artifact path and its entries."""
+    root = settings(cfg)["dir"]
+    if not root.exists():
+        return []
+    return [
+        {"artifact": str(p.parent.relative_to(root)), "entries": load_chain(p.parent)}
+        for p in sorted(root.rglob("chain.json"))
+    ]
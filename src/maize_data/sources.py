@@ -0,0 +1,41 @@
+# src/maize_data/sources.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+@dataclass(frozen=True)
+class SourceSpec:
+    name: str            # key under `sources:` in the config
+    out_subdir: str      # folder under global.out_dir
+    runner: str          # function name exported by maize_data.downloaders
+    label: str           # used in log lines
+    needs_auth: bool = False
+    runner_kwargs: dict[str, Any] = field(default_factory=dict)
+    shard_unit: str = ""  # what `--shard i/N` splits; "" = the whole source runs on one shard
+
+# Run order of `maize_data download`.
+SOURCES: list[SourceSpec] = [
+    # PRICES
+    SourceSpec("kamis", "kamis", "run_kamis", "KAMIS", shard_unit="product"),
+    SourceSpec("kenya_opendata_socrata", "opendata_ke", "run_opendata_ke_socrata", "Socrata"),
+    SourceSpec("hdx_wfp_prices", "wfp_hdx", "run_hdx_ckan_wfp_prices", "HDX"),
+    # MACRO
+    SourceSpec("worldbank_wdi", "worldbank_wdi", "run_worldbank_wdi", "WDI"),
+    # WEATHER
+    SourceSpec("nasa_power", "nasa_power", "run_nasa_power", "NASA POWER", shard_unit="point"),
+    SourceSpec("era5_cds", "era5", "run_era5_cds", "ERA5", needs_auth=True, shard_unit="year"),
+    # SPATIAL
+    SourceSpec("geoboundaries_adm1", "boundaries", "run_geoboundaries_adm1", "geoBoundaries"),
+    # URL-list sources
+    SourceSpec("spei_urls", "spei_urls", "run_url_list", "spei_urls", runner_kwargs={"key": "spei_urls"}, shard_unit="url"),
+    SourceSpec("esa_cci_sm_urls", "esa_cci_sm_urls", "run_url_list", "esa_cci_sm_urls", runner_kwargs={"key": "esa_cci_sm_urls"}, shard_unit="url"),
+    # TRADE template
+    SourceSpec("uncomtrade", "uncomtrade", "run_uncomtrade_template", "UN Comtrade", needs_auth=True, shard_unit="year"),
+]
+
+BY_NAME: dict[str, SourceSpec] = {s.name: s for s in SOURCES}
+
+def enabled_sources(cfg: dict[str, Any]) -> list[SourceSpec]:
+    sources = cfg.get("sources", {})
+    return [s for s in SOURCES if bool(sources.get(s.name, {}).get("enabled", False))]
@@ -0,0 +1,127 @@
+# src/maize_data/spatial.py
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.strtree import STRtree
+
+from maize_data.boundaries import load_adm1, norm_name
+
+# Market -> ADM1 assignment. Points go through one STRtree query over the polygons;
+# names (norm_name) are only used for rows without coordinates.
+
+KM_PER_DEG = 111.32
+
+@dataclass
+class AdmIndex:
+    ids: np.ndarray
+    names: np.ndarray
+    geoms: np.ndarray
+    tree: STRtree
+    by_name: dict[str, int]
+
+    @classmethod
+    def from_geoms(cls, ids: list[str], names: list[str], geoms: np.ndarray) -> "AdmIndex":
+        return cls(
+            ids=np.asarray(ids, dtype=object),
+            names=np.asarray(names, dtype=object),
+            geoms=geoms,
+            tree=STRtree(geoms),
+            by_name={_name_key(n): i for i, n in enumerate(names)},
+        )
+
+def _name_key(s: str) -> str:
+    return re.sub(r"\s+(county|city)$", "", norm_name(s))
+
+def build_index(zip_path: Path, cache_dir: Path = Path(".cache/boundaries")) -> AdmIndex:
+    """Index over the full-resolution ADM1 polygons; loads from the GeoParquet cache of maize_data.boundaries."""
+    gdf = load_adm1(zip_path, cache_dir)
+    geoms = np.asarray(gdf.geometry.values, dtype=object)
+    return AdmIndex.from_geoms(gdf["id"].tolist(), gdf["county_name"].tolist(), geoms)
+
+def assign_points(index: AdmIndex, lon: np.ndarray, lat: np.ndarray, max_km: float = 5.0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Polygon position per point (-1 if none) and how it was found ("point", "nearest" or "").
+    Points just outside every polygon (coastline, simplified borders) take the nearest one within max_km.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    out = np.full(len(lon), -1, dtype=np.int64)
+    how = np.full(len(lon), "", dtype=object)
+    valid = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+    if not len(valid):
+        return out, how
+
+    pts = shapely.points(lon[valid], lat[valid])
+    pt_i, poly_i = index.tree.query(pts, predicate="intersects")
+    # a point on a shared border hits two polygons: keep the lowest polygon position, deterministically
+    order = np.lexsort((poly_i, pt_i))
+    pt_i, poly_i = pt_i[order], poly_i[order]
+    first = np.unique(pt_i, return_index=True)[1]
+    out[valid[pt_i[first]]] = poly_i[first]
+    how[valid[pt_i[first]]] = "point"
+
+    miss = valid[out[valid] < 0]
+    if len(miss) and max_km > 0:
+        pt_j, poly_j = index.tree.query_nearest(
+            shapely.points(lon[miss], lat[miss]), max_distance=max_km / KM_PER_DEG, all_matches=False
+        )
+        out[miss[pt_j]] = poly_j
+        how[miss[pt_j]] = "nearest"
+    return out, how
+
+def join_adm1(
+    df: pd.DataFrame,
+    index: AdmIndex,
+    name_col: str | None = None,
+    lat_col: str | None = None,
+    lon_col: str | None = None,
+    max_km: float = 5.0,
+) -> pd.DataFrame:
+    """
+    Adds adm1_id, adm1_name and adm1_match ("point" | "nearest" | "name" | "") to `df`.
+    Work is done once per distinct (name, lat, lon) key, so a price table with many rows per market
+    costs about as much as its list of markets.
+    """
+    keys = [c for c in (name_col, lat_col, lon_col) if c]
+    if not keys:
+        raise ValueError("join_adm1 needs a name column and/or lat/lon columns")
+    codes = df.groupby(keys, dropna=False, sort=False, observed=True).ngroup().to_numpy()
+    uniq = df[keys].drop_duplicates()
+
+    n = len(uniq)
+    pos = np.full(n, -1, dtype=np.int64)
+    how = np.full(n, "", dtype=object)
+    has_xy = np.zeros(n, dtype=bool)
+    if lat_col and lon_col:
+        lat = pd.to_numeric(uniq[lat_col], errors="coerce").to_numpy(dtype=float)
+        lon = pd.to_numeric(uniq[lon_col], errors="coerce").to_numpy(dtype=float)
+        has_xy = np.isfinite(lat) & np.isfinite(lon)
+        pos, how = assign_points(index, lon, lat, max_km=max_km)
+
+    if name_col:
+        # only rows without coordinates fall back to names; a point outside every polygon stays unmatched
+        todo = np.flatnonzero(~has_xy)
+        names = uniq[name_col].to_numpy(dtype=object)[todo]
+        hits = np.array([index.by_name.get(_name_key(s), -1) if isinstance(s, str) else -1 for s in names], dtype=np.int64)
+        pos[todo] = hits
+        how[todo[hits >= 0]] = "name"
+
+    found = pos >= 0
+    ids = np.where(found, index.ids[np.where(found, pos, 0)], None)
+    names_out = np.where(found, index.names[np.where(found, pos, 0)], None)
+
+    out = df.copy()
+    out["adm1_id"] = ids[codes]
+    out["adm1_name"] = names_out[codes]
+    out["adm1_match"] = how[codes]
+    return out
+
+def match_summary(df: pd.DataFrame) -> dict[str, Any]:
+    return {k or "unmatched": int(v) for k, v in df["adm1_match"].value_counts().items()}
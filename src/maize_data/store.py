@@ -0,0 +1,114 @@
+# src/maize_data/store.py
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+from typing import Any
+
+from maize_data.manifest import load_manifest, sha256_file
+
+# Layout under out_dir:
+#   _store/objects/<aa>/<sha256>          blobs, never rewritten
+#   _store/runs/<run_id>/<source>/<file>  per-run views, hardlinks to blobs
+# Blobs share an inode with the working files under out_dir, so they keep the working files' permissions (making
+# them read-only would make data_raw read-only too). Blobs stay intact because writers replace files (atomic_path)
+# instead of modifying them in place; a tool that edits data_raw files in place would change the stored runs too.
+STORE_DIRNAME = "_store"
+
+def store_root(out_dir: Path) -> Path:
+    return out_dir / STORE_DIRNAME
+
+def blob_path(root: Path, digest: str) -> Path:
+    return root / "objects" / digest[:2] / digest
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        # cross-device or filesystem without hardlinks
+        shutil.copy2(src, dst)
+
+def _replace_with_link(blob: Path, path: Path) -> None:
+    tmp = path.with_name(f".{path.name}.link")
+    if tmp.exists():
+        tmp.unlink()
+    _link_or_copy(blob, tmp)
+    os.replace(tmp, path)
+
+def ingest_file(root: Path, path: Path, digest: str | None = None) -> str:
+    """
+    Moves `path` into the object store (dedup by sha256) and leaves a hardlink to the blob in its place.
+    """
+    digest = digest or sha256_file(path)
+    blob = blob_path(root, digest)
+    if not blob.exists():
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_name(f".{digest}.tmp")
+        _link_or_copy(path, tmp)
+        os.replace(tmp, blob)
+
+    if not path.samefile(blob):
+        _replace_with_link(blob, path)
+    return digest
+
+def link_view(root: Path, run_id: str, rel_path: str, digest: str) -> Path:
+    view = root / "runs" / run_id / rel_path
+    view.parent.mkdir(parents=True, exist_ok=True)
+    if view.exists():
+        view.unlink()
+    _link_or_copy(blob_path(root, digest), view)
+    return view
+
+def snapshot_source(root: Path, base_out_dir: Path, run_id: str, files: list[dict[str, Any]]) -> int:
+    """
+    Ingests the manifest file entries of one source (they must carry sha256) and links them into the run view.
+    Returns the number of bytes that were new to the store.
+    """
+    new_bytes = 0
+    for meta in files:
+        digest = meta["sha256"]
+        if not blob_path(root, digest).exists():
+            new_bytes += int(meta["bytes"])
+        ingest_file(root, base_out_dir / meta["path"], digest=digest)
+        link_view(root, run_id, meta["path"], digest)
+    return new_bytes
+
+def referenced_digests(manifest: dict[str, Any]) -> set[str]:
+    out: set[str] = set()
+    for run in manifest.get("runs", []):
+        for src in run.get("sources", {}).values():
+            for meta in src.get("files", []):
+                if meta.get("sha256"):
+                    out.add(meta["sha256"])
+    return out
+
+def gc(root: Path, manifest_path: Path, dry_run: bool = False) -> dict[str, int]:
+    """
+    Deletes run views for runs that are no longer in the manifest, then blobs that no run references.
+    """
+    manifest = load_manifest(manifest_path)
+    keep_runs = {r["run_id"] for r in manifest.get("runs", [])}
+    keep = referenced_digests(manifest)
+
+    stats = {"views_removed": 0, "blobs_removed": 0, "bytes_freed": 0}
+
+    runs_dir = root / "runs"
+    if runs_dir.exists():
+        for d in runs_dir.iterdir():
+            if d.is_dir() and d.name not in keep_runs:
+                stats["views_removed"] += 1
+                if not dry_run:
+                    shutil.rmtree(d)
+
+    objects_dir = root / "objects"
+    if objects_dir.exists():
+        for blob in objects_dir.glob("*/*"):
+            if blob.name.startswith(".") or blob.name in keep:
+                continue
+            stats["blobs_removed"] += 1
+            stats["bytes_freed"] += blob.stat().st_size
+            if not dry_run:
+                blob.unlink()
+
+    return stats
@@ -0,0 +1,129 @@
+# src/maize_data/tables.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Tabular outputs in `global.output_format` (csv | parquet). Downloaders keep naming files `*.csv`
+# and pass that path through table_path(); with parquet the same stem gets `.parquet`, and with
+# `global.compression.format: zstd` CSV becomes `.csv.zst` (see compress.py).
+# Module level stays stdlib-only (plan.py imports table_suffix); pandas/pyarrow load on first write.
+
+# How each source's columns are typed in Parquet. "unit_prices" are KAMIS-style "30.00/Kg" strings,
+# split into a float column and a `<col>_unit` column. partition: hive-style directory per year.
+SCHEMAS: dict[str, dict[str, Any]] = {
+    "kamis": {"dates": ["Date"], "unit_prices": ["Wholesale", "Retail"], "numeric": ["Supply Volume"]},
+    "kenya_opendata_socrata": {"dates": ["date"], "numeric": ["price", "latitude", "longitude"]},
+    "hdx_wfp_prices": {"dates": ["date"], "numeric": ["latitude", "longitude", "price", "usdprice"], "partition": "year"},
+    "worldbank_wdi": {"ints": ["date"], "numeric": ["value"]},
+    "uncomtrade": {"ints": ["period"]},
+}
+
+# string columns with at most this share of distinct values become dictionary-encoded categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+def table_suffix(cfg: dict[str, Any]) -> str:
+    fmt = str(cfg.get("global", {}).get("output_format", "csv")).lower()
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"global.output_format must be csv or parquet, got {fmt!r}")
+    return f".{fmt}"
+
+def table_path(cfg: dict[str, Any], csv_path: Path) -> Path:
+    from maize_data.compress import plain, target
+
+    return target(cfg, plain(csv_path).with_suffix(table_suffix(cfg)))
+
+def split_unit_price(s: "pd.Series") -> tuple["pd.Series", "pd.Series"]:
+    """KAMIS-style "1,250.00/Kg" -> (1250.0, "Kg"); values without a unit keep a missing unit."""
+    import pandas as pd
+
+    parts = s.astype("string").str.extract(r"^\s*([\d.,]+)\s*(?:/\s*(.+?))?\s*$")
+    return pd.to_numeric(parts[0].str.replace(",", "", regex=False), errors="coerce"), parts[1]
+
+def typed(df: "pd.DataFrame", source: str) -> "pd.DataFrame":
+    """Column types for Parquet: parsed dates, numeric prices, categoricals for repeated strings."""
+    import pandas as pd
+
+    rules = SCHEMAS.get(source, {})
+    df = df.copy()
+    if len(df.columns) and len(df):
+        # HDX CSVs carry a HXL hashtag row (#date, #adm1+name, ...) under the header
+        first = df.iloc[:, 0].astype(str)
+        df = df[~first.str.startswith("#")]
+
+    for c in rules.get("unit_prices", []):
+        if c in df.columns:
+            df[c], df[f"{c}_unit"] = split_unit_price(df[c])
+    for c in rules.get("dates", []):
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+    for c in rules.get("numeric", []):
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    for c in rules.get("ints", []):
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int32")
+
+    for c in df.columns:
+        if df[c].dtype == object or pd.api.types.is_string_dtype(df[c]):
+            if len(df) and df[c].nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(df):
+                df[c] = df[c].astype("category")
+            else:
+                df[c] = df[c].astype("string")
+    return df.reset_index(drop=True)
+
+def write_table(cfg: dict[str, Any], df: "pd.DataFrame", csv_path: Path, source: str) -> Path:
+    """
+    Writes `df` at table_path(cfg, csv_path) atomically and returns that path.
+    Parquet is zstd-compressed; sources with `partition: year` become a directory of
+    `year=YYYY/part-0.parquet` files (file names are deterministic so the content store can dedup them).
+    """
+    from maize_data.io import atomic_path
+
+    path = table_path(cfg, csv_path)
+    if path.suffix != ".parquet":
+        from maize_data.compress import open_write, settings
+
+        with open_write(path, settings(cfg)["level"], text=True) as f:
+            df.to_csv(f, index=False)
+        return path
+
+    out = typed(df, source)
+    part = SCHEMAS.get(source, {}).get("partition")
+    with atomic_path(path) as tmp:
+        if part == "year" and "date" in out.columns and out["date"].notna().any():
+            tmp.mkdir()
+            years = out["date"].dt.year
+            for year, chunk in out.groupby(years.fillna(0).astype(int), sort=True):
+                d = tmp / f"year={year}"
+                d.mkdir()
+                chunk.to_parquet(d / "part-0.parquet", engine="pyarrow", compression="zstd", index=False)
+        else:
+            out.to_parquet(tmp, engine="pyarrow", compression="zstd", index=False)
+    return path
+
+def read_table(path: Path, columns: list[str] | None = None) -> "pd.DataFrame":
+    """Reads a CSV (plain or .csv.zst) or a Parquet file/partitioned directory written by write_table."""
+    import pandas as pd
+
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+def find_table(csv_path: Path) -> Path | None:
+    """Whichever of `<stem>.parquet` / `<stem>.csv` / `<stem>.csv.zst` exists (Parquet first)."""
+    from maize_data.compress import existing, plain
+
+    stem = plain(csv_path)
+    return existing(stem.with_suffix(".parquet")) or existing(stem.with_suffix(".csv"))
+
+def parquet_schema(path: Path) -> dict[str, Any]:
+    """Column names/types and row count from a Parquet footer (no data pages are read)."""
+    import pyarrow.parquet as pq
+
+    meta = pq.ParquetFile(path).metadata
+    schema = meta.schema.to_arrow_schema()
+    return {"rows": meta.num_rows, "columns": [{"name": f.name, "type": str(f.type)} for f in schema]}
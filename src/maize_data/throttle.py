@@ -0,0 +1,298 @@
+# src/maize_data/throttle.py
+from __future__ import annotations
+
+import contextvars
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator
+from urllib.parse import urlparse
+
+from maize_data import metrics
+
+# Request pacing shared by worker threads: QuotaScheduler for an API's call budget, HostBudget for
+# "how hard may this process hit one host" across every crawler (and downloader) talking to it.
+#
+# A HostBudget's in-flight limit is adaptive (AIMD, `global.throttle`): +1 after a limit's worth of healthy
+# responses while the limit is actually in use, and x`decrease` on 429/503/504, timeouts and connection
+# errors, or when the p95 latency of the last `window` responses exceeds `latency_factor` x the best p95
+# seen for the host. At most one cut per round trip (responses to requests started before the last cut
+# are not counted again). A Retry-After pauses every request to the host, not just the one retried.
+
+class QuotaExhausted(RuntimeError):
+    """The daily call budget is spent; completed work is kept and the rest waits for the next day."""
+
+class QuotaScheduler:
+    """
+    Paces calls to at most `rate_per_s` (evenly spaced, across all threads) and stops at `daily_limit` calls per UTC day.
+    The day's count is kept in `state_path` so separate runs on the same day share the budget.
+    """
+
+    def __init__(self, rate_per_s: float, daily_limit: int | None = None, state_path: Path | None = None) -> None:
+        self.interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self.daily_limit = daily_limit
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._next = 0.0
+        self._day, self._used = self._load()
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def _load(self) -> tuple[str, int]:
+        today = self._today()
+        if self.state_path is not None and self.state_path.exists():
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            if state.get("day") == today:
+                return today, int(state.get("used", 0))
+        return today, 0
+
+    def _save(self) -> None:
+        if self.state_path is not None and self.daily_limit is not None:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            self.state_path.write_text(json.dumps({"day": self._day, "used": self._used}), encoding="utf-8")
+
+    @property
+    def remaining(self) -> int | None:
+        with self._lock:
+            return None if self.daily_limit is None else max(0, self.daily_limit - self._used)
+
+    def acquire(self) -> None:
+        """Blocks until this call's slot; raises QuotaExhausted once the day's budget is used."""
+        metrics.sleep(self.reserve())
+
+    def reserve(self) -> float:
+        """Takes the next slot without waiting: seconds until it starts (for callers that sleep their own way)."""
+        with self._lock:
+            today = self._today()
+            if today != self._day:
+                self._day, self._used = today, 0
+            if self.daily_limit is not None and self._used >= self.daily_limit:
+                raise QuotaExhausted(f"daily limit of {self.daily_limit} calls reached for {self._day} (UTC)")
+            self._used += 1
+            self._save()
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        return slot - now
+
+# statuses that mean "slow down" (the rest of 5xx are the server's own problem)
+CONGESTION = (429, 503, 504)
+
+@dataclass(frozen=True)
+class ThrottleSettings:
+    adaptive: bool = True
+    initial: int = 2
+    min: int = 1
+    max: int = 8
+    decrease: float = 0.5
+    latency_factor: float = 2.0
+    window: int = 20
+    rate_per_second: float = 0.0  # request starts per second per host; 0 = unpaced
+
+def throttle_settings(cfg: dict[str, Any], source: str | None = None) -> ThrottleSettings:
+    """
+    `global.throttle`, overridden by `sources.<source>.throttle`. With `adaptive: false` the limit stays at
+    `max` and requests start `http_sleep_seconds` apart (unless `rate_per_second` says otherwise).
+    """
+    g = cfg.get("global", {})
+    t = {**(g.get("throttle") or {}), **((cfg.get("sources", {}).get(source or "", {}) or {}).get("throttle") or {})}
+    adaptive = bool(t.get("adaptive", True))
+    lo = max(1, int(t.get("min", 1)))
+    hi = max(lo, int(t.get("max", 8)))
+    rate = t.get("rate_per_second")
+    if rate is None and not adaptive:
+        from maize_data.io import http_settings
+
+        sleep_s = http_settings(cfg)[1]
+        rate = 1.0 / sleep_s if sleep_s > 0 else 0.0
+    return ThrottleSettings(
+        adaptive=adaptive,
+        initial=min(hi, max(lo, int(t.get("initial", 2)))),
+        min=lo,
+        max=hi,
+        decrease=float(t.get("decrease", 0.5)),
+        latency_factor=float(t.get("latency_factor", 2.0)),
+        window=max(5, int(t.get("window", 20))),
+        rate_per_second=float(rate or 0.0),
+    )
+
+# how often an async waiter re-checks a full host (threads are woken instead)
+POLL_SECONDS = 0.02
+
+# the budget whose slot() the current thread is in, so urllib3's retry sleeps can report to it
+_ACTIVE: contextvars.ContextVar["tuple[HostBudget, float] | None"] = contextvars.ContextVar("maize_data_host_budget", default=None)
+
+class HostBudget:
+    """
+    One host's request budget for the whole process: at most `limit` requests in flight (adaptive, see above),
+    started at most `rate_per_second` per second. Use `with budget.slot() as started: ...` around each call
+    and report how it went with `budget.record(started, status, latency)`; MeteredSession does both.
+    """
+
+    def __init__(self, host: str, settings: ThrottleSettings, log: Callable[[str], None] | None = None) -> None:
+        self.host = host
+        self.settings = settings
+        self.pacer = QuotaScheduler(settings.rate_per_second)
+        self.limit = settings.initial if settings.adaptive else settings.max
+        self.cuts = 0
+        self._log = log
+        self._inflight = 0
+        self._saturated = False
+        self._healthy = 0
+        self._latencies: deque[float] = deque(maxlen=settings.window)
+        self._best_p95 = math.inf
+        self._last_cut = 0.0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        mode = f"adaptive {settings.min}..{settings.max}" if settings.adaptive else "fixed"
+        self._note(f"throttle: {host} limit={self.limit} ({mode}, rate={settings.rate_per_second or 'unpaced'}/s)")
+
+    def _note(self, msg: str) -> None:
+        if self._log is not None:
+            self._log(msg)
+
+    @contextmanager
+    def slot(self) -> Iterator[float]:
+        """Holds one in-flight place for the host; yields the monotonic time the request started."""
+        t0 = time.perf_counter()
+        with self._cond:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._cond.wait(pause)
+                elif self._inflight >= self.limit:
+                    self._saturated = True
+                    self._cond.wait()
+                else:
+                    break
+            self._inflight += 1
+            if self._inflight >= self.limit:
+                self._saturated = True
+        waited = time.perf_counter() - t0
+        if waited > 0.001:
+            metrics.current().add_phase("throttle", waited)
+        try:
+            self.pacer.acquire()
+            started = time.monotonic()
+            token = _ACTIVE.set((self, started))
+            try:
+                yield started
+            finally:
+                _ACTIVE.reset(token)
+        finally:
+            with self._cond:
+                self._inflight -= 1
+                self._cond.notify_all()
+
+    def try_enter(self) -> float:
+        """
+        slot() for event loops (aio.py), without blocking: 0.0 when an in-flight place was taken (give it back
+        with leave()), else how long to wait before trying again.
+        """
+        with self._cond:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                return pause
+            if self._inflight >= self.limit:
+                self._saturated = True
+                return POLL_SECONDS
+            self._inflight += 1
+            if self._inflight >= self.limit:
+                self._saturated = True
+            return 0.0
+
+    def leave(self) -> None:
+        with self._cond:
+            self._inflight -= 1
+            self._cond.notify_all()
+
+    def record(self, started: float, status: int | None, latency: float, retry_after: float | None = None) -> None:
+        """
+        Feeds one finished request into the controller: `status` None for a timeout or connection error.
+        429/503/504 and errors cut the limit; other responses count as healthy unless the window's p95 is high.
+        """
+        with self._cond:
+            if retry_after:
+                self._pause(retry_after)
+            if status is None or status in CONGESTION:
+                self._cut(started, "timeout/error" if status is None else f"HTTP {status}")
+                return
+            if not self.settings.adaptive:
+                return
+            self._latencies.append(latency)
+            if len(self._latencies) == self._latencies.maxlen:
+                p95 = sorted(self._latencies)[int(0.95 * (len(self._latencies) - 1))]
+                self._latencies.clear()
+                if p95 > self.settings.latency_factor * self._best_p95:
+                    self._cut(started, f"p95 {p95:.2f}s > {self.settings.latency_factor:g} x {self._best_p95:.2f}s")
+                    return
+                self._best_p95 = min(self._best_p95, p95)
+            self._healthy += 1
+            # additive increase: +1 per round of `limit` healthy responses, only while the limit is what holds us back
+            if self._healthy >= self.limit and self._saturated and self.limit < self.settings.max:
+                self.limit += 1
+                self._healthy = 0
+                self._saturated = False
+                self._note(f"throttle: {self.host} limit -> {self.limit}")
+                self._cond.notify_all()
+
+    def _pause(self, seconds: float) -> None:
+        until = time.monotonic() + seconds
+        if until > self._paused_until:
+            self._paused_until = until
+            self._note(f"throttle: {self.host} Retry-After {seconds:g}s, pausing the host")
+
+    def _cut(self, started: float, why: str) -> None:
+        self._healthy = 0
+        self._latencies.clear()
+        if not self.settings.adaptive or started < self._last_cut:
+            return  # fixed limit, or already cut for this round trip
+        self._last_cut = time.monotonic()
+        new = max(self.settings.min, int(self.limit * self.settings.decrease))
+        self.cuts += 1
+        if new != self.limit:
+            self._note(f"throttle: {self.host} limit {self.limit} -> {new} ({why})")
+            self.limit = new
+
+_BUDGETS: dict[str, HostBudget] = {}
+_BUDGETS_LOCK = threading.Lock()
+
+def host_budget(url: str, settings: ThrottleSettings, log: Callable[[str], None] | None = None) -> HostBudget:
+    """The shared HostBudget for `url`'s host (created with these settings on first use)."""
+    host = urlparse(url).netloc or url
+    with _BUDGETS_LOCK:
+        if host not in _BUDGETS:
+            _BUDGETS[host] = HostBudget(host, settings, log)
+        return _BUDGETS[host]
+
+def signal_retry(status: int | None, retry_after: float | None) -> None:
+    """
+    Called from urllib3's retry loop (sessions.py) when an attempt failed with `status` (None: connection or
+    read error): the budget of the request in progress on this thread reacts before the retry, not after it.
+    """
+    active = _ACTIVE.get()
+    if active is None:
+        return
+    budget, started = active
+    if status is None or status in CONGESTION:
+        budget.record(started, status, 0.0, retry_after)
+    elif retry_after:
+        with budget._cond:
+            budget._pause(retry_after)
+
+def summary() -> dict[str, dict[str, Any]]:
+    """Per host: the limit reached, the number of cuts and the best p95 latency (for the run log)."""
+    with _BUDGETS_LOCK:
+        budgets = list(_BUDGETS.values())
+    return {
+        b.host: {"limit": b.limit, "cuts": b.cuts, "best_p95_s": None if math.isinf(b._best_p95) else round(b._best_p95, 3)}
+        for b in budgets
+    }
@@ -0,0 +1,468 @@
+# src/maize_data/validate.py
+from __future__ import annotations
+
+import csv
+import json
+import os
+import struct
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+from maize_data.compress import ZST, existing, inner_suffix, open_read
+from maize_data.manifest import latest_file_entries, load_manifest, sha256_file
+from maize_data.sources import enabled_sources
+
+# Content-level checks of everything under out_dir, one process-pool task per file.
+# Stdlib only (pyarrow for Parquet outputs, zstandard for .zst): every check streams the file (csv reader,
+# zip CRC pass, NetCDF/HDF5 header, Parquet footer) instead of loading it into pandas. `.csv.zst` / `.json.zst`
+# get the same checks as their plain forms, decompressed on the fly; a cut-off zstd stream is an error.
+
+# Per-source CSV expectations. lag_days: how far behind global.end_date the source normally ends.
+CSV_RULES: dict[str, dict[str, Any]] = {
+    "kamis": {"required": ["Commodity", "Market", "County", "Date"], "date_col": "Date"},
+    "kenya_opendata_socrata": {"date_col": "date"},
+    "hdx_wfp_prices": {"required": ["date", "market", "commodity", "price"], "date_col": "date", "lag_days": 120},
+    "worldbank_wdi": {"required": ["date", "value", "indicator", "country"], "date_col": "date", "lag_days": 730},
+    "uncomtrade": {"date_col": "period", "lag_days": 365},
+}
+
+# ERA5 request names -> variable names in the NetCDF the CDS returns
+ERA5_VARS = {
+    "2m_temperature": "t2m",
+    "total_precipitation": "tp",
+    "2m_dewpoint_temperature": "d2m",
+    "surface_solar_radiation_downwards": "ssrd",
+    "volumetric_soil_water_layer_1": "swvl1",
+    "volumetric_soil_water_layer_2": "swvl2",
+    "volumetric_soil_water_layer_3": "swvl3",
+    "volumetric_soil_water_layer_4": "swvl4",
+    "10m_u_component_of_wind": "u10",
+    "10m_v_component_of_wind": "v10",
+}
+
+@dataclass
+class FileReport:
+    source: str
+    path: str
+    kind: str
+    bytes: int = 0
+    rows: int | None = None
+    first_date: str | None = None
+    last_date: str | None = None
+    errors: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+def _parse_date(v: str) -> tuple[date, date] | None:
+    """(earliest, latest) day a cell can mean: ISO dates, YYYYMMDD, YYYY-MM or a bare year."""
+    v = v.strip()
+    try:
+        if len(v) >= 10 and v[4] == "-":
+            d = date.fromisoformat(v[:10])
+            return d, d
+        if len(v) == 8 and v.isdigit():
+            d = date(int(v[:4]), int(v[4:6]), int(v[6:]))
+            return d, d
+        if len(v) == 7 and v[4] == "-":
+            first = date(int(v[:4]), int(v[5:7]), 1)
+            return first, (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+        if len(v) == 4 and v.isdigit():
+            return date(int(v), 1, 1), date(int(v), 12, 31)
+    except ValueError:
+        return None
+    return None
+
+def _window_warnings(lo: date, hi: date, settings: dict[str, Any], lag_days: int) -> list[str]:
+    out = []
+    start, end = settings.get("start_date"), settings.get("end_date")
+    slack = timedelta(days=int(settings.get("coverage_slack_days", 31)))
+    if start and lo > date.fromisoformat(start) + slack:
+        out.append(f"starts {lo} (window starts {start})")
+    if end and hi < date.fromisoformat(end) - slack - timedelta(days=lag_days):
+        out.append(f"ends {hi} (window ends {end})")
+    return out
+
+def _coverage(rep: FileReport, lo: date | None, hi: date | None, settings: dict[str, Any], lag_days: int) -> None:
+    if lo is None or hi is None:
+        return
+    rep.first_date, rep.last_date = lo.isoformat(), hi.isoformat()
+    if settings.get("dataset"):
+        return  # one part of a partitioned dataset: validate() checks the span of the whole dataset
+    rep.warnings += _window_warnings(lo, hi, settings, lag_days)
+
+def _parquet_dataset(rel: Path) -> Path | None:
+    """The partitioned `.parquet` directory a part file belongs to (`x.parquet/year=2020/part-0.parquet`), else None."""
+    for i, p in enumerate(rel.parts[:-1]):
+        if p.endswith(".parquet"):
+            return Path(*rel.parts[: i + 1])
+    return None
+
+def _dataset_coverage(reports: list[FileReport], datasets: dict[str, str], settings: dict[str, Any]) -> None:
+    """Date coverage of each partitioned dataset as a whole, reported on its first part."""
+    parts: dict[str, list[FileReport]] = {}
+    for r in reports:
+        if r.path in datasets:
+            parts.setdefault(datasets[r.path], []).append(r)
+    for ds, reps in parts.items():
+        spans = [(r.first_date, r.last_date) for r in reps if r.first_date and r.last_date]
+        if not spans:
+            continue
+        lo, hi = date.fromisoformat(min(a for a, _ in spans)), date.fromisoformat(max(b for _, b in spans))
+        lag = int(CSV_RULES.get(reps[0].source, {}).get("lag_days", 0))
+        first = min(reps, key=lambda r: r.path)
+        first.warnings += [f"dataset {ds}: {w}" for w in _window_warnings(lo, hi, settings, lag)]
+
+def check_csv(rep: FileReport, path: Path, settings: dict[str, Any]) -> None:
+    rules = {} if path.name.startswith("_") else CSV_RULES.get(rep.source, {})
+    if path.suffix != ZST:  # a truncated .zst fails decompression instead
+        with path.open("rb") as fb:
+            if rep.bytes:
+                fb.seek(-1, os.SEEK_END)
+                if fb.read(1) not in (b"\n", b"\r"):
+                    rep.errors.append("no trailing newline (truncated write?)")
+    with open_read(path) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            rep.errors.append("empty file (no header)")
+            return
+        missing = [c for c in rules.get("required", []) if c not in header]
+        if missing:
+            rep.errors.append(f"missing columns {missing}")
+        di = header.index(rules["date_col"]) if rules.get("date_col") in header else None
+
+        width = len(header)
+        rows = ragged = bad_dates = 0
+        lo = hi = None
+        for row in reader:
+            rows += 1
+            if len(row) != width:
+                ragged += 1
+                continue
+            if di is not None:
+                d = _parse_date(row[di])
+                if d is None:
+                    bad_dates += 1
+                    continue
+                lo = d[0] if lo is None or d[0] < lo else lo
+                hi = d[1] if hi is None or d[1] > hi else hi
+    rep.rows = rows
+    if rows == 0:
+        rep.errors.append("header only, no rows")
+    if ragged:
+        rep.errors.append(f"{ragged} rows with != {width} fields")
+    if di is not None and rows and bad_dates / rows > 0.05:
+        rep.warnings.append(f"{bad_dates}/{rows} unparsable values in {rules['date_col']!r}")
+    _coverage(rep, lo, hi, settings, int(rules.get("lag_days", 0)))
+
+def check_parquet(rep: FileReport, path: Path, settings: dict[str, Any]) -> None:
+    """Footer (schema, row count) plus the date column only; needs pyarrow, like writing Parquet does."""
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    names = pf.schema_arrow.names
+    rules = CSV_RULES.get(rep.source, {})
+    rep.rows = pf.metadata.num_rows
+    if rep.rows == 0:
+        rep.errors.append("no rows")
+    # hive partition columns (year=2020/) live in the directory name, not the file
+    missing = [c for c in rules.get("required", []) if c not in names]
+    if missing:
+        rep.errors.append(f"missing columns {missing}")
+    col = rules.get("date_col")
+    if col in names and rep.rows:
+        values = pf.read(columns=[col]).column(col)
+        mm = pc.min_max(values)
+        lo, hi = mm["min"].as_py(), mm["max"].as_py()
+        if isinstance(lo, int):  # year columns (WDI, Comtrade)
+            lo, hi = date(lo, 1, 1), date(hi, 12, 31)
+        elif isinstance(lo, datetime):
+            lo, hi = lo.date(), hi.date()
+        if values.null_count / rep.rows > 0.05:
+            rep.warnings.append(f"{values.null_count}/{rep.rows} null values in {col!r}")
+        _coverage(rep, lo, hi, settings, int(rules.get("lag_days", 0)))
+
+def check_power_json(rep: FileReport, path: Path, settings: dict[str, Any]) -> None:
+    with open_read(path) as f:
+        doc = json.load(f)
+    params = (doc.get("properties") or {}).get("parameter") if isinstance(doc, dict) else None
+    if not params:
+        msgs = doc.get("messages") or doc.get("errors") or doc.get("detail") if isinstance(doc, dict) else None
+        rep.errors.append(f"no properties.parameter (API said: {str(msgs)[:200]})")
+        return
+    fill = (doc.get("header") or {}).get("fill_value", -999.0)
+    days: set[str] = set()
+    for name, series in params.items():
+        if not series:
+            rep.errors.append(f"parameter {name} is empty")
+            continue
+        n_fill = sum(1 for v in series.values() if v is None or v == fill)
+        ratio = n_fill / len(series)
+        if ratio > float(settings.get("max_fill_ratio", 0.2)):
+            rep.warnings.append(f"{name}: {ratio:.0%} fill values")
+        days.update(series)
+    rep.rows = len(days)
+    parsed = [d for d in (_parse_date(k) for k in days) if d]
+    if parsed:
+        _coverage(rep, min(p[0] for p in parsed), max(p[1] for p in parsed), settings, 0)
+
+def check_zip(rep: FileReport, path: Path, settings: dict[str, Any]) -> None:
+    try:
+        with zipfile.ZipFile(path) as z:
+            bad = z.testzip()  # reads every member and checks its CRC
+            names = z.namelist()
+    except zipfile.BadZipFile as e:
+        rep.errors.append(f"bad zip: {e}")
+        return
+    if bad:
+        rep.errors.append(f"CRC mismatch in member {bad}")
+    rep.rows = len(names)
+    if rep.source == "geoboundaries_adm1" and not any(n.lower().endswith((".shp", ".geojson", ".json")) for n in names):
+        rep.errors.append("no .shp/.geojson member")
+
+_NC_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 4, 6: 8, 7: 1, 8: 2, 9: 4, 10: 8, 11: 8}
+
+def _read_classic_header(f, version: int) -> tuple[list[str], int]:
+    """Variable names and the end offset of the largest variable, from a CDF-1/2/5 header."""
+    big = version == 5
+    i32 = lambda: struct.unpack(">i", f.read(4))[0]
+    count = (lambda: struct.unpack(">q", f.read(8))[0]) if big else i32
+    offset = (lambda: struct.unpack(">q", f.read(8))[0]) if version in (2, 5) else i32
+
+    def name() -> str:
+        n = count()
+        s = f.read(n).decode("utf-8", "replace")
+        f.read(-n % 4)
+        return s
+
+    def attrs() -> None:
+        tag, n = i32(), count()
+        for _ in range(n if tag else 0):
+            name()
+            typ, nelems = i32(), count()
+            f.read(nelems * _NC_SIZES[typ] + (-nelems * _NC_SIZES[typ]) % 4)
+
+    count()  # numrecs
+    tag, ndims = i32(), count()
+    for _ in range(ndims if tag else 0):
+        name()
+        count()
+    attrs()
+    tag, nvars = i32(), count()
+    names, end = [], 0
+    for _ in range(nvars if tag else 0):
+        names.append(name())
+        for _ in range(count()):
+            count()
+        attrs()
+        i32()  # nc_type
+        vsize = count()
+        end = max(end, offset() + vsize)
+    return names, end
+
+def _hdf5_eof(f) -> int | None:
+    """End-of-file address recorded in an HDF5 (NetCDF-4) superblock."""
+    f.seek(8)
+    version = f.read(1)[0]
+    if version in (0, 1):
+        f.seek(13)
+        size_off = f.read(1)[0]
+        f.seek(24 + (4 if version == 1 else 0) + 2 * size_off)
+    else:
+        size_off = f.read(1)[0]
+        f.seek(12 + 2 * size_off)
+    return int.from_bytes(f.read(size_off), "little")
+
+def check_netcdf(rep: FileReport, path: Path, settings: dict[str, Any]) -> None:
+    requested = settings.get("era5_variables", []) if rep.source == "era5_cds" else []
+    expected = [ERA5_VARS[v] for v in requested if v in ERA5_VARS]
+    unknown = [v for v in requested if v not in ERA5_VARS]
+    with path.open("rb") as f:
+        magic = f.read(8)
+        if magic[:3] == b"CDF" and magic[3] in (1, 2, 5):
+            f.seek(4)
+            try:
+                names, end = _read_classic_header(f, magic[3])
+            except (struct.error, KeyError, IndexError) as e:
+                rep.errors.append(f"unreadable NetCDF header: {type(e).__name__}")
+                return
+            if end > rep.bytes:
+                rep.errors.append(f"truncated: data ends at {end} but file is {rep.bytes} bytes")
+        elif magic == b"\x89HDF\r\n\x1a\n":
+            eof = _hdf5_eof(f)
+            if eof and eof > rep.bytes:
+                rep.errors.append(f"truncated: superblock says {eof} bytes, file is {rep.bytes}")
+            names = _hdf5_variables(path)
+            if names is None:
+                if requested:
+                    rep.warnings.append("NetCDF-4 variables not checked (h5py not installed)")
+                return
+        else:
+            rep.errors.append(f"not a NetCDF file (magic {magic[:4]!r})")
+            return
+    rep.rows = len(names)
+    missing = [v for v in expected if v not in names]
+    if missing:
+        rep.errors.append(f"missing variables {missing} (has {names})")
+    # request names without a known short name may still be in the file under either spelling
+    unchecked = [v for v in unknown if v not in names]
+    if unchecked:
+        rep.warnings.append(f"variables {unchecked} not checked (no NetCDF name in validate.ERA5_VARS; has {names})")
+
+def _hdf5_variables(path: Path) -> list[str] | None:
+    try:
+        import h5py
+    except ImportError:
+        return None
+    with h5py.File(path, "r") as h:
+        return list(h.keys())
+
+def check_nonempty(rep: FileReport, path: Path, settings: dict[str, Any]) -> None:
+    if rep.bytes == 0:
+        rep.errors.append("empty file")
+
+def check_zst(rep: FileReport, path: Path, settings: dict[str, Any]) -> None:
+    """Any other .zst: the stream must decompress to the end."""
+    with open_read(path, text=False) as f:
+        while f.read(1 << 20):
+            pass
+
+def checker_for(source: str, path: Path) -> tuple[str, Callable[[FileReport, Path, dict[str, Any]], None]]:
+    # only text formats are ever written as .zst (compress.TEXT_SUFFIXES)
+    suffix = inner_suffix(path)
+    if suffix == ".csv":
+        return "csv", check_csv
+    if suffix == ".parquet":
+        return "parquet", check_parquet
+    if suffix == ".json" and source == "nasa_power" and not path.name.startswith("_"):
+        return "power_json", check_power_json
+    if suffix == ".zip":
+        return "zip", check_zip
+    if suffix in (".nc", ".nc4"):
+        return "netcdf", check_netcdf
+    return ("zst", check_zst) if path.suffix == ZST else ("file", check_nonempty)
+
+def check_file(source: str, path: str, expected: dict[str, Any] | None, settings: dict[str, Any]) -> FileReport:
+    """One pool task: content check plus manifest size/hash cross-check."""
+    t0 = time.perf_counter()
+    p = Path(path)
+    kind, fn = checker_for(source, p)
+    rep = FileReport(source=source, path=path, kind=kind, bytes=p.stat().st_size)
+    try:
+        fn(rep, p, settings)
+    except Exception as e:  # corrupt content can fail anywhere (zlib, struct, json); report, never crash the run
+        rep.errors.append(f"{type(e).__name__}: {e}")
+    if expected is None:
+        rep.warnings.append("not recorded in manifest")
+    else:
+        if expected.get("bytes") != rep.bytes:
+            rep.errors.append(f"size {rep.bytes} != manifest {expected.get('bytes')}")
+        elif expected.get("sha256") and sha256_file(p) != expected["sha256"]:
+            rep.errors.append("sha256 differs from manifest")
+    rep.seconds = time.perf_counter() - t0
+    return rep
+
+def validate(
+    cfg: dict[str, Any],
+    out_dir: Path | None = None,
+    jobs: int | None = None,
+) -> dict[str, Any]:
+    g = cfg.get("global", {})
+    vcfg = g.get("validation") or {}
+    out_dir = Path(out_dir or g.get("out_dir", "data_raw"))
+    settings = {
+        "start_date": g.get("start_date"),
+        "end_date": g.get("end_date"),
+        "max_fill_ratio": vcfg.get("max_fill_ratio", 0.2),
+        "coverage_slack_days": vcfg.get("coverage_slack_days", 31),
+        "era5_variables": cfg.get("sources", {}).get("era5_cds", {}).get("variables", []),
+    }
+    recorded = latest_file_entries(out_dir / "_MANIFEST.json")
+
+    t0 = time.perf_counter()
+    tasks, empty_sources, seen = [], [], set()
+    datasets: dict[str, str] = {}  # part file -> its partitioned .parquet dataset
+    for spec in enabled_sources(cfg):
+        d = out_dir / spec.out_subdir
+        files = sorted(p for p in d.rglob("*") if p.is_file() and not p.name.startswith(".")) if d.exists() else []
+        if not files:
+            empty_sources.append(spec.name)
+        for p in files:
+            rel = str(p.relative_to(out_dir))
+            seen.add(rel)
+            ds = _parquet_dataset(Path(rel))
+            if ds is not None:
+                datasets[str(p)] = str(ds)
+            tasks.append((spec.name, str(p), recorded.get(rel), {**settings, "dataset": str(ds)} if ds else settings))
+
+    # a file recompressed by `compact` (x.csv -> x.csv.zst) is not missing
+    # only what each source's newest record lists: older runs may name files a later run removed on purpose
+    # (merged Comtrade chunks, a dropped partition); `_` paths are indexes and work in progress, not artifacts
+    latest: dict[str, dict[str, Any]] = {}
+    for run in load_manifest(out_dir / "_MANIFEST.json").get("runs", []):
+        latest.update(run.get("sources", {}))
+    missing = [
+        meta["path"]
+        for spec in enabled_sources(cfg)
+        for meta in latest.get(spec.name, {}).get("files", [])
+        if meta["path"] not in seen
+        and not any(part.startswith("_") for part in Path(meta["path"]).parts)
+        and existing(out_dir / meta["path"]) is None
+    ]
+
+    # largest files first so one big NetCDF does not end up alone at the tail
+    tasks.sort(key=lambda t: os.path.getsize(t[1]), reverse=True)
+    jobs = int(jobs or vcfg.get("jobs") or os.cpu_count() or 1)
+    reports: list[FileReport] = []
+    if jobs <= 1 or len(tasks) <= 2:
+        reports = [check_file(*t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as ex:
+            futures = [ex.submit(check_file, *t) for t in tasks]
+            reports = [f.result() for f in as_completed(futures)]
+    reports.sort(key=lambda r: r.path)
+    _dataset_coverage(reports, datasets, settings)
+
+    result = {
+        "out_dir": str(out_dir),
+        "files": len(reports),
+        "bytes": sum(r.bytes for r in reports),
+        "seconds": round(time.perf_counter() - t0, 3),
+        "errors": sum(len(r.errors) for r in reports) + len(empty_sources) + len(missing),
+        "warnings": sum(len(r.warnings) for r in reports),
+        "empty_sources": empty_sources,
+        "missing_files": missing,
+        "reports": [asdict(r) for r in reports],
+    }
+    return result
+
+def format_report(result: dict[str, Any], verbose: bool = False) -> str:
+    lines = []
+    for name in result["empty_sources"]:
+        lines.append(f"ERROR {name}: enabled but no files")
+    for rel in result["missing_files"]:
+        lines.append(f"ERROR {rel}: in manifest but missing on disk")
+    for r in result["reports"]:
+        for e in r["errors"]:
+            lines.append(f"ERROR {r['path']}: {e}")
+        for w in r["warnings"]:
+            lines.append(f"WARN  {r['path']}: {w}")
+        if verbose and not r["errors"] and not r["warnings"]:
+            span = f" {r['first_date']}..{r['last_date']}" if r["first_date"] else ""
+            lines.append(f"OK    {r['path']} ({r['kind']}, rows={r['rows']}{span})")
+    status = "FAILED" if result["errors"] else "OK"
+    lines.append(
+        f"{status}: {result['files']} files, {result['bytes'] / 2**20:.1f} MB, "
+        f"{result['errors']} errors, {result['warnings']} warnings in {result['seconds']}s"
+    )
+    return "\n".join(lines)